@@ -0,0 +1,424 @@
+# analysis/aggregates.py
+"""
+Dashboard aggregates kept up to date from change sets instead of full recomputes.
+
+Each aggregate is a count per key tuple. After a build, rows added/removed in each
+source table are found by multiset-diffing hash_pandas_object row hashes against a
+narrow snapshot from the previous build. Row-unit aggregates subtract the removed
+rows' contributions and add the added rows'; event-unit aggregates (whose per-event
+contribution depends on all of the event's findings) re-derive only the touched
+ev_ids from the old snapshot and the new tables. `verify` cross-checks against a
+full recompute; `update` runs it every `verify_every` generations.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analysis.system_buckets import event_level_with_system_flags
+from config import AGG_DIR, AGG_VERIFY_EVERY
+from store import write_parquet
+
+SOURCES = ("events", "findings", "seq")
+NA_KEY = "<NA>"
+NA_YEAR = -1
+INT_KEYS = ("ev_year", "ev_month")  # counted under NA_YEAR when missing
+
+
+@dataclass(frozen=True)
+class AggregateDef:
+    name: str
+    source: str  # table whose rows are counted: events | findings | seq
+    keys: tuple[str, ...]
+    unit: str  # "row": each source row contributes independently; "event": contribution depends on all ev_id rows
+    columns: dict[str, tuple[str, ...]]  # projection needed from each table
+    contrib: Callable[[dict[str, pd.DataFrame]], pd.DataFrame]  # -> key columns, one row per counted unit
+
+
+def _fatal(s: pd.Series) -> pd.Series:
+    return s.astype("string").str.upper().eq("FATL").fillna(False)
+
+
+def _event_flags(t: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # the regex bucketing is the expensive part; derive once per table set for both event aggregates
+    if "_evx" not in t:
+        t["_evx"] = event_level_with_system_flags(t["events"], t["findings"])
+    return t["_evx"]
+
+
+def _system_bucket_keys(t: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    evx = _event_flags(t)
+    if "system_bucket" not in evx.columns:
+        return pd.DataFrame(columns=["ev_year", "ev_highest_injury", "system_bucket"])
+    return evx.loc[evx["system_bucket"].notna(), ["ev_year", "ev_highest_injury", "system_bucket"]]
+
+
+def _fc_keys(t: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    evx = _event_flags(t)
+    is_fc = evx["has_flight_controls"] if "has_flight_controls" in evx.columns else False
+    return evx[["ev_year", "ev_highest_injury"]].assign(
+        is_fc=pd.Series(is_fc, index=evx.index).fillna(False).astype(bool)
+    )
+
+
+def _month(df: pd.DataFrame) -> pd.Series:
+    if "ev_date" not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+    return pd.to_datetime(df["ev_date"], errors="coerce").dt.month.astype("Int64")
+
+
+def _system_bucket_month_keys(t: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    keys = _system_bucket_keys(t)
+    return keys.assign(ev_month=_month(_event_flags(t).loc[keys.index]))
+
+
+def _category_month_keys(t: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # one count per (event, category): an event with three Aircraft findings is one Aircraft event
+    f = t["findings"]
+    d = f[["ev_id", "ev_year", "ev_highest_injury", "finding_category"]].assign(ev_month=_month(f))
+    return d.drop_duplicates(["ev_id", "finding_category"])
+
+
+_EV = ("ev_id", "ev_year", "ev_highest_injury")
+_FIND_TEXT = ("ev_id", "ev_year", "ev_highest_injury", "finding_category", "cat_text", "finding_description")
+
+# event counts per month for the trend view (analysis/trends.py); the year series is their sum
+TREND_AGGREGATES = (
+    AggregateDef(
+        "system_bucket_trend",
+        "events",
+        ("ev_year", "ev_month", "ev_highest_injury", "system_bucket"),
+        "event",
+        {"events": (*_EV, "ev_date"), "findings": _FIND_TEXT},
+        _system_bucket_month_keys,
+    ),
+    AggregateDef(
+        "category_trend",
+        "findings",
+        ("ev_year", "ev_month", "ev_highest_injury", "finding_category"),
+        "event",
+        {"findings": ("ev_id", "ev_year", "ev_highest_injury", "finding_category", "ev_date")},
+        _category_month_keys,
+    ),
+)
+
+DEFAULT_AGGREGATES = (
+    AggregateDef(
+        "system_bucket_fatality",
+        "events",
+        ("ev_year", "ev_highest_injury", "system_bucket"),
+        "event",
+        {"events": _EV, "findings": _FIND_TEXT},
+        _system_bucket_keys,
+    ),
+    AggregateDef(
+        "flight_controls_2x2",
+        "events",
+        ("ev_year", "ev_highest_injury", "is_fc"),
+        "event",
+        {"events": _EV, "findings": _FIND_TEXT},
+        _fc_keys,
+    ),
+    AggregateDef(
+        "category_injury",
+        "findings",
+        ("ev_year", "finding_category", "ev_highest_injury"),
+        "row",
+        {"findings": ("ev_id", "ev_year", "finding_category", "ev_highest_injury")},
+        lambda t: t["findings"],
+    ),
+    AggregateDef(
+        "phase_occurrence",
+        "seq",
+        ("phase_meaning", "occurrence_meaning"),
+        "row",
+        {"seq": ("ev_id", "phase_meaning", "occurrence_meaning")},
+        lambda t: t["seq"],
+    ),
+    AggregateDef(
+        "phase_counts", "seq", ("phase_meaning",), "row", {"seq": ("ev_id", "phase_meaning")}, lambda t: t["seq"]
+    ),
+    AggregateDef(
+        "occurrence_counts",
+        "seq",
+        ("occurrence_meaning",),
+        "row",
+        {"seq": ("ev_id", "occurrence_meaning")},
+        lambda t: t["seq"],
+    ),
+    *TREND_AGGREGATES,
+)
+
+
+# -------------------------
+# Counting + change sets
+# -------------------------
+
+
+def count_keys(keys: pd.DataFrame, cols: tuple[str, ...]) -> pd.Series:
+    """
+    Counts per key tuple. Missing keys are counted under NA_KEY / NA_YEAR sentinels so
+    nothing drops out of the totals (the views exclude them where the dashboard would).
+    """
+    if keys.empty:
+        return pd.Series(dtype="int64", index=pd.MultiIndex.from_tuples([], names=list(cols)), name="n")
+    k = pd.DataFrame(
+        {
+            c: (
+                keys[c].fillna(NA_YEAR)
+                if c in INT_KEYS
+                else keys[c] if keys[c].dtype == bool else keys[c].fillna(NA_KEY)
+            )
+            for c in cols
+        }
+    )
+    n = k.groupby(list(cols), observed=True).size().rename("n").astype("int64")
+    if not isinstance(n.index, pd.MultiIndex):
+        n.index = pd.MultiIndex.from_arrays([n.index], names=list(cols))
+    return n
+
+
+def row_changes(old: pd.DataFrame, new: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (added, removed) rows between two frames with the same columns, as a multiset diff
+    of row hashes: duplicates are matched pairwise, so k copies -> k+1 yields one added row.
+    """
+
+    def keyed(df: pd.DataFrame) -> pd.MultiIndex:
+        h = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        k = pd.Series(h).groupby(h).cumcount().to_numpy()
+        return pd.MultiIndex.from_arrays([h, k])
+
+    ko, kn = keyed(old), keyed(new)
+    return new[~kn.isin(ko)], old[~ko.isin(kn)]
+
+
+def _apply(counts: pd.Series, plus: pd.Series, minus: pd.Series) -> pd.Series:
+    out = counts.add(plus, fill_value=0).sub(minus, fill_value=0)
+    if (out < 0).any():
+        raise ValueError(f"negative counts after applying deltas to {counts.name!r}; run a full rebuild")
+    return out[out != 0].astype("int64").sort_index().rename("n")
+
+
+def _project(tables: dict[str, pd.DataFrame], defs) -> dict[str, pd.DataFrame]:
+    """Narrow, dtype-normalized copies of just the columns any aggregate needs."""
+    need: dict[str, list[str]] = {}
+    for d in defs:
+        for src, cols in d.columns.items():
+            need.setdefault(src, [])
+            need[src] += [c for c in cols if c not in need[src]]
+    out = {}
+    for src, cols in need.items():
+        df = tables.get(src, pd.DataFrame())
+        proj = pd.DataFrame({c: df[c] for c in cols if c in df.columns})
+        for c in proj.columns:
+            proj[c] = (
+                pd.to_numeric(proj[c], errors="coerce").astype("Int64") if c == "ev_year" else proj[c].astype("string")
+            )
+        out[src] = proj.reset_index(drop=True)
+    return out
+
+
+# -------------------------
+# Store
+# -------------------------
+
+
+class AggregateStore:
+    """Counts + source snapshots under `root`; one Parquet per aggregate."""
+
+    def __init__(self, root: str | Path = AGG_DIR, defs=DEFAULT_AGGREGATES, verify_every: int = AGG_VERIFY_EVERY):
+        self.root = Path(root)
+        self.defs = {d.name: d for d in defs}
+        self.verify_every = verify_every
+        self.counts: dict[str, pd.Series] = {}
+        self.state: dict = {}
+
+    # ---- persistence
+    def _snap_path(self, src: str) -> Path:
+        return self.root / f"_snap_{src}.parquet"
+
+    def load(self) -> bool:
+        """Load stored counts; False when any aggregate or snapshot is missing."""
+        state_path = self.root / "_state.json"
+        if not state_path.exists():
+            return False
+        self.state = json.loads(state_path.read_text())
+        try:
+            for name, d in self.defs.items():
+                df = pd.read_parquet(self.root / f"{name}.parquet")
+                self.counts[name] = pd.Series(
+                    df["n"].to_numpy(dtype="int64"), index=pd.MultiIndex.from_frame(df[list(d.keys)]), name="n"
+                )
+        except FileNotFoundError:
+            self.counts = {}
+            return False
+        return True
+
+    def _save(self, snap: dict[str, pd.DataFrame], **state) -> None:
+        for name, n in self.counts.items():
+            write_parquet(n.reset_index(), self.root / f"{name}.parquet")
+        for src, df in snap.items():
+            write_parquet(df, self._snap_path(src))
+        self.state = {**self.state, **state, "rows": {k: len(v) for k, v in snap.items()}}
+        tmp = self.root / "_state.json.tmp"
+        tmp.write_text(json.dumps(self.state, indent=2))
+        os.replace(tmp, self.root / "_state.json")
+
+    # ---- full recompute
+    def _compute(self, snap: dict[str, pd.DataFrame]) -> dict[str, pd.Series]:
+        ctx = dict(snap)
+        return {name: count_keys(d.contrib(ctx), d.keys).sort_index() for name, d in self.defs.items()}
+
+    def compute(self, tables: dict[str, pd.DataFrame]) -> dict[str, pd.Series]:
+        """Full recompute of every aggregate."""
+        return self._compute(_project(tables, self.defs.values()))
+
+    def rebuild(self, tables: dict[str, pd.DataFrame]) -> dict:
+        t0 = time.perf_counter()
+        snap = _project(tables, self.defs.values())
+        self.counts = self._compute(snap)
+        self._save(snap, generation=1, verified_generation=1)
+        return {"mode": "rebuild", "generation": 1, "seconds": round(time.perf_counter() - t0, 3)}
+
+    # ---- incremental
+    def update(self, tables: dict[str, pd.DataFrame], verify: bool | None = None) -> dict:
+        """
+        Apply the change set between the stored snapshot and `tables`. Falls back to a
+        rebuild when nothing is stored yet. Returns a summary dict (rows added/removed
+        per source, events re-derived, verification outcome).
+        """
+        if not self.load():
+            return self.rebuild(tables)
+        t0 = time.perf_counter()
+        new = _project(tables, self.defs.values())
+        old = {src: pd.read_parquet(self._snap_path(src)) for src in new}
+        old = {src: df.astype({c: new[src][c].dtype for c in df.columns if c in new[src]}) for src, df in old.items()}
+        changes = {src: row_changes(old[src], new[src]) for src in new}
+        touched = pd.Index(
+            pd.unique(pd.concat([df["ev_id"] for a, r in changes.values() for df in (a, r)], ignore_index=True))
+        )
+
+        # event-unit aggregates: re-derive touched events from both sides (shared across aggregates)
+        sub_old = {s: df[df["ev_id"].isin(touched)] for s, df in old.items()}
+        sub_new = {s: df[df["ev_id"].isin(touched)] for s, df in new.items()}
+        for name, d in self.defs.items():
+            if d.unit == "row":
+                added, removed = changes[d.source]
+                plus = count_keys(d.contrib({d.source: added}), d.keys)
+                minus = count_keys(d.contrib({d.source: removed}), d.keys)
+            else:
+                plus, minus = count_keys(d.contrib(sub_new), d.keys), count_keys(d.contrib(sub_old), d.keys)
+            self.counts[name] = _apply(self.counts[name], plus, minus)
+
+        generation = int(self.state.get("generation", 0)) + 1
+        summary = {
+            "mode": "delta",
+            "generation": generation,
+            "added": {s: len(a) for s, (a, _) in changes.items()},
+            "removed": {s: len(r) for s, (_, r) in changes.items()},
+            "events_touched": len(touched),
+        }
+        due = generation - int(self.state.get("verified_generation", 0)) >= self.verify_every
+        verified = self.state.get("verified_generation", 0)
+        if verify or (verify is None and due):
+            mismatches = self.verify(tables)
+            summary["mismatches"] = len(mismatches)
+            if len(mismatches):
+                self.counts = self.compute(tables)  # repair from the full recompute
+            verified = generation
+        self._save(new, generation=generation, verified_generation=verified)
+        summary["seconds"] = round(time.perf_counter() - t0, 3)
+        return summary
+
+    def verify(self, tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Rows (aggregate, key, stored, recomputed) where stored counts disagree with a full recompute."""
+        full = self.compute(tables)
+        rows = []
+        for name, expect in full.items():
+            got = self.counts.get(name, pd.Series(dtype="int64"))
+            both = pd.concat([got.rename("stored"), expect.rename("recomputed")], axis=1).fillna(0)
+            bad = both[both["stored"] != both["recomputed"]]
+            rows += [
+                {"aggregate": name, "key": k, "stored": int(s), "recomputed": int(r)} for k, s, r in bad.itertuples()
+            ]
+        return pd.DataFrame(rows, columns=["aggregate", "key", "stored", "recomputed"])
+
+
+# -------------------------
+# Views (dashboard-shaped tables from the counts)
+# -------------------------
+
+
+def _slice(
+    n: pd.Series, years: tuple[int, int] | None = None, severity: list[str] | None = None, dropna: bool = False
+) -> pd.DataFrame:
+    df = n.reset_index()
+    if dropna:
+        df = df[~df[[c for c in n.index.names if c not in INT_KEYS]].eq(NA_KEY).any(axis=1)]
+    if years is not None and "ev_year" in df.columns:
+        df = df[df["ev_year"].between(years[0], years[1])]
+    if severity and "ev_highest_injury" in df.columns:
+        df = df[df["ev_highest_injury"].isin(severity)]
+    return df
+
+
+def system_bucket_view(counts: dict[str, pd.Series], years=None, severity=None) -> pd.DataFrame:
+    """Same shape as the app's system bucket table (fatals, total, pct_fatal)."""
+    df = _slice(counts["system_bucket_fatality"], years, severity)
+    df = df.assign(fatal_n=np.where(_fatal(df["ev_highest_injury"]), df["n"], 0))
+    ct = df.groupby("system_bucket").agg(fatals=("fatal_n", "sum"), total=("n", "sum")).reset_index()
+    ct["pct_fatal"] = np.where(ct["total"] > 0, 100.0 * ct["fatals"] / ct["total"], 0.0)
+    return ct.sort_values("pct_fatal", ascending=False, kind="mergesort").reset_index(drop=True)
+
+
+def flight_controls_view(counts: dict[str, pd.Series], years=None, severity=None) -> pd.DataFrame:
+    """2x2 of Flight controls vs Other x Nonfatal vs Fatal."""
+    df = _slice(counts["flight_controls_2x2"], years, severity)
+    df = df.assign(is_fatal=_fatal(df["ev_highest_injury"]).to_numpy())
+    xt = df.pivot_table(index="is_fc", columns="is_fatal", values="n", aggfunc="sum", fill_value=0)
+    xt = xt.reindex(index=[False, True], columns=[False, True], fill_value=0).astype("int64")
+    xt.index = ["Other systems", "Flight controls"]
+    xt.columns = ["Nonfatal", "Fatal"]
+    return xt
+
+
+def category_injury_view(counts: dict[str, pd.Series], years=None, severity=None) -> pd.DataFrame:
+    df = _slice(counts["category_injury"], years, severity, dropna=True)
+    ct = df.pivot_table(index="finding_category", columns="ev_highest_injury", values="n", aggfunc="sum", fill_value=0)
+    ct.columns.name = "ev_highest_injury"
+    return ct.assign(_FATL=lambda d: d.get("FATL", 0)).sort_values("_FATL", ascending=False).drop(columns=["_FATL"])
+
+
+def phase_occurrence_view(counts: dict[str, pd.Series], top: int = 25) -> tuple[pd.DataFrame, list, list]:
+    """Same outputs as dashboard.phase_occurrence_counts on the unfiltered sequence table."""
+
+    def top_of(n: pd.Series) -> list:
+        s = pd.Series(n.to_numpy(), index=n.index.get_level_values(0))
+        return s.drop(NA_KEY, errors="ignore").sort_values(ascending=False, kind="mergesort").head(top).index.tolist()
+
+    top_occ = top_of(counts["occurrence_counts"])
+    top_phase = top_of(counts["phase_counts"])
+    heat = _slice(counts["phase_occurrence"], dropna=True).rename(columns={"n": "count"})
+    heat = heat[heat["occurrence_meaning"].isin(top_occ) & heat["phase_meaning"].isin(top_phase)]
+    return heat.reset_index(drop=True), top_phase, top_occ
+
+
+def year_strata_view(counts: dict[str, pd.Series], years=None, severity=None) -> tuple[pd.DataFrame, np.ndarray]:
+    """(keys, K x 2 x 2) by ev_year in the stratified_counts layout, for Mantel-Haenszel."""
+    df = _slice(counts["flight_controls_2x2"], years, severity)
+    df = df[df["ev_year"].ne(NA_YEAR)]
+    fatal = _fatal(df["ev_highest_injury"]).to_numpy()
+    cell = 2 * (~df["is_fc"].to_numpy(dtype=bool)) + (~fatal)
+    keys = pd.DataFrame({"ev_year": np.sort(df["ev_year"].unique())})
+    codes = np.searchsorted(keys["ev_year"].to_numpy(), df["ev_year"].to_numpy())
+    flat = np.bincount(codes * 4 + cell, weights=df["n"].to_numpy(), minlength=len(keys) * 4)
+    return keys, flat.astype("int64").reshape(len(keys), 2, 2)
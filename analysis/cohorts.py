@@ -0,0 +1,282 @@
+# analysis/cohorts.py
+"""
+Sparse event x feature matrix for cohort definitions.
+
+Each event (row, sorted ev_id) gets a 1 in every feature column it has:
+
+  finding:<finding_code>       any finding with that code
+  category:<finding_category>  any finding in that category
+  occ:<eventsoe_no>            any sequence occurrence with that code
+  phase:<phase_no>             any sequence occurrence in that phase
+  occ_phase:<Occurrence_Code>  that occurrence in that phase (phase_no * 1000 + eventsoe_no)
+  tag:<name>                   any finding description matching the tag's keywords
+
+The matrix is built once per build as CSR and persisted with its row (ev_id) and
+column (feature name) dictionaries. Cohort queries read columns from a CSC copy,
+so "finding:X AND occ_phase:Y AND NOT tag:procedural" is a few index gathers
+rather than a merge/groupby chain, and the result is a boolean mask over events
+that can go straight into the 2x2 / stratified counts and the sparse logit.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from loaders import occurrence_parts
+from search import evaluate_query
+
+from .logit_models import _newton_logit
+from .sequences import fatal_by_event
+
+PROCEDURAL_KEYWORDS = [
+    "CHECKLIST",
+    "PROCEDURE",
+    "SOP",
+    "STANDARD OPERATING PROCEDURE",
+    "BRIEFING",
+    "BRIEF",
+    "CALLOUT",
+    "CALL OUT",
+    "INSPECTION",
+    "INSPECT",
+    "MAINTENANCE PROCEDURE",
+    "CONFIGURATION",
+    "CONFIGURE",
+    "VERIFY",
+    "VERIFICATION",
+    "CROSSCHECK",
+    "CROSS-CHECK",
+    "CROSS CHECK",
+    "USE OF EQUIP/INFO",  # eADMS phrasing
+    "TASK PERFORMANCE-USE OF EQUIP",  # category string fragment
+]
+
+# tag name -> keywords matched as case-insensitive substrings of finding_description
+KEYWORD_TAGS: dict[str, list[str]] = {"procedural": PROCEDURAL_KEYWORDS}
+
+
+def keyword_mask(text: pd.Series, keywords: Iterable[str]) -> np.ndarray:
+    """Rows whose text contains any keyword (case-insensitive substring), evaluated once per distinct text."""
+    codes, uniques = pd.factorize(text.astype("string"))
+    pattern = re.compile("|".join(re.escape(k.upper()) for k in keywords))
+    hit = np.fromiter((bool(pattern.search(u.upper())) for u in uniques), dtype=bool, count=len(uniques))
+    return np.append(hit, False)[codes]
+
+
+def _pairs(ev_id: pd.Series, values: pd.Series, prefix: str) -> pd.DataFrame:
+    v = values.astype("string").str.strip()
+    keep = ev_id.notna().to_numpy() & v.notna().to_numpy() & v.ne("").fillna(False).to_numpy()
+    return pd.DataFrame({"ev_id": ev_id[keep].astype("string").to_numpy(), "feature": (prefix + v[keep]).to_numpy()})
+
+
+@dataclass(frozen=True)
+class FeatureMatrix:
+    X: sparse.csr_matrix  # events x features, int8 0/1
+    ev_ids: np.ndarray  # row dictionary (sorted)
+    features: np.ndarray  # column dictionary (sorted)
+
+    @classmethod
+    def build(
+        cls,
+        events: pd.DataFrame,
+        findings: pd.DataFrame,
+        seq: pd.DataFrame,
+        tags: Mapping[str, Iterable[str]] | None = None,
+    ) -> FeatureMatrix:
+        """Rows are every ev_id of the three tables; columns are the distinct features present."""
+        tags = KEYWORD_TAGS if tags is None else tags
+        phase_no, eventsoe_no = occurrence_parts(seq)  # split from Occurrence_Code when the columns are absent
+        pairs = [
+            _pairs(findings["ev_id"], findings["finding_code"], "finding:"),
+            _pairs(findings["ev_id"], findings["finding_category"], "category:"),
+            _pairs(seq["ev_id"], eventsoe_no, "occ:"),
+            _pairs(seq["ev_id"], phase_no, "phase:"),
+        ]
+        if "Occurrence_Code" in seq.columns:
+            pairs.append(_pairs(seq["ev_id"], seq["Occurrence_Code"], "occ_phase:"))
+        for name, keywords in tags.items():
+            hit = keyword_mask(findings["finding_description"], keywords)
+            ev = findings["ev_id"][hit]
+            pairs.append(_pairs(ev, pd.Series(name, index=ev.index), "tag:"))
+        p = pd.concat(pairs, ignore_index=True)
+
+        ev_ids = pd.Index(pd.concat([events["ev_id"], findings["ev_id"], seq["ev_id"]]).astype("string").dropna())
+        ev_ids = np.asarray(ev_ids.unique().sort_values(), dtype=str)
+        col, features = pd.factorize(p["feature"], sort=True)
+        row = np.searchsorted(ev_ids, p["ev_id"].to_numpy(dtype=str))
+        X = sparse.csr_matrix(
+            (np.ones(len(p), dtype=np.int8), (row, col)), shape=(len(ev_ids), len(features)), dtype=np.int8
+        )
+        X.data[:] = 1  # duplicates were summed
+        return cls(X=X, ev_ids=ev_ids, features=np.asarray(features, dtype=str))
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+
+    def save(self, path: str | Path) -> None:
+        """Atomic .npz write of the CSR structure plus both dictionaries."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, indptr=self.X.indptr, indices=self.X.indices, ev_ids=self.ev_ids, features=self.features)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> FeatureMatrix:
+        with np.load(path, allow_pickle=False) as z:
+            ev_ids, features, indices = z["ev_ids"], z["features"], z["indices"]
+            X = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.int8), indices, z["indptr"]), shape=(len(ev_ids), len(features))
+            )
+        return cls(X=X, ev_ids=ev_ids, features=features)
+
+    # -------------------------
+    # Dictionaries
+    # -------------------------
+
+    @property
+    def n_events(self) -> int:
+        return len(self.ev_ids)
+
+    @cached_property
+    def _csc(self) -> sparse.csc_matrix:
+        return self.X.tocsc()
+
+    def column(self, feature: str) -> int:
+        """Column of `feature`; KeyError when absent."""
+        j = int(np.searchsorted(self.features, feature))
+        if j == len(self.features) or self.features[j] != feature:
+            raise KeyError(feature)
+        return j
+
+    def columns(self, prefix: str) -> np.ndarray:
+        """Columns whose feature name starts with `prefix` (e.g. "finding:2041", "occ:")."""
+        lo, hi = np.searchsorted(self.features, [prefix, prefix + "\U0010ffff"])
+        return np.arange(lo, hi)
+
+    def positions(self, ev_ids) -> np.ndarray:
+        """Row of each ev_id, -1 where the matrix has no such event."""
+        ev = np.asarray(pd.Series(ev_ids, dtype="string").fillna(""), dtype=str)
+        if not self.n_events:
+            return np.full(len(ev), -1)
+        i = np.minimum(np.searchsorted(self.ev_ids, ev), self.n_events - 1)
+        return np.where(self.ev_ids[i] == ev, i, -1)
+
+    # -------------------------
+    # Cohorts (boolean masks over rows)
+    # -------------------------
+
+    def _rows_of(self, cols) -> np.ndarray:
+        """Row indices of the given columns, concatenated (a CSC column slice)."""
+        return self._csc[:, np.asarray(cols, dtype=np.int64)].indices
+
+    def any_of(self, cols) -> np.ndarray:
+        m = np.zeros(self.n_events, dtype=bool)
+        m[self._rows_of(cols)] = True
+        return m
+
+    def all_of(self, cols) -> np.ndarray:
+        cols = np.unique(np.asarray(cols, dtype=np.int64))
+        return np.bincount(self._rows_of(cols), minlength=self.n_events) == len(cols)
+
+    def _leaf(self, tok: str) -> np.ndarray:
+        name = tok.strip('"')
+        if name.endswith("*"):
+            return self.any_of(self.columns(name[:-1]))
+        return self.any_of([self.column(name)])
+
+    def mask(self, query: str) -> np.ndarray:
+        """
+        Events matching a boolean feature query, e.g.
+        'finding:204151045 AND occ_phase:550250 AND NOT tag:procedural'. Adjacent terms
+        are ANDed; OR, NOT/-, parentheses, "quoted names" (for names with spaces) and
+        trailing-* prefixes ("category:Personnel*") work as in the finding text search.
+        Unknown feature names raise KeyError.
+        """
+        return evaluate_query(query, self._leaf, self.n_events)
+
+    def cohort(self, query: str) -> np.ndarray:
+        """ev_ids matching `query`."""
+        return self.ev_ids[self.mask(query)]
+
+    def flag(self, query: str, ev_ids) -> np.ndarray:
+        """`query` as a boolean column aligned to `ev_ids` (e.g. event_df["ev_id"]); unknown events are False."""
+        pos = self.positions(ev_ids)
+        return np.append(self.mask(query), False)[pos]
+
+    def counts(self, cols=None) -> pd.Series:
+        """Events per feature (all columns, or the given ones)."""
+        n = np.diff(self._csc.indptr)
+        cols = np.arange(len(self.features)) if cols is None else np.asarray(cols)
+        return pd.Series(n[cols], index=pd.Index(self.features[cols], name="feature"), name="events")
+
+
+# -------------------------
+# Feeding the stats and logit code
+# -------------------------
+
+
+def fatal_vector(fm: FeatureMatrix, event_df: pd.DataFrame, injury_col: str = "ev_highest_injury") -> np.ndarray:
+    """Fatal flag per matrix row (events missing from `event_df` count as nonfatal)."""
+    fatal = fatal_by_event(event_df, injury_col)
+    return fatal.reindex(pd.Index(fm.ev_ids), fill_value=False).to_numpy(dtype=bool)
+
+
+def cohort_2x2(
+    exposed: np.ndarray, outcome: np.ndarray, rows: np.ndarray | None = None, label: str = "Cohort"
+) -> pd.DataFrame:
+    """Exposed vs other x Fatal vs Nonfatal in the chisq_table layout, over `rows` (mask) if given."""
+    if rows is not None:
+        exposed, outcome = exposed[rows], outcome[rows]
+    counts = np.bincount(2 * (~exposed) + (~outcome), minlength=4).reshape(2, 2)
+    return pd.DataFrame(counts, index=[label, "Other"], columns=["Fatal", "Nonfatal"])
+
+
+def fit_cohort_logit(
+    fm: FeatureMatrix,
+    outcome: np.ndarray,
+    exposures: Mapping[str, str],
+    rows: np.ndarray | None = None,
+) -> pd.DataFrame:
+    """
+    outcome ~ 1 + one indicator per named cohort query, fitted with the sparse Newton
+    solver of logit_models over `rows` (mask) of the matrix. Returns term/coef/se/OR/CI/p.
+    """
+    from scipy.stats import norm
+
+    keep = np.ones(fm.n_events, dtype=bool) if rows is None else np.asarray(rows, dtype=bool)
+    idx = np.flatnonzero(keep)
+    cols = [np.ones(len(idx))] + [fm.mask(q)[idx].astype(float) for q in exposures.values()]
+    X = sparse.csr_matrix(np.column_stack(cols))
+    terms = ["Intercept", *exposures]
+    try:
+        beta, cov, ok = _newton_logit(X, outcome[idx].astype(float))
+        se = np.sqrt(np.diag(cov))
+    except np.linalg.LinAlgError:
+        beta, se, ok = np.full(len(terms), np.nan), np.full(len(terms), np.nan), False
+    z = norm.ppf(0.975)
+    return pd.DataFrame(
+        {
+            "term": terms,
+            "coef": beta,
+            "se": se,
+            "OR": np.exp(beta),
+            "OR_ci_low": np.exp(beta - z * se),
+            "OR_ci_high": np.exp(beta + z * se),
+            "p": 2 * norm.sf(np.abs(beta / se)),
+            "n": len(idx),
+            "converged": ok,
+        }
+    )
@@ -0,0 +1,216 @@
+# analysis/dashboard.py
+"""
+Filtering and table builders behind the Streamlit dashboard, kept free of Streamlit so
+the app and the benchmark harness share one implementation. FilterSpec here is the
+app's sidebar state (sequence and finding filters included), not the event-level
+analysis.system_risk.FilterSpec.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2_contingency
+
+from analysis.system_buckets import event_level_with_system_flags
+from search import ModelIndex, TextIndex
+
+
+@dataclass
+class FilterSpec:
+    years: tuple[int, int] | None = None
+    severity: list[str] | None = None
+    phases: list[str] | None = None
+    occurrences: list[str] | None = None
+    defining_only: bool = False
+    makes: list[str] | None = None
+    model_contains: str | None = None
+    parts: list[str] | None = None  # FAR parts, compared as strings
+    text_query: str | None = None  # finding_description search (search.TextIndex syntax)
+
+
+# -------------------------------
+# Filtering
+# -------------------------------
+def _between_years(df: pd.DataFrame, years: tuple[int, int]) -> np.ndarray:
+    if df.empty or "ev_year" not in df.columns or years is None:
+        return np.ones(len(df), dtype=bool)
+    y = pd.to_numeric(df["ev_year"], errors="coerce")
+    return _mask((y >= years[0]) & (y <= years[1]))
+
+
+def _mask(m: pd.Series) -> np.ndarray:
+    """Boolean row mask with missing comparisons treated as False (as boolean indexing does)."""
+    return m.fillna(False).to_numpy(dtype=bool)
+
+
+def filter_rows(
+    event_df, finding_df, seq_df, spec: FilterSpec, models: ModelIndex | None = None, texts: TextIndex | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Row positions of event_df, finding_df and seq_df passing `spec`; nothing is copied, so a
+    filter state costs a few integer arrays to keep (slice with .iloc when the view is used).
+    """
+    # index-backed finding filters first: masks over finding_df positions, not string scans
+    fl = np.ones(len(finding_df), dtype=bool)
+    if spec.text_query and "finding_description" in finding_df.columns:
+        if texts is None or texts.n_rows != len(finding_df):
+            texts = TextIndex.build(finding_df["finding_description"])
+        fl &= texts.row_mask(spec.text_query)
+    if spec.model_contains and "acft_model" in finding_df.columns:
+        if models is not None and models.n_rows == len(finding_df):
+            fl &= models.row_mask(spec.model_contains)
+        else:
+            fl &= (
+                finding_df["acft_model"]
+                .str.contains(spec.model_contains, case=False, na=False, regex=False)
+                .to_numpy(dtype=bool)
+            )
+
+    ev = _between_years(event_df, spec.years)
+    fl &= _between_years(finding_df, spec.years)
+    sq = _between_years(seq_df, spec.years)
+
+    # severity on event & finding if present
+    if spec.severity:
+        if "ev_highest_injury" in event_df.columns:
+            ev &= _mask(event_df["ev_highest_injury"].isin(spec.severity))
+        if "ev_highest_injury" in finding_df.columns:
+            fl &= _mask(finding_df["ev_highest_injury"].isin(spec.severity))
+
+    # FAR part (if you've labeled it; handles either numeric or string)
+    if spec.parts and "far_part" in event_df.columns:
+        ev &= _mask(event_df["far_part"].astype(str).isin(spec.parts))
+    if spec.parts and "far_part" in finding_df.columns:
+        fl &= _mask(finding_df["far_part"].astype(str).isin(spec.parts))
+    if spec.parts and "far_part" in seq_df.columns:
+        sq &= _mask(seq_df["far_part"].astype(str).isin(spec.parts))
+
+    # sequence filters
+    if spec.defining_only and "Defining_ev" in seq_df.columns:
+        sq &= _mask(seq_df["Defining_ev"] == 1)
+    if spec.phases and "phase_meaning" in seq_df.columns:
+        sq &= _mask(seq_df["phase_meaning"].isin(spec.phases))
+    if spec.occurrences and "occurrence_meaning" in seq_df.columns:
+        sq &= _mask(seq_df["occurrence_meaning"].isin(spec.occurrences))
+
+    # finding-level make (model substring handled above)
+    if spec.makes and "acft_make" in finding_df.columns:
+        fl &= _mask(finding_df["acft_make"].isin(spec.makes))
+
+    return np.flatnonzero(ev), np.flatnonzero(fl), np.flatnonzero(sq)
+
+
+def apply_filters(
+    event_df, finding_df, seq_df, spec: FilterSpec, models: ModelIndex | None = None, texts: TextIndex | None = None
+):
+    ev, fl, sq = filter_rows(event_df, finding_df, seq_df, spec, models, texts)
+    return event_df.iloc[ev], finding_df.iloc[fl], seq_df.iloc[sq]
+
+
+# -------------------------------
+# System Risk tables
+# -------------------------------
+def system_risk_tables(event_f: pd.DataFrame, finding_f: pd.DataFrame, evx: pd.DataFrame | None = None):
+    if evx is None:
+        evx = event_level_with_system_flags(event_f, finding_f)
+    if evx.empty or "ev_highest_injury" not in evx.columns:
+        return pd.DataFrame(), pd.DataFrame(), {}
+
+    # --- System bucket contingency (event-level) ---
+    ct = pd.DataFrame()
+    if "system_bucket" in evx.columns:
+        tmp = evx.dropna(subset=["system_bucket"]).copy()
+        fat_bool = tmp["ev_highest_injury"].astype("string").str.upper().eq("FATL")
+        tmp["is_fatal"] = np.where(fat_bool.fillna(False), 1, 0)
+
+        ct = (
+            tmp.groupby("system_bucket", dropna=False)
+            .agg(fatals=("is_fatal", "sum"), total=("is_fatal", "count"))
+            .reset_index()
+        )
+        ct["pct_fatal"] = np.where(ct["total"] > 0, 100.0 * ct["fatals"] / ct["total"], 0.0)
+        ct = ct.sort_values("pct_fatal", ascending=False, kind="mergesort")
+
+    # --- 2x2: Flight Controls vs Other x Fatal vs Nonfatal ---
+    xt = evx.copy()
+    fat_bool_all = xt["ev_highest_injury"].astype("string").str.upper().eq("FATL")
+    xt["is_fatal"] = fat_bool_all.fillna(False)
+    xt["is_fc"] = xt["has_flight_controls"].fillna(False).astype(bool)
+
+    xt = pd.crosstab(xt["is_fc"], xt["is_fatal"])
+    xt = xt.reindex(index=[False, True], columns=[False, True], fill_value=0)
+    xt.index = ["Other systems", "Flight controls"]
+    xt.columns = ["Nonfatal", "Fatal"]
+
+    return ct, xt, two_by_two_stats(xt)
+
+
+def _haldane_or(xt: pd.DataFrame) -> tuple[float, float, float]:
+    """Fatal odds ratio, Flight controls vs Other, with the Haldane-Anscombe +0.5 correction and its 95% CI."""
+    a, b = xt.loc["Other systems", ["Nonfatal", "Fatal"]].to_numpy()
+    c, d = xt.loc["Flight controls", ["Nonfatal", "Fatal"]].to_numpy()
+    a2, b2, c2, d2 = a + 0.5, b + 0.5, c + 0.5, d + 0.5
+    or_ = (d2 / c2) / (b2 / a2)
+    se = np.sqrt(1 / a2 + 1 / b2 + 1 / c2 + 1 / d2)
+    return or_, np.exp(np.log(or_) - 1.96 * se), np.exp(np.log(or_) + 1.96 * se)
+
+
+def two_by_two_stats(xt: pd.DataFrame) -> dict:
+    """
+    Chi-square / odds-ratio payload for the Flight controls vs Other 2x2. When the test
+    cannot run (a zero expected count) only the odds ratio is filled and "note" says why.
+    """
+    or_, lo, hi = _haldane_or(xt)
+    payload = {
+        "chi2": None,
+        "df": None,
+        "p_value": None,
+        "odds_ratio_FC_vs_Other": or_,
+        "or_95CI_low": lo,
+        "or_95CI_high": hi,
+        "expected_counts": None,
+        "std_residuals": None,
+        "note": None,
+    }
+    try:
+        chi2, p, dof, expected = chi2_contingency(xt.values, correction=False)
+    except ValueError as exc:
+        payload["note"] = f"{exc} — insufficient data for expected counts"
+        return payload
+    payload.update(
+        chi2=chi2,
+        df=dof,
+        p_value=p,
+        expected_counts=expected,
+        std_residuals=(xt.values - expected) / np.sqrt(expected),
+    )
+    return payload
+
+
+# -------------------------------
+# Sequence / finding tables
+# -------------------------------
+def phase_occurrence_counts(seq_f: pd.DataFrame, top: int = 25) -> tuple[pd.DataFrame, list, list]:
+    """Counts for the Phase x Occurrence heatmap, limited to the top-N phases and occurrences."""
+    top_occ = seq_f["occurrence_meaning"].value_counts().head(top).index.tolist()
+    top_phase = seq_f["phase_meaning"].value_counts().head(top).index.tolist()
+    heat = (
+        seq_f[seq_f["occurrence_meaning"].isin(top_occ) & seq_f["phase_meaning"].isin(top_phase)]
+        .groupby(["phase_meaning", "occurrence_meaning"])
+        .size()
+        .reset_index(name="count")
+    )
+    return heat, top_phase, top_occ
+
+
+def category_injury_table(finding_f: pd.DataFrame) -> pd.DataFrame:
+    """finding_category x ev_highest_injury counts, sorted by FATL."""
+    return (
+        pd.crosstab(finding_f["finding_category"], finding_f["ev_highest_injury"])
+        .assign(_FATL=lambda d: d.get("FATL", 0))
+        .sort_values("_FATL", ascending=False)
+        .drop(columns=["_FATL"])
+    )
@@ -0,0 +1,102 @@
+# analysis/enrichment.py
+"""
+Which phase x occurrence cells are over-represented among fatal events.
+
+Each (phase, occurrence) cell is tested as its own 2x2 over the events in the
+sequence table: events with the cell vs without, fatal vs nonfatal. Distinct
+(cell, event) pairs are counted with one bincount over cell * 2 + fatal, and the
+odds ratios, p-values (Pearson chi-square or two-sided mid-p exact) and
+Benjamini-Hochberg q-values are computed as array expressions over all cells at once.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, false_discovery_control, hypergeom, norm
+
+METHODS = ("chi2", "midp")
+
+
+def cell_event_counts(
+    seq: pd.DataFrame,
+    fatal: pd.Series,
+    row: str = "phase_meaning",
+    col: str = "occurrence_meaning",
+) -> tuple[pd.DataFrame, np.ndarray, int, int]:
+    """
+    (cell keys, K x 2 [fatal events, nonfatal events] per cell, events, fatal events).
+    `fatal` is a bool Series indexed by ev_id; events missing from it count as nonfatal.
+    Rows with a missing ev_id, phase or occurrence are ignored.
+    """
+    d = seq[[row, col, "ev_id"]].dropna()
+    ev_codes, ev_ids = pd.factorize(d["ev_id"].astype("string"))
+    cells = d[[row, col]].astype("string")
+    cell_codes, keys = pd.factorize(pd.MultiIndex.from_frame(cells))
+    is_fatal = fatal.reindex(pd.Index(ev_ids), fill_value=False).to_numpy(dtype=bool)
+
+    n_ev, k = len(ev_ids), len(keys)
+    pair = np.unique(cell_codes.astype(np.int64) * max(n_ev, 1) + ev_codes)
+    pair_cell, pair_ev = pair // max(n_ev, 1), pair % max(n_ev, 1)
+    counts = np.bincount(pair_cell * 2 + ~is_fatal[pair_ev], minlength=2 * k).reshape(k, 2)
+    keys = keys.to_frame(index=False, name=[row, col]) if k else pd.DataFrame(columns=[row, col])
+    return keys, counts, n_ev, int(is_fatal.sum())
+
+
+def _midp(a: np.ndarray, n_cell: np.ndarray, n: int, n_fatal: int) -> np.ndarray:
+    """Two-sided mid-p of Fisher's exact test: twice the smaller one-sided mid-p, capped at 1."""
+    h = hypergeom(n, n_fatal, n_cell)
+    half = 0.5 * h.pmf(a)
+    lower = h.cdf(a - 1) + half
+    upper = h.sf(a) + half
+    return np.minimum(1.0, 2 * np.minimum(lower, upper))
+
+
+def enrichment_scan(
+    seq: pd.DataFrame,
+    fatal: pd.Series,
+    method: str = "chi2",
+    min_events: int = 5,
+    row: str = "phase_meaning",
+    col: str = "occurrence_meaning",
+) -> pd.DataFrame:
+    """
+    One row per cell with at least `min_events` events: events, fatal_events, fatality_rate,
+    Haldane-corrected OR with 95% CI, log2_or, p (method "chi2" or "midp") and BH q over the
+    tested cells. Sorted by q, then by OR (largest first).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+    out_cols = [row, col, "events", "fatal_events", "fatality_rate", "OR", "OR_ci_low", "OR_ci_high", "log2_or"]
+    keys, counts, n, n_fatal = cell_event_counts(seq, fatal, row, col)
+    tested = counts.sum(axis=1) >= min_events
+    keys, counts = keys[tested].reset_index(drop=True), counts[tested]
+    if not len(counts):
+        return pd.DataFrame(columns=[*out_cols, "p", "q"])
+
+    a, b = counts[:, 0].astype(float), counts[:, 1].astype(float)  # with the cell: fatal, nonfatal
+    c, d = n_fatal - a, (n - n_fatal) - b  # without the cell
+    a2, b2, c2, d2 = a + 0.5, b + 0.5, c + 0.5, d + 0.5
+    log_or = np.log(a2 * d2 / (b2 * c2))
+    se = np.sqrt(1 / a2 + 1 / b2 + 1 / c2 + 1 / d2)
+    z = norm.ppf(0.975)
+
+    if method == "chi2":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stat = n * (a * d - b * c) ** 2 / ((a + b) * (c + d) * (a + c) * (b + d))
+        p = np.where(np.isfinite(stat), chi2.sf(stat, 1), 1.0)
+    else:
+        p = _midp(counts[:, 0], counts.sum(axis=1), n, n_fatal)
+
+    out = keys.assign(
+        events=counts.sum(axis=1),
+        fatal_events=counts[:, 0],
+        fatality_rate=a / (a + b),
+        OR=np.exp(log_or),
+        OR_ci_low=np.exp(log_or - z * se),
+        OR_ci_high=np.exp(log_or + z * se),
+        log2_or=log_or / np.log(2),
+        p=p,
+        q=false_discovery_control(p, method="bh"),
+    )
+    return out.sort_values(["q", "OR"], ascending=[True, False], ignore_index=True)
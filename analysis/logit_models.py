@@ -1,20 +1,29 @@
 # analysis/logit_models.py
+from __future__ import annotations
+
 from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import pairwise
 
 import numpy as np
 import pandas as pd
 import statsmodels.formula.api as smf
+from scipy import sparse
+from statsmodels.discrete.discrete_model import BinaryResultsWrapper
 
-from .system_risk import FilterSpec, _is_fatal, _normalize_system, filter_event_level
+from .model_cache import FitResult, ModelCache
+from .system_risk import FilterSpec, _is_fatal, _normalize_system, filter_event_level, spec_label
 
+LOGIT_FORMULA = "fatal ~ fc + C(far_part) + ev_year"
 
-def fit_logit(
+
+def _logit_frame(
     event_df: pd.DataFrame,
-    spec: FilterSpec | None = None,
-    system_col: str = "system_component",
-    injury_col: str = "ev_highest_injury",
-    controls: Sequence[str] | None = None,
-) -> smf.discrete.discrete_model.BinaryResultsWrapper:
+    spec: FilterSpec | None,
+    system_col: str,
+    injury_col: str,
+    controls: Sequence[str] | None,
+) -> pd.DataFrame:
     if spec is None:
         spec = FilterSpec()
     controls = list(controls or [])
@@ -34,10 +43,20 @@ def fit_logit(
     # (Drop super-sparse categories to avoid perfect separation.)
     d = d.dropna(subset=["fatal", "fc"])
     d["ev_year"] = pd.to_numeric(d["ev_year"], errors="coerce")
+    return d
+
+
+def fit_logit(
+    event_df: pd.DataFrame,
+    spec: FilterSpec | None = None,
+    system_col: str = "system_component",
+    injury_col: str = "ev_highest_injury",
+    controls: Sequence[str] | None = None,
+) -> tuple[BinaryResultsWrapper, pd.DataFrame]:
+    d = _logit_frame(event_df, spec, system_col, injury_col, controls)
 
     # Minimal controls; expand as data supports
-    f = "fatal ~ fc + C(far_part) + ev_year"
-    model = smf.logit(formula=f, data=d).fit(disp=False)
+    model = smf.logit(formula=LOGIT_FORMULA, data=d).fit(disp=False)
     # Return tidy summary + odds ratios
     or_df = pd.DataFrame(
         {
@@ -48,3 +67,218 @@ def fit_logit(
         }
     )
     return model, or_df.sort_values("term")
+
+
+def fit_logit_cached(
+    event_df: pd.DataFrame,
+    spec: FilterSpec | None = None,
+    system_col: str = "system_component",
+    injury_col: str = "ev_highest_injury",
+    controls: Sequence[str] | None = None,
+    cache: ModelCache | None = None,
+) -> tuple[FitResult, pd.DataFrame]:
+    """fit_logit through the on-disk ModelCache; keyed on the exact model frame, so any input change refits."""
+    cache = cache or ModelCache()
+    d = _logit_frame(event_df, spec, system_col, injury_col, controls)
+    res = cache.logit(LOGIT_FORMULA, d[["fatal", "fc", "far_part", "ev_year"]])
+    return res, res.or_table
+
+
+# -------------------------
+# Batched fitting across many FilterSpecs
+# -------------------------
+
+
+@dataclass
+class LogitDesign:
+    """Sparse design for `fatal ~ fc + C(far_part) + ev_year`, built once for the full event table."""
+
+    X: sparse.csr_matrix  # columns: Intercept, fc, ev_year - year_center, one-hot far_part levels
+    y: np.ndarray
+    terms: list[str]
+    levels: list[str]  # far_part levels, sorted (patsy treatment order)
+    complete: np.ndarray  # rows usable by the formula (no NA in outcome/covariates)
+    year: np.ndarray  # float, NaN where missing
+    part_codes: np.ndarray  # index into `levels`, -1 where missing
+    rotor: np.ndarray  # acft_category contains ROTOR
+    year_center: float  # ev_year is centered in X for conditioning; coefficients are reported uncentered
+
+    def mask(self, spec: FilterSpec) -> np.ndarray:
+        """Same rows as filter_event_level(spec), computed from the pre-decoded arrays."""
+        with np.errstate(invalid="ignore"):
+            m = (self.year >= spec.years[0]) & (self.year <= spec.years[1])
+        if spec.include_far_parts:
+            wanted = [i for i, v in enumerate(self.levels) if v in spec.include_far_parts]
+            m &= np.isin(self.part_codes, wanted)
+        if spec.exclude_rotorcraft:
+            m &= ~self.rotor
+        return m
+
+
+def build_logit_design(
+    event_df: pd.DataFrame,
+    system_col: str = "system_component",
+    injury_col: str = "ev_highest_injury",
+) -> LogitDesign:
+    missing = [c for c in [system_col, injury_col, "ev_year", "far_part"] if c not in event_df.columns]
+    if missing:
+        raise KeyError(f"Missing columns for logit: {missing}")
+
+    fatal = _is_fatal(event_df[injury_col]).fillna(False).to_numpy(dtype=float)
+    fc = _normalize_system(event_df[system_col]).eq("Flight Control").fillna(False).to_numpy(dtype=float)
+    year = pd.to_numeric(event_df["ev_year"], errors="coerce").to_numpy(dtype=float)
+    try:  # sort levels in the column's own dtype, as patsy does (91 < 121 for a numeric far_part)
+        codes, levels = pd.factorize(event_df["far_part"], sort=True)
+    except TypeError:  # mixed types: fall back to string order
+        codes, levels = pd.factorize(event_df["far_part"].astype("string"), sort=True)
+
+    complete = (codes >= 0) & ~np.isnan(year)
+    n, k = len(event_df), len(levels)
+    center = float(np.nanmean(year[complete])) if complete.any() else 0.0
+    dense = sparse.csr_matrix(np.column_stack([np.ones(n), fc, np.nan_to_num(year - center)]))
+    rows = np.flatnonzero(codes >= 0)
+    onehot = sparse.csr_matrix((np.ones(len(rows)), (rows, codes[rows])), shape=(n, k))
+    X = sparse.hstack([dense, onehot], format="csr")
+
+    levels = [str(v) for v in levels]
+    terms = ["Intercept", "fc", "ev_year", *[f"C(far_part)[T.{v}]" for v in levels]]
+    if "acft_category" in event_df.columns:
+        rotor = event_df["acft_category"].astype("string").str.contains("ROTOR", case=False, na=False)
+        rotor = rotor.to_numpy(dtype=bool)
+    else:
+        rotor = np.zeros(n, dtype=bool)
+    return LogitDesign(
+        X=X,
+        y=fatal,
+        terms=terms,
+        levels=levels,
+        complete=complete,
+        year=year,
+        part_codes=codes,
+        rotor=rotor,
+        year_center=center,
+    )
+
+
+def _newton_logit(
+    X: sparse.csr_matrix,
+    y: np.ndarray,
+    beta0: np.ndarray | None = None,
+    tol: float = 1e-8,
+    max_iter: int = 50,
+) -> tuple[np.ndarray, np.ndarray, bool]:
+    """Newton-Raphson (== IRLS for the canonical link); returns (beta, covariance, converged)."""
+    p = X.shape[1]
+    beta = np.zeros(p) if beta0 is None else beta0.copy()
+    converged = False
+    for _ in range(max_iter):
+        eta = X @ beta
+        mu = 1.0 / (1.0 + np.exp(-eta))
+        w = mu * (1.0 - mu)
+        grad = X.T @ (y - mu)
+        H = (X.T @ X.multiply(w[:, None])).toarray()
+        step = np.linalg.solve(H, grad)
+        beta = beta + step
+        if np.max(np.abs(step)) < tol:
+            converged = True
+            break
+    mu = 1.0 / (1.0 + np.exp(-(X @ beta)))
+    H = (X.T @ X.multiply((mu * (1.0 - mu))[:, None])).toarray()
+    return beta, np.linalg.inv(H), converged
+
+
+def _fit_one(design: LogitDesign, spec: FilterSpec, warm: dict[str, float] | None) -> pd.DataFrame:
+    from scipy.stats import norm
+
+    rows = np.flatnonzero(design.mask(spec) & design.complete)
+    X = design.X[rows]
+    y = design.y[rows]
+
+    # Mirror patsy: only far_part levels present in the subset, first one is the reference
+    present = np.flatnonzero(np.asarray(X[:, 3:].sum(axis=0)).ravel() > 0)
+    cols = [0, 1, *[3 + j for j in present[1:]], 2]
+    terms = [design.terms[c] for c in cols]
+    X = X[:, cols]
+
+    # Map centered <-> reported coefficients: Intercept = b0 - center * b_year
+    T = np.eye(len(terms))
+    T[0, -1] = -design.year_center
+    beta0 = np.linalg.solve(T, [warm.get(t, 0.0) for t in terms]) if warm else None
+    try:
+        beta, cov, ok = _newton_logit(X, y, beta0)
+        if not np.all(np.isfinite(beta)) and beta0 is not None:
+            beta, cov, ok = _newton_logit(X, y)
+        beta, cov = T @ beta, T @ cov @ T.T
+        se = np.sqrt(np.diag(cov))
+    except np.linalg.LinAlgError:
+        beta, se, ok = np.full(len(terms), np.nan), np.full(len(terms), np.nan), False
+
+    z = norm.ppf(0.975)
+    return pd.DataFrame(
+        {
+            "spec": spec_label(spec),
+            "term": terms,
+            "coef": beta,
+            "se": se,
+            "OR": np.exp(beta),
+            "OR_ci_low": np.exp(beta - z * se),
+            "OR_ci_high": np.exp(beta + z * se),
+            "p": 2 * norm.sf(np.abs(beta / se)),
+            "n": len(rows),
+            "converged": ok,
+        }
+    )
+
+
+def _fit_chunk(design: LogitDesign, specs: Sequence[FilterSpec]) -> list[pd.DataFrame]:
+    # Warm-start each solve from the previous spec's coefficients (neighbouring cohorts are close)
+    out, warm = [], None
+    for s in specs:
+        res = _fit_one(design, s, warm)
+        if res["converged"].all():
+            warm = dict(zip(res["term"], res["coef"], strict=True))
+        out.append(res)
+    return out
+
+
+_WORKER_DESIGN: LogitDesign | None = None
+
+
+def _init_worker(design: LogitDesign) -> None:
+    global _WORKER_DESIGN
+    _WORKER_DESIGN = design
+
+
+def _fit_chunk_worker(specs: Sequence[FilterSpec]) -> list[pd.DataFrame]:
+    return _fit_chunk(_WORKER_DESIGN, specs)
+
+
+def fit_logit_batch(
+    event_df: pd.DataFrame | LogitDesign,
+    specs: Sequence[FilterSpec],
+    system_col: str = "system_component",
+    injury_col: str = "ev_highest_injury",
+    workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    Fit the fit_logit model for every spec and return one tidy OR/CI/p table keyed by `spec`.
+    The design matrix is built once; each spec is a row mask. workers > 1 fans chunks out to a process pool.
+    """
+    design = event_df if isinstance(event_df, LogitDesign) else build_logit_design(event_df, system_col, injury_col)
+    specs = list(specs)
+    if not specs:
+        return pd.DataFrame(
+            columns=["spec", "term", "coef", "se", "OR", "OR_ci_low", "OR_ci_high", "p", "n", "converged"]
+        )
+
+    if not workers or workers <= 1 or len(specs) == 1:
+        frames = _fit_chunk(design, specs)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        n_chunks = min(workers, len(specs))
+        bounds = np.linspace(0, len(specs), n_chunks + 1).astype(int)
+        chunks = [specs[lo:hi] for lo, hi in pairwise(bounds)]
+        with ProcessPoolExecutor(max_workers=n_chunks, initializer=_init_worker, initargs=(design,)) as ex:
+            frames = [f for res in ex.map(_fit_chunk_worker, chunks) for f in res]
+    return pd.concat(frames, ignore_index=True)
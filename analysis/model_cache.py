@@ -0,0 +1,130 @@
+# analysis/model_cache.py
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+
+from config import MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES
+
+
+@dataclass
+class FitResult:
+    """What we keep from a fitted model: enough to report without refitting."""
+
+    formula: str
+    params: pd.Series
+    cov: pd.DataFrame
+    pvalues: pd.Series
+    nobs: int
+    summary_text: str
+    or_table: pd.DataFrame
+
+    @classmethod
+    def from_model(cls, formula: str, model) -> FitResult:
+        or_table = pd.DataFrame(
+            {
+                "term": model.params.index,
+                "coef": model.params.values,
+                "OR": np.exp(model.params.values),
+                "p": model.pvalues.values,
+            }
+        ).sort_values("term")
+        return cls(
+            formula=formula,
+            params=model.params.copy(),
+            cov=model.cov_params().copy(),
+            pvalues=model.pvalues.copy(),
+            nobs=int(model.nobs),
+            summary_text=model.summary().as_text(),
+            or_table=or_table,
+        )
+
+
+def fingerprint(data: pd.DataFrame, formula: str, options: dict | None = None) -> str:
+    """
+    Hash the exact rows/columns used plus the formula and solver options.
+    Any change in values, row order, column set or dtypes yields a new key.
+    """
+    h = hashlib.sha256()
+    h.update(formula.encode())
+    h.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+    h.update(json.dumps([[str(c), str(t)] for c, t in data.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:32]
+
+
+class ModelCache:
+    """On-disk cache of FitResults keyed by fingerprint, evicting least-recently-used entries past max_bytes."""
+
+    def __init__(self, root: str | Path = MODEL_CACHE_DIR, max_bytes: int = MODEL_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def get(self, key: str) -> FitResult | None:
+        p = self._path(key)
+        try:
+            with open(p, "rb") as f:
+                res = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # truncated, or pickled under other pandas/statsmodels versions: a miss, and drop the entry
+            p.unlink(missing_ok=True)
+            return None
+        with contextlib.suppress(FileNotFoundError):  # another process may have evicted it meanwhile
+            os.utime(p)  # mark as recently used
+        return res
+
+    def put(self, key: str, result: FitResult) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+        self.evict()
+
+    def evict(self) -> None:
+        # other --workers processes share the directory and may delete entries while we scan
+        entries = []
+        for p in self.root.glob("*.pkl"):
+            with contextlib.suppress(FileNotFoundError):
+                st = p.stat()
+                entries.append((st.st_mtime, st.st_size, p))
+        entries.sort(key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            p.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for p in self.root.glob("*.pkl"):
+            p.unlink(missing_ok=True)
+
+    def logit(self, formula: str, data: pd.DataFrame, **fit_kwargs) -> FitResult:
+        """Return the cached fit for (data, formula, fit_kwargs), fitting with statsmodels on a miss."""
+        fit_kwargs.setdefault("disp", False)
+        key = fingerprint(data, formula, {"model": "logit", **fit_kwargs})
+        hit = self.get(key)
+        if hit is not None:
+            return hit
+        res = FitResult.from_model(formula, smf.logit(formula, data=data).fit(**fit_kwargs))
+        self.put(key, res)
+        return res
@@ -0,0 +1,160 @@
+# analysis/sequences.py
+"""
+Occurrence-chain analytics over events_sequence_labeled.
+
+The sequence table is sorted once by (ev_id, Aircraft_Key, Occurrence_No) and
+reduced to integer arrays: one occurrence code per row plus chain offsets (a chain
+is one aircraft's ordered occurrences in one event). Transitions and n-grams are
+then shifted views of the code array, kept where both ends fall in the same chain,
+and counted with bincount/unique; no per-event Python loops.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SORT_KEYS = ["ev_id", "Aircraft_Key", "Occurrence_No"]
+START, END = "(start)", "(end)"
+
+
+@dataclass(frozen=True)
+class Chains:
+    codes: np.ndarray  # int32 occurrence code per row, rows in chain order
+    chain: np.ndarray  # int32 chain number per row
+    offsets: np.ndarray  # rows of chain c: codes[offsets[c] : offsets[c + 1]]
+    chain_ev: np.ndarray  # event code per chain
+    labels: np.ndarray  # occurrence label per code
+    ev_ids: np.ndarray  # ev_id per event code
+
+    @classmethod
+    def build(cls, seq: pd.DataFrame, label_col: str = "occurrence_meaning") -> Chains:
+        """Sort once and factorize; unlabeled occurrences fall back to their eventsoe_no."""
+        d = seq.sort_values(SORT_KEYS, kind="stable", na_position="last")
+        label = d[label_col].astype("string")
+        if "eventsoe_no" in d.columns:
+            label = label.fillna("code " + d["eventsoe_no"].astype("string"))
+        codes, labels = pd.factorize(label.fillna("(unlabeled)"))
+        ev_codes, ev_ids = pd.factorize(d["ev_id"].astype("string"))
+
+        key = d["Aircraft_Key"].fillna(-1).to_numpy(dtype=np.int64)
+        starts = np.ones(len(d), dtype=bool)
+        starts[1:] = (ev_codes[1:] != ev_codes[:-1]) | (key[1:] != key[:-1])
+        chain = (np.cumsum(starts) - 1).astype(np.int32)
+        offsets = np.append(np.flatnonzero(starts), len(d))
+        return cls(
+            codes=codes.astype(np.int32),
+            chain=chain,
+            offsets=offsets,
+            chain_ev=ev_codes[starts].astype(np.int32),
+            labels=np.asarray(labels, dtype=object),
+            ev_ids=np.asarray(ev_ids, dtype=object),
+        )
+
+    @property
+    def n_chains(self) -> int:
+        return len(self.offsets) - 1
+
+    def subset(self, ev_ids) -> Chains:
+        """Chains of the given events only (order, codes and labels preserved)."""
+        keep_ev = pd.Index(self.ev_ids).isin(pd.Index(ev_ids).astype("string"))
+        keep_chain = keep_ev[self.chain_ev]
+        rows = keep_chain[self.chain]
+        lens = np.diff(self.offsets)[keep_chain]
+        return Chains(
+            codes=self.codes[rows],
+            chain=np.repeat(np.arange(len(lens), dtype=np.int32), lens),
+            offsets=np.append(0, np.cumsum(lens)),
+            chain_ev=self.chain_ev[keep_chain],
+            labels=self.labels,
+            ev_ids=self.ev_ids,
+        )
+
+    def windows(self, n: int) -> np.ndarray:
+        """Start rows of every length-n window lying inside one chain."""
+        if n < 1 or len(self.codes) < n:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.chain[: len(self.chain) - n + 1] == self.chain[n - 1 :])
+
+
+def transition_matrix(ch: Chains, normalize: bool = False, boundaries: bool = True) -> pd.DataFrame:
+    """
+    First-order transition counts from -> to between consecutive occurrences of a chain.
+    With `boundaries`, (start) -> first and last -> (end) are included; `normalize` gives row shares.
+    """
+    k = len(ch.labels)
+    a = ch.codes[:-1]
+    b = ch.codes[1:]
+    same = ch.chain[:-1] == ch.chain[1:]
+    src, dst = a[same], b[same]
+    names = list(ch.labels)
+    if boundaries and ch.n_chains:
+        s, e = k, k + 1
+        src = np.concatenate([src, np.full(ch.n_chains, s), ch.codes[ch.offsets[1:] - 1]])
+        dst = np.concatenate([dst, ch.codes[ch.offsets[:-1]], np.full(ch.n_chains, e)])
+        names += [START, END]
+    m = len(names)
+    counts = np.bincount(src.astype(np.int64) * m + dst, minlength=m * m).reshape(m, m)
+    out = pd.DataFrame(counts, index=pd.Index(names, name="from"), columns=pd.Index(names, name="to"))
+    if boundaries:
+        out = out.drop(index=END, columns=START, errors="ignore")
+    if normalize:
+        out = out.div(out.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+    return out
+
+
+def ngram_table(ch: Chains, n: int = 2, fatal: pd.Series | None = None, min_events: int = 1) -> pd.DataFrame:
+    """
+    Occurrence n-grams (consecutive within a chain): occurrences, distinct events
+    containing the chain, and (given `fatal`, a bool Series indexed by ev_id) how many
+    of those events were fatal. Sorted by events, most common first.
+    """
+    cols = ["chain", "n", "occurrences", "events", "fatal_events", "fatality_rate"]
+    w = ch.windows(n)
+    if not len(w):
+        return pd.DataFrame(columns=cols)
+    if len(ch.labels) ** n >= 2**63:
+        raise ValueError(f"{n}-grams over {len(ch.labels)} labels do not fit an int64 key")
+    k = np.int64(len(ch.labels))
+    key = np.zeros(len(w), dtype=np.int64)
+    for j in range(n):  # the n codes as one base-k number
+        key = key * k + ch.codes[w + j]
+    grams, inv, occ = np.unique(key, return_inverse=True, return_counts=True)
+
+    # distinct (gram, event) pairs -> events per gram and fatal events per gram
+    ev = ch.chain_ev[ch.chain[w]].astype(np.int64)
+    pair = np.unique(inv.astype(np.int64) * len(ch.ev_ids) + ev)
+    pair_gram, pair_ev = pair // len(ch.ev_ids), pair % len(ch.ev_ids)
+    events = np.bincount(pair_gram, minlength=len(grams))
+    if fatal is not None:
+        is_fatal = fatal.reindex(pd.Index(ch.ev_ids), fill_value=False).to_numpy(dtype=bool)
+        fatals = np.bincount(pair_gram, weights=is_fatal[pair_ev], minlength=len(grams)).astype(np.int64)
+    else:
+        fatals = np.zeros(len(grams), dtype=np.int64)
+
+    keep = events >= min_events
+    parts = []
+    g = grams[keep]
+    for _ in range(n):
+        parts.append(ch.labels[g % k])
+        g = g // k
+    chain = [" → ".join(t) for t in zip(*reversed(parts), strict=True)]
+    out = pd.DataFrame(
+        {
+            "chain": chain,
+            "n": n,
+            "occurrences": occ[keep],
+            "events": events[keep],
+            "fatal_events": fatals[keep],
+        }
+    )
+    out["fatality_rate"] = out["fatal_events"] / out["events"] if fatal is not None else np.nan
+    return out.sort_values(["events", "occurrences", "chain"], ascending=[False, False, True], ignore_index=True)[cols]
+
+
+def fatal_by_event(event_df: pd.DataFrame, injury_col: str = "ev_highest_injury") -> pd.Series:
+    """Fatal flag per ev_id (any aircraft of the event)."""
+    fatal = event_df[injury_col].astype("string").str.upper().str.strip().eq("FATL").fillna(False)
+    return fatal.groupby(event_df["ev_id"].astype("string")).any()
@@ -0,0 +1,138 @@
+# analysis/system_buckets.py
+"""
+Regex system buckets for findings and their event-level roll-up (top bucket per
+event, any-flight-controls flag). Shared by the app and the aggregate store.
+"""
+
+from __future__ import annotations
+
+import re
+
+import pandas as pd
+
+# Precompile and document precedence
+SYSTEM_PATTERNS = [
+    # NOTE: 'autopilot' lives here on purpose so it maps to Flight Controls.
+    (
+        "Flight Controls",
+        [
+            r"\bflight control",
+            r"\bailer",
+            r"\belevat",
+            r"\brudder",
+            r"\btrim\b",
+            r"\bflap",
+            r"\bspoiler",
+            r"\bslat",
+            r"\b(control column|yoke|stick)\b",
+            r"\bservo\b",
+            r"\bactuator\b(?!\s*fuel)",
+            r"\bcontrol\s*cable",
+            r"\bautopilot\b",
+        ],
+    ),
+    (
+        "Powerplant/Propulsion",
+        [
+            r"\b(power ?plant|engine)\b",
+            r"\bpropeller\b",
+            r"\bturbo(charger)?\b",
+            r"\bcompressor\b",
+            r"\bfuel (control|metering|nozzle|pump)\b",
+            r"\bignition\b",
+        ],
+    ),
+    (
+        "Hydraulic/Pneumatic",
+        [r"\bhydraul", r"\bpneumat", r"\baccumulator\b", r"\bactuator\b"],
+    ),
+    (
+        "Avionics/Electrical",
+        [
+            r"\bavionic",
+            r"\belectri",
+            r"\bbus\b",
+            r"\b(EFIS|PFD|MFD|FMS|ADC|IRS)\b",
+            r"\bradio\b",
+            r"\btransponder\b",
+            r"\bantenna\b",
+        ],
+    ),
+    (
+        "Landing Gear/Brakes",
+        [r"\blanding gear|\bgear\b", r"\bbrake", r"\btire\b|\bwheel\b|\bstrut\b"],
+    ),
+    (
+        "Airframe/Structures",
+        [r"\b(structure|airframe|fuselage|wing|empennage|spar|rib|skin)\b"],
+    ),
+    ("Fluids/Fuel/Oil", [r"\bfuel\b", r"\boil\b", r"\bhydraul"]),
+]
+SYSTEM_PATTERNS = [(name, [re.compile(p, re.I) for p in pats]) for name, pats in SYSTEM_PATTERNS]
+
+
+def _first_match_bucket(cat: str, desc: str | None = None) -> str | None:
+    text = cat or ""
+    if desc:
+        text += " " + desc
+    for bucket, pats in SYSTEM_PATTERNS:
+        if any(p.search(text) for p in pats):
+            return bucket
+    return None
+
+
+def add_system_buckets_to_findings(finding_f: pd.DataFrame) -> pd.DataFrame:
+    if finding_f.empty:
+        return finding_f
+    df = finding_f.copy()
+    # Choose the best text fields you have
+    cat_col = "finding_category" if "finding_category" in df.columns else "cat_text"
+    desc_col = "finding_description" if "finding_description" in df.columns else None
+    if cat_col not in df.columns:
+        df["system_bucket"] = pd.NA
+        return df
+
+    df["system_bucket"] = df.apply(
+        lambda r: _first_match_bucket(
+            str(r.get(cat_col, "")),
+            str(r.get(desc_col, "")) if desc_col in df.columns else None,
+        ),
+        axis=1,
+    )
+    return df
+
+
+# --- 2) Roll up to event level --------------------------------
+def event_level_with_system_flags(event_f: pd.DataFrame, finding_f: pd.DataFrame) -> pd.DataFrame:
+    if event_f.empty or finding_f.empty or "ev_id" not in event_f.columns or "ev_id" not in finding_f.columns:
+        return event_f.copy()
+
+    f = add_system_buckets_to_findings(finding_f)
+    # any flight-controls finding per event?
+    fc = (
+        f.assign(_is_fc=f["system_bucket"].eq("Flight Controls"))
+        .groupby("ev_id")["_is_fc"]
+        .max()
+        .astype(bool)
+        .rename("has_flight_controls")
+    )
+
+    # most frequent system bucket per event (for bar chart)
+    top_sys = (
+        f.dropna(subset=["system_bucket"])
+        .groupby(["ev_id", "system_bucket"])
+        .size()
+        .reset_index(name="n")
+        .sort_values(["ev_id", "n"], ascending=[True, False])
+        .drop_duplicates("ev_id")
+        .set_index("ev_id")["system_bucket"]
+        .rename("system_bucket")
+    )
+
+    ev2 = event_f.copy()
+    ev2 = ev2.merge(fc, how="left", left_on="ev_id", right_index=True)
+    ev2 = ev2.merge(top_sys, how="left", left_on="ev_id", right_index=True)
+    ev2["has_flight_controls"] = (
+        ev2["has_flight_controls"].astype("boolean").fillna(False)  # explicit dtype  # now safe
+    )
+    return ev2
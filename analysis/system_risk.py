@@ -1,7 +1,7 @@
 # analysis/system_risk.py
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 import numpy as np
 import pandas as pd
@@ -21,6 +21,7 @@ class FilterSpec:
     makes: list[str] | None = None
     model_contains: str | None = None
     parts: list[str] | None = None
+    text_query: str | None = None  # finding_description search; applied by the caller (needs the findings table)
 
 
 def _is_fatal(s: pd.Series) -> pd.Series:
@@ -47,20 +48,40 @@ def _normalize_system(s: pd.Series) -> pd.Series:
     return s.map(m).fillna(s.str.title())
 
 
-def filter_event_level(df: pd.DataFrame, spec: FilterSpec) -> pd.DataFrame:
+def filter_mask(df: pd.DataFrame, spec: FilterSpec) -> np.ndarray:
+    """Boolean row mask equivalent to filter_event_level (lets callers reuse one prepared table)."""
     if spec is None:
         spec = FilterSpec()
-    d = df.copy()
-    if "ev_year" in d:
-        d = d[
-            (pd.to_numeric(d["ev_year"], errors="coerce") >= spec.years[0])
-            & (pd.to_numeric(d["ev_year"], errors="coerce") <= spec.years[1])
-        ]
-    if spec.include_far_parts and "far_part" in d:
-        d = d[d["far_part"].astype("string").isin(spec.include_far_parts)]
-    if spec.exclude_rotorcraft and "acft_category" in d:
-        d = d[~d["acft_category"].astype("string").str.contains("ROTOR", case=False, na=False)]
-    return d
+    m = np.ones(len(df), dtype=bool)
+    if "ev_year" in df:
+        y = pd.to_numeric(df["ev_year"], errors="coerce")
+        m &= ((y >= spec.years[0]) & (y <= spec.years[1])).fillna(False).to_numpy(dtype=bool)
+    if spec.include_far_parts and "far_part" in df:
+        m &= df["far_part"].astype("string").isin(spec.include_far_parts).fillna(False).to_numpy(dtype=bool)
+    if spec.exclude_rotorcraft and "acft_category" in df:
+        rot = df["acft_category"].astype("string").str.contains("ROTOR", case=False, na=False)
+        m &= ~rot.to_numpy(dtype=bool)
+    return m
+
+
+def filter_event_level(df: pd.DataFrame, spec: FilterSpec) -> pd.DataFrame:
+    return df[filter_mask(df, spec)].copy()
+
+
+def spec_label(spec: FilterSpec) -> str:
+    """
+    Short, stable label for a FilterSpec (used to key batch/grid outputs): years, parts and
+    rotorcraft first, then `name=value` for every other field that is set.
+    """
+    parts = ",".join(sorted(spec.include_far_parts)) if spec.include_far_parts else "all"
+    rotor = "norotor" if spec.exclude_rotorcraft else "rotor"
+    label = [f"{spec.years[0]}-{spec.years[1]}", parts, rotor]
+    for f in fields(spec):
+        v = getattr(spec, f.name)
+        if f.name in {"years", "include_far_parts", "exclude_rotorcraft"} or not v:
+            continue
+        label.append(f"{f.name}={','.join(sorted(map(str, v))) if isinstance(v, list | set | tuple) else v}")
+    return "|".join(label)
 
 
 def build_contingency(
@@ -110,3 +131,171 @@ def chisq_table(
         {"Fatal": [a, c], "Nonfatal": [b, e]},
         index=[flight_control_label, "Other systems"],
     )
+
+
+# -------------------------
+# Stratified 2x2 (Mantel-Haenszel)
+# -------------------------
+
+
+def stratified_counts(
+    strata: pd.DataFrame,
+    exposed: pd.Series,
+    outcome: pd.Series,
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Build a K x 2 x 2 count tensor in one grouped pass.
+
+    Each stratum table uses the chisq_table layout:
+      [[exposed & outcome, exposed & ~outcome],
+       [~exposed & outcome, ~exposed & ~outcome]]
+    Rows with a missing stratum key are dropped.
+    """
+    cols = list(strata.columns)
+    g = strata.groupby(cols, sort=True, dropna=True)
+    codes = g.ngroup().to_numpy()
+    keys = g.size().index.to_frame(index=False)
+
+    exp = exposed.fillna(False).astype(bool).to_numpy()
+    out = outcome.fillna(False).astype(bool).to_numpy()
+    cell = 2 * (~exp) + (~out)
+    ok = codes >= 0
+
+    k = len(keys)
+    flat = np.bincount(codes[ok] * 4 + cell[ok], minlength=k * 4)
+    return keys, flat.reshape(k, 2, 2)
+
+
+def per_stratum_or(counts: np.ndarray, z: float = 1.959964) -> pd.DataFrame:
+    """Per-stratum odds ratios with Woolf CIs; Haldane-Anscombe +0.5 only where a cell is zero."""
+    t = counts.astype(float)
+    a, b, c, d = t[:, 0, 0], t[:, 0, 1], t[:, 1, 0], t[:, 1, 1]
+    zero = (t.reshape(len(t), 4) == 0).any(axis=1)
+    adj = np.where(zero, 0.5, 0.0)
+    a2, b2, c2, d2 = a + adj, b + adj, c + adj, d + adj
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_or = np.log(a2 * d2) - np.log(b2 * c2)
+        se = np.sqrt(1 / a2 + 1 / b2 + 1 / c2 + 1 / d2)
+    return pd.DataFrame(
+        {
+            "a": t[:, 0, 0].astype(int),
+            "b": t[:, 0, 1].astype(int),
+            "c": t[:, 1, 0].astype(int),
+            "d": t[:, 1, 1].astype(int),
+            "n": t.sum(axis=(1, 2)).astype(int),
+            "OR": np.exp(log_or),
+            "ci_low": np.exp(log_or - z * se),
+            "ci_high": np.exp(log_or + z * se),
+            "haldane": zero,
+        }
+    )
+
+
+def mantel_haenszel(counts: np.ndarray, z: float = 1.959964, tarone: bool = True) -> dict:
+    """
+    Pooled Mantel-Haenszel OR (Robins-Breslow-Greenland CI), the MH test of OR=1,
+    and the Breslow-Day test of homogeneous ORs across strata (Tarone-adjusted by default).
+    """
+    from scipy.stats import chi2
+
+    t = counts.astype(float)
+    n = t.sum(axis=(1, 2))
+    t = t[n > 1]
+    n = n[n > 1]
+    a, b, c, d = t[:, 0, 0], t[:, 0, 1], t[:, 1, 0], t[:, 1, 1]
+    n1, n2 = a + b, c + d  # exposed / unexposed totals
+    m1, m2 = a + c, b + d  # outcome / no-outcome totals
+
+    # Crude (pooled) OR for comparison with the adjusted estimate
+    A, B, C, D = a.sum(), b.sum(), c.sum(), d.sum()
+    or_crude = (A * D) / (B * C) if B * C > 0 else np.nan
+
+    R, S = a * d / n, b * c / n
+    P, Q = (a + d) / n, (b + c) / n
+    r_sum, s_sum = R.sum(), S.sum()
+    out = {
+        "n_strata": len(counts),
+        "n_informative": int(((n1 > 0) & (n2 > 0) & (m1 > 0) & (m2 > 0)).sum()),
+        "or_crude": float(or_crude),
+        "or_mh": np.nan,
+        "or_mh_ci_low": np.nan,
+        "or_mh_ci_high": np.nan,
+        "mh_chi2": np.nan,
+        "mh_p": np.nan,
+        "breslow_day_chi2": np.nan,
+        "breslow_day_df": 0,
+        "breslow_day_p": np.nan,
+    }
+    if r_sum <= 0 or s_sum <= 0:
+        return out
+
+    or_mh = r_sum / s_sum
+    var_log = (
+        (P * R).sum() / (2 * r_sum**2) + (P * S + Q * R).sum() / (2 * r_sum * s_sum) + (Q * S).sum() / (2 * s_sum**2)
+    )
+    se = np.sqrt(var_log)
+    out["or_mh"] = float(or_mh)
+    out["or_mh_ci_low"] = float(np.exp(np.log(or_mh) - z * se))
+    out["or_mh_ci_high"] = float(np.exp(np.log(or_mh) + z * se))
+
+    # MH test of conditional independence (no continuity correction)
+    e_a = n1 * m1 / n
+    v_a = n1 * n2 * m1 * m2 / (n**2 * (n - 1))
+    if v_a.sum() > 0:
+        mh = (a.sum() - e_a.sum()) ** 2 / v_a.sum()
+        out["mh_chi2"] = float(mh)
+        out["mh_p"] = float(chi2.sf(mh, 1))
+
+    # Breslow-Day: expected a under the common OR solves a quadratic per stratum
+    inf = (n1 > 0) & (n2 > 0) & (m1 > 0) & (m2 > 0)
+    if inf.sum() >= 2:
+        a_i, n1_i, n2_i, m1_i = a[inf], n1[inf], n2[inf], m1[inf]
+        lo = np.maximum(0.0, m1_i - n2_i)
+        hi = np.minimum(n1_i, m1_i)
+        if np.isclose(or_mh, 1.0):
+            e = n1_i * m1_i / (n1_i + n2_i)
+        else:
+            qa = 1.0 - or_mh
+            qb = n2_i - m1_i + or_mh * (n1_i + m1_i)
+            qc = -or_mh * n1_i * m1_i
+            disc = np.sqrt(qb**2 - 4 * qa * qc)
+            r1 = (-qb + disc) / (2 * qa)
+            r2 = (-qb - disc) / (2 * qa)
+            e = np.where((r1 >= lo - 1e-9) & (r1 <= hi + 1e-9), r1, r2)
+        v = 1 / (1 / e + 1 / (n1_i - e) + 1 / (m1_i - e) + 1 / (n2_i - m1_i + e))
+        bd = ((a_i - e) ** 2 / v).sum()
+        if tarone:
+            bd -= (a_i.sum() - e.sum()) ** 2 / v.sum()
+        dof = int(inf.sum() - 1)
+        out["breslow_day_chi2"] = float(bd)
+        out["breslow_day_df"] = dof
+        out["breslow_day_p"] = float(chi2.sf(bd, dof))
+    return out
+
+
+def stratified_analysis(
+    event_df: pd.DataFrame,
+    strata: list[str] | tuple[str, ...] = ("ev_year",),
+    spec: FilterSpec | None = None,
+    flight_control_label: str = "Flight Control",
+    system_col: str = "system_component",
+    injury_col: str = "ev_highest_injury",
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Flight Control vs Other x Fatal vs Nonfatal, stratified by `strata` columns.
+    Returns (per-stratum table, Mantel-Haenszel/Breslow-Day summary).
+    """
+    if spec is None:
+        spec = FilterSpec()
+    strata = list(strata)
+    d = filter_event_level(event_df, spec)
+    missing = [c for c in [system_col, injury_col, *strata] if c not in d.columns]
+    if missing:
+        raise KeyError(f"Missing columns for stratified analysis: {missing}")
+    d = d[[system_col, injury_col, *strata]].dropna(subset=[system_col, injury_col])
+    is_fc = _normalize_system(d[system_col]).eq(flight_control_label)
+    fatal = _is_fatal(d[injury_col])
+
+    keys, counts = stratified_counts(d[strata], is_fc, fatal)
+    per = pd.concat([keys, per_stratum_or(counts)], axis=1)
+    return per, mantel_haenszel(counts)
@@ -0,0 +1,150 @@
+# analysis/trends.py
+"""
+Fatality-rate trends per system bucket / finding category from the stored counts.
+
+The build keeps month x injury x label event counts (aggregates.TREND_AGGREGATES).
+TrendCube turns one of them into a dense int64 array [period, label, injury] over a
+gap-free calendar axis (years, or months as year * 12 + month - 1). A view selects
+injuries, sums, and takes cumulative sums along the period axis, so rolling rates,
+Wilson intervals and year-over-year deltas come from array slices whose size does
+not depend on how many rows the data has; a year-range filter is a slice.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import NA_KEY, NA_YEAR
+
+FREQS = ("year", "month")
+FATAL_LEVELS = ("FATL",)
+
+
+def wilson_interval(k: np.ndarray, n: np.ndarray, z: float = 1.959964) -> tuple[np.ndarray, np.ndarray]:
+    """Wilson score interval for k successes in n trials (NaN where n == 0)."""
+    k, n = np.asarray(k, dtype=float), np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = k / n
+        denom = 1 + z**2 / n
+        center = (p + z**2 / (2 * n)) / denom
+        half = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denom
+    return center - half, center + half
+
+
+@dataclass(frozen=True)
+class TrendCube:
+    freq: str  # "year" | "month"
+    periods: np.ndarray  # int, contiguous: year, or year * 12 + month - 1
+    labels: np.ndarray  # bucket / category names
+    injuries: np.ndarray  # ev_highest_injury levels
+    n: np.ndarray  # int64 events [period, label, injury]
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series, label: str, freq: str = "year") -> TrendCube:
+        """`counts` is a stored trend aggregate (keys ev_year, ev_month, ev_highest_injury, `label`)."""
+        if freq not in FREQS:
+            raise ValueError(f"freq must be one of {FREQS}, got {freq!r}")
+        df = counts.reset_index()
+        df = df[df["ev_year"].ne(NA_YEAR) & df[label].ne(NA_KEY)]
+        if freq == "month":
+            df = df[df["ev_month"].ne(NA_YEAR)]
+        year = df["ev_year"].to_numpy(dtype=np.int64)
+        period = year if freq == "year" else year * 12 + df["ev_month"].to_numpy(dtype=np.int64) - 1
+        lo = int(period.min()) if len(period) else 0
+        periods = np.arange(lo, int(period.max()) + 1 if len(period) else 0)
+        lab_codes, labels = pd.factorize(df[label], sort=True)
+        inj_codes, injuries = pd.factorize(df["ev_highest_injury"], sort=True)
+        shape = (len(periods), len(labels), len(injuries))
+        flat = np.ravel_multi_index((period - lo, lab_codes, inj_codes), shape) if len(df) else np.empty(0, int)
+        n = np.bincount(flat, weights=df["n"].to_numpy(dtype=float), minlength=int(np.prod(shape)))
+        return cls(
+            freq=freq,
+            periods=periods,
+            labels=np.asarray(labels, dtype=object),
+            injuries=np.asarray(injuries, dtype=object),
+            n=n.astype(np.int64).reshape(shape),
+        )
+
+    @property
+    def lag(self) -> int:
+        """Periods per year (the year-over-year shift)."""
+        return 1 if self.freq == "year" else 12
+
+    def period_labels(self, periods: np.ndarray | None = None) -> list[str]:
+        p = self.periods if periods is None else periods
+        if self.freq == "year":
+            return [str(int(v)) for v in p]
+        return [f"{int(v) // 12}-{int(v) % 12 + 1:02d}" for v in p]
+
+    def _years_slice(self, years: tuple[int, int] | None) -> slice:
+        if years is None:
+            return slice(0, len(self.periods))
+        lo, hi = (years[0], years[1] + 1) if self.freq == "year" else (years[0] * 12, (years[1] + 1) * 12)
+        return slice(*np.searchsorted(self.periods, [lo, hi]))
+
+    def series(
+        self, severity: list[str] | None = None, window: int = 1
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (events, fatal, rolling events, rolling fatal), each [period, label], over the full
+        period axis. Rolling sums cover the last `window` periods (fewer at the start).
+        """
+        inj = np.ones(len(self.injuries), dtype=bool) if not severity else np.isin(self.injuries, list(severity))
+        fat = inj & np.isin(self.injuries, FATAL_LEVELS)
+        events = self.n[:, :, inj].sum(axis=2)
+        fatal = self.n[:, :, fat].sum(axis=2)
+        pad = np.zeros((1, len(self.labels)), dtype=np.int64)
+        ce, cf = np.vstack([pad, events.cumsum(axis=0)]), np.vstack([pad, fatal.cumsum(axis=0)])
+        hi = np.arange(1, len(self.periods) + 1)
+        lo = np.maximum(hi - max(window, 1), 0)
+        return events, fatal, ce[hi] - ce[lo], cf[hi] - cf[lo]
+
+    def table(
+        self,
+        years: tuple[int, int] | None = None,
+        severity: list[str] | None = None,
+        labels: list[str] | None = None,
+        window: int = 1,
+    ) -> pd.DataFrame:
+        """
+        Long table per (period, label) within `years`: events, fatal, rate, rolling_events,
+        rolling_fatal, rolling_rate with Wilson ci_low/ci_high, and yoy_delta (rolling_rate
+        minus the rolling rate one year earlier; windows may reach before `years`).
+        """
+        events, fatal, r_ev, r_fat = self.series(severity, window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate, r_rate = fatal / events, r_fat / r_ev
+        lo, hi = wilson_interval(r_fat, r_ev)
+        yoy = np.full_like(r_rate, np.nan)
+        yoy[self.lag :] = r_rate[self.lag :] - r_rate[: -self.lag]
+
+        sl = self._years_slice(years)
+        cols = np.arange(len(self.labels)) if labels is None else np.flatnonzero(np.isin(self.labels, labels))
+        n_p, n_l = len(self.periods[sl]), len(cols)
+
+        def flat(a: np.ndarray) -> np.ndarray:
+            return a[sl][:, cols].ravel()
+
+        return pd.DataFrame(
+            {
+                "period": np.repeat(self.period_labels(self.periods[sl]), n_l),
+                "label": np.tile(self.labels[cols], n_p),
+                "events": flat(events),
+                "fatal": flat(fatal),
+                "rate": flat(rate),
+                "rolling_events": flat(r_ev),
+                "rolling_fatal": flat(r_fat),
+                "rolling_rate": flat(r_rate),
+                "ci_low": flat(lo),
+                "ci_high": flat(hi),
+                "yoy_delta": flat(yoy),
+            }
+        )
+
+    def top_labels(self, k: int = 5, years: tuple[int, int] | None = None) -> list[str]:
+        """Labels with the most events within `years`."""
+        tot = self.n[self._years_slice(years)].sum(axis=(0, 2))
+        return self.labels[np.argsort(-tot, kind="stable")[:k]].tolist()
@@ -1,9 +1,8 @@
 # app.py
 from __future__ import annotations
 
-import re
 import sys
-from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 
 import altair as alt
@@ -11,240 +10,51 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 
-from config import OUT_EVENT_LEVEL, OUT_FINDING_LEVEL_LABELED, OUT_SEQ_LABELED
+from analysis.aggregates import (
+    TREND_AGGREGATES,
+    AggregateStore,
+    category_injury_view,
+    flight_controls_view,
+    phase_occurrence_view,
+    system_bucket_view,
+    year_strata_view,
+)
+from analysis.dashboard import (
+    FilterSpec,
+    category_injury_table,
+    filter_rows,
+    phase_occurrence_counts,
+    system_risk_tables,
+    two_by_two_stats,
+)
+from analysis.enrichment import enrichment_scan
+from analysis.sequences import Chains, fatal_by_event, ngram_table, transition_matrix
+from analysis.system_buckets import event_level_with_system_flags
+from analysis.system_risk import _is_fatal, mantel_haenszel, per_stratum_or, stratified_counts
+from analysis.trends import TrendCube
+from config import (
+    AGG_DIR,
+    APP_POLL_SECONDS,
+    OUT_EVENT_LEVEL,
+    OUT_EVENT_LEVEL_ARROW,
+    OUT_FINDING_LEVEL_LABELED,
+    OUT_FINDING_LEVEL_LABELED_ARROW,
+    OUT_FINDING_TEXT_INDEX,
+    OUT_SEQ_LABELED,
+    OUT_SEQ_LABELED_ARROW,
+    OUT_SEQ_STORE,
+)
+from exports import FORMATS, ExportCache, available_formats
 from loaders import DataLoadError
+from prefetch import Prefetcher, ResultCache, adjacent_specs
+from publish import DataRegistry
 from quality.errors import BAD_CSV, MISSING_DATA, PIPELINE_FAIL
+from search import ModelIndex, QuerySyntaxError, TextIndex
+from seqstore import SequenceStore
+from store import load_outputs
 
 st.set_page_config(page_title="CAROL / eADMS Audit", layout="wide")
 
-# Precompile and document precedence
-SYSTEM_PATTERNS = [
-    # NOTE: 'autopilot' lives here on purpose so it maps to Flight Controls.
-    (
-        "Flight Controls",
-        [
-            r"\bflight control",
-            r"\bailer",
-            r"\belevat",
-            r"\brudder",
-            r"\btrim\b",
-            r"\bflap",
-            r"\bspoiler",
-            r"\bslat",
-            r"\b(control column|yoke|stick)\b",
-            r"\bservo\b",
-            r"\bactuator\b(?!\s*fuel)",
-            r"\bcontrol\s*cable",
-            r"\bautopilot\b",
-        ],
-    ),
-    (
-        "Powerplant/Propulsion",
-        [
-            r"\b(power ?plant|engine)\b",
-            r"\bpropeller\b",
-            r"\bturbo(charger)?\b",
-            r"\bcompressor\b",
-            r"\bfuel (control|metering|nozzle|pump)\b",
-            r"\bignition\b",
-        ],
-    ),
-    (
-        "Hydraulic/Pneumatic",
-        [r"\bhydraul", r"\bpneumat", r"\baccumulator\b", r"\bactuator\b"],
-    ),
-    (
-        "Avionics/Electrical",
-        [
-            r"\bavionic",
-            r"\belectri",
-            r"\bbus\b",
-            r"\b(EFIS|PFD|MFD|FMS|ADC|IRS)\b",
-            r"\bradio\b",
-            r"\btransponder\b",
-            r"\bantenna\b",
-        ],
-    ),
-    (
-        "Landing Gear/Brakes",
-        [r"\blanding gear|\bgear\b", r"\bbrake", r"\btire\b|\bwheel\b|\bstrut\b"],
-    ),
-    (
-        "Airframe/Structures",
-        [r"\b(structure|airframe|fuselage|wing|empennage|spar|rib|skin)\b"],
-    ),
-    ("Fluids/Fuel/Oil", [r"\bfuel\b", r"\boil\b", r"\bhydraul"]),
-]
-SYSTEM_PATTERNS = [(name, [re.compile(p, re.I) for p in pats]) for name, pats in SYSTEM_PATTERNS]
-
-
-def _first_match_bucket(cat: str, desc: str | None = None) -> str | None:
-    text = cat or ""
-    if desc:
-        text += " " + desc
-    for bucket, pats in SYSTEM_PATTERNS:
-        if any(p.search(text) for p in pats):
-            return bucket
-    return None
-
-
-def add_system_buckets_to_findings(finding_f: pd.DataFrame) -> pd.DataFrame:
-    if finding_f.empty:
-        return finding_f
-    df = finding_f.copy()
-    # Choose the best text fields you have
-    cat_col = "finding_category" if "finding_category" in df.columns else "cat_text"
-    desc_col = "finding_description" if "finding_description" in df.columns else None
-    if cat_col not in df.columns:
-        df["system_bucket"] = pd.NA
-        return df
-
-    df["system_bucket"] = df.apply(
-        lambda r: _first_match_bucket(
-            str(r.get(cat_col, "")),
-            str(r.get(desc_col, "")) if desc_col in df.columns else None,
-        ),
-        axis=1,
-    )
-    return df
-
-
-# --- 2) Roll up to event level --------------------------------
-def event_level_with_system_flags(event_f: pd.DataFrame, finding_f: pd.DataFrame) -> pd.DataFrame:
-    if event_f.empty or finding_f.empty or "ev_id" not in event_f.columns or "ev_id" not in finding_f.columns:
-        return event_f.copy()
-
-    f = add_system_buckets_to_findings(finding_f)
-    # any flight-controls finding per event?
-    fc = (
-        f.assign(_is_fc=f["system_bucket"].eq("Flight Controls"))
-        .groupby("ev_id")["_is_fc"]
-        .max()
-        .astype(bool)
-        .rename("has_flight_controls")
-    )
-
-    # most frequent system bucket per event (for bar chart)
-    top_sys = (
-        f.dropna(subset=["system_bucket"])
-        .groupby(["ev_id", "system_bucket"])
-        .size()
-        .reset_index(name="n")
-        .sort_values(["ev_id", "n"], ascending=[True, False])
-        .drop_duplicates("ev_id")
-        .set_index("ev_id")["system_bucket"]
-        .rename("system_bucket")
-    )
-
-    ev2 = event_f.copy()
-    ev2 = ev2.merge(fc, how="left", left_on="ev_id", right_index=True)
-    ev2 = ev2.merge(top_sys, how="left", left_on="ev_id", right_index=True)
-    ev2["has_flight_controls"] = (
-        ev2["has_flight_controls"].astype("boolean").fillna(False)  # explicit dtype  # now safe
-    )
-    return ev2
-
-
-# --- 3) Build outputs used in the System Risk tab -------------
-
-
-def system_risk_tables(event_f: pd.DataFrame, finding_f: pd.DataFrame):
-    evx = event_level_with_system_flags(event_f, finding_f)
-    if evx.empty or "ev_highest_injury" not in evx.columns:
-        return pd.DataFrame(), pd.DataFrame(), {}
-
-    # --- System bucket contingency (event-level) ---
-    ct = pd.DataFrame()
-    if "system_bucket" in evx.columns:
-        tmp = evx.dropna(subset=["system_bucket"]).copy()
-        fat_bool = tmp["ev_highest_injury"].astype("string").str.upper().eq("FATL")
-        tmp["is_fatal"] = np.where(fat_bool.fillna(False), 1, 0)
-
-        ct = (
-            tmp.groupby("system_bucket", dropna=False)
-            .agg(fatals=("is_fatal", "sum"), total=("is_fatal", "count"))
-            .reset_index()
-        )
-        ct["pct_fatal"] = np.where(ct["total"] > 0, 100.0 * ct["fatals"] / ct["total"], 0.0)
-        ct = ct.sort_values("pct_fatal", ascending=False, kind="mergesort")
-
-    # --- 2x2: Flight Controls vs Other x Fatal vs Nonfatal ---
-    xt = evx.copy()
-    fat_bool_all = xt["ev_highest_injury"].astype("string").str.upper().eq("FATL")
-    xt["is_fatal"] = fat_bool_all.fillna(False)
-    xt["is_fc"] = xt["has_flight_controls"].fillna(False).astype(bool)
-
-    xt = pd.crosstab(xt["is_fc"], xt["is_fatal"])
-    xt = xt.reindex(index=[False, True], columns=[False, True], fill_value=0)
-    xt.index = ["Other systems", "Flight controls"]
-    xt.columns = ["Nonfatal", "Fatal"]
-
-    stats_payload = {}
-    try:
-        from scipy.stats import chi2_contingency
-
-        chi2, p, dof, expected = chi2_contingency(xt.values, correction=False)
-        # If any expected is zero, raise to fallback
-    except ValueError as exc:
-        st.info(
-            f"**Statistical test unavailable** ({exc}) — insufficient data for expected counts. "
-            "Adjust filters (year range, phases, occurrences) and try again."
-        )
-        # Odds ratio (Haldane-Anscombe)
-        a, b = xt.loc["Other systems", ["Nonfatal", "Fatal"]].to_numpy()
-        c, d = xt.loc["Flight controls", ["Nonfatal", "Fatal"]].to_numpy()
-        a2, b2, c2, d2 = a + 0.5, b + 0.5, c + 0.5, d + 0.5
-        or_ = (d2 / c2) / (b2 / a2)
-        se = np.sqrt(1 / a2 + 1 / b2 + 1 / c2 + 1 / d2)
-        lo, hi = np.exp(np.log(or_) - 1.96 * se), np.exp(np.log(or_) + 1.96 * se)
-
-        # Standardized residuals
-        resid = (xt.values - expected) / np.sqrt(expected)
-        stats_payload = {
-            "chi2": chi2,
-            "df": dof,
-            "p_value": p,
-            "odds_ratio_FC_vs_Other": or_,
-            "or_95CI_low": lo,
-            "or_95CI_high": hi,
-            "expected_counts": expected,
-            "std_residuals": resid,
-        }
-    except Exception:
-        # Graceful fallback: show OR only (with H-A correction)
-        a, b = xt.loc["Other systems", ["Nonfatal", "Fatal"]].to_numpy()
-        c, d = xt.loc["Flight controls", ["Nonfatal", "Fatal"]].to_numpy()
-        a2, b2, c2, d2 = a + 0.5, b + 0.5, c + 0.5, d + 0.5
-        or_ = (d2 / c2) / (b2 / a2)
-        se = np.sqrt(1 / a2 + 1 / b2 + 1 / c2 + 1 / d2)
-        lo, hi = np.exp(np.log(or_) - 1.96 * se), np.exp(np.log(or_) + 1.96 * se)
-        stats_payload = {
-            "chi2": None,
-            "df": None,
-            "p_value": None,
-            "odds_ratio_FC_vs_Other": or_,
-            "or_95CI_low": lo,
-            "or_95CI_high": hi,
-            "expected_counts": None,
-            "std_residuals": None,
-        }
-
-    return ct, xt, stats_payload
-
-
-# --- FilterSpec (use this or import your real one) ---
-@dataclass
-class FilterSpec:
-    years: tuple[int, int] | None = None
-    severity: list[str] | None = None
-    phases: list[str] | None = None
-    occurrences: list[str] | None = None
-    defining_only: bool = False
-    makes: list[str] | None = None
-    model_contains: str | None = None
-    parts: list[str] | None = None  # if you want FAR part filtering
-
-
 # --- Project paths / imports
 ROOT = Path(__file__).resolve().parent
 if str(ROOT) not in sys.path:
@@ -286,44 +96,81 @@ def _ensure_parquets():
         st.error(f"Could not build Parquet outputs automatically. Error: {e}")
 
 
-@st.cache_data(show_spinner=False)
-def load_data():
-    _ensure_parquets()
-    ev = pd.read_parquet(OUT_EVENT_LEVEL) if Path(OUT_EVENT_LEVEL).exists() else pd.DataFrame()
-    flab = pd.read_parquet(OUT_FINDING_LEVEL_LABELED) if Path(OUT_FINDING_LEVEL_LABELED).exists() else pd.DataFrame()
-    seq = pd.read_parquet(OUT_SEQ_LABELED) if Path(OUT_SEQ_LABELED).exists() else pd.DataFrame()
-
-    for df in (ev, flab, seq):
-        if not isinstance(df, pd.DataFrame) or df.empty:
-            continue
-        for c in [
-            "ev_year",
-            "Aircraft_Key",
-            "Occurrence_No",
-            "phase_no",
-            "eventsoe_no",
-            "Defining_ev",
-        ]:
-            if c in df.columns:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
-        if "ev_date" in df.columns:
-            df["ev_date"] = pd.to_datetime(df["ev_date"], errors="coerce")
-        for s in [
-            "ev_highest_injury",
-            "acft_make",
-            "acft_model",
-            "occurrence_meaning",
-            "phase_meaning",
-        ]:
-            if s in df.columns:
-                df[s] = df[s].astype("string")
+def _load_version(version_dir: Path | None) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Frames for one published version, or the flat data/out outputs when nothing is published."""
+    outs = [
+        (OUT_EVENT_LEVEL_ARROW, OUT_EVENT_LEVEL),
+        (OUT_FINDING_LEVEL_LABELED_ARROW, OUT_FINDING_LEVEL_LABELED),
+        (OUT_SEQ_LABELED_ARROW, OUT_SEQ_LABELED),
+    ]
+    if version_dir is None:
+        _ensure_parquets()
+    else:
+        outs = [(version_dir / Path(a).name, version_dir / Path(p).name) for a, p in outs]
+    # Arrow copies are memory-mapped with final dtypes; Parquet fallback gets dtypes coerced on load
+    ev, flab, seq = load_outputs(outs)
     return ev, flab, seq
 
 
+def _evict_version_caches(pf: Prefetcher, cache: ResultCache, old: str | None, new: str | None) -> None:
+    # runs on the registry's loader thread: the prefetcher and result cache come bound from data_registry()
+    # derived caches are keyed by data version / row counts; drop the superseded entries
+    load_aggregates.clear()
+    model_index.clear()
+    text_index.clear()
+    sequence_chains.clear()
+    sequence_tables.clear()
+    sequence_store.clear()
+    phase_occurrence_enrichment.clear()
+    trend_cubes.clear()
+    pf.cancel()
+    cache.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def model_index(version: str | None, rows: int, _models: pd.Series) -> ModelIndex:
+    """Trigram/prefix index over the distinct acft_model values of the loaded findings."""
+    return ModelIndex(_models)
+
+
+@st.cache_resource(show_spinner=False)
+def text_index(version: str | None, rows: int, _descriptions: pd.Series) -> TextIndex:
+    """The build's persisted finding-description index for this version (rebuilt here if absent or stale)."""
+    path = OUT_FINDING_TEXT_INDEX if version is None else data_registry().root / version / OUT_FINDING_TEXT_INDEX.name
+    return TextIndex.for_texts(_descriptions, path)
+
+
+@st.cache_resource(show_spinner=False)
+def data_registry() -> DataRegistry:
+    """One per server process: polls data/out/CURRENT and hot-swaps newly published versions."""
+    on_swap = partial(_evict_version_caches, prefetcher(), result_cache())
+    return DataRegistry(_load_version, poll_seconds=APP_POLL_SECONDS, on_swap=on_swap)
+
+
+@st.cache_resource(show_spinner=False)
+def result_cache() -> ResultCache:
+    """Filtered views keyed by (data version, view, filter spec), shared by sessions and the prefetcher."""
+    return ResultCache(kind=lambda key: key[1])
+
+
+@st.cache_resource(show_spinner=False)
+def prefetcher() -> Prefetcher:
+    """One per server process; the latest rerun's neighbouring filter states win."""
+    return Prefetcher(result_cache())
+
+
+def load_data() -> tuple[str | None, tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+    """(version, frames) for this rerun; a newer published version is loaded in the background."""
+    reg = data_registry()
+    reg.poll()
+    return reg.current()
+
+
 # ----------------------------------------
-# Load data
+# Load data (any rerun first stops speculative work for the previous view)
+prefetcher().cancel()
 try:
-    event_df, finding_df, seq_df = load_data()
+    data_version, (event_df, finding_df, seq_df) = load_data()
 except DataLoadError as e:
     st.error(f"**{BAD_CSV.title}**  \n{e}  \n_Code: {BAD_CSV.code}_  \n**Try:** {BAD_CSV.hint}")
     st.stop()
@@ -339,7 +186,25 @@ if event_df.empty and finding_df.empty and seq_df.empty:
 
 # ----------------------------------------
 # Sidebar controls (define ONCE)
+
+
+@st.fragment(run_every=APP_POLL_SECONDS)
+def _new_data_notice(session_version: str | None) -> None:
+    """Keeps polling while the user is idle; offers the newer version once it is loaded."""
+    reg = data_registry()
+    reg.poll()
+    if reg.last_error:
+        st.caption(f"Latest publish failed to load ({reg.last_error}); showing {session_version or 'local outputs'}.")
+    if reg.active_version != session_version:
+        st.info(f"New data published: {reg.active_version}")
+        if st.button("Load new data"):
+            st.rerun()
+    else:
+        st.caption(f"Data version: {session_version or 'local outputs'}")
+
+
 with st.sidebar:
+    _new_data_notice(data_version)
     st.header("Filters")
 
     # Year slider from actual data
@@ -384,7 +249,25 @@ with st.sidebar:
     # Make/model (from finding-level)
     makes = sorted(finding_df.get("acft_make", pd.Series(dtype="string")).dropna().unique().tolist())
     make_sel = st.multiselect("Make (finding-level)", makes, default=[])
+    models = model_index(data_version, len(finding_df), finding_df.get("acft_model", pd.Series(dtype="string")))
     model_sel = st.text_input("Model contains (substring, case-insensitive)", "")
+    if model_sel:
+        suggestions = models.complete(model_sel, limit=8)
+        if suggestions:
+            st.caption("Starts with: " + ", ".join(suggestions))
+
+    # Full-text search over finding descriptions
+    texts = text_index(data_version, len(finding_df), finding_df.get("finding_description", pd.Series(dtype="string")))
+    text_sel = st.text_input(
+        "Finding text",
+        "",
+        help='Words are ANDed; also OR, NOT (or -word), (groups), "exact phrase", prefix*. E.g. fuel* -"not specified"',
+    )
+    try:
+        texts.doc_mask(text_sel)
+    except QuerySyntaxError as e:
+        st.warning(f"Finding text ignored: {e}")
+        text_sel = ""
 
 # ----------------------------------------
 # Build FilterSpec object from controls
@@ -397,56 +280,10 @@ spec = FilterSpec(
     makes=make_sel,
     model_contains=model_sel,
     parts=parts,
+    text_query=text_sel,
 )
 
 
-# -------------------------------
-# Lightweight filtering helpers
-# -------------------------------
-def _between_years(df: pd.DataFrame, years: tuple[int, int]) -> pd.DataFrame:
-    if df.empty or "ev_year" not in df.columns or years is None:
-        return df
-    y = pd.to_numeric(df["ev_year"], errors="coerce")
-    return df[(y >= years[0]) & (y <= years[1])]
-
-
-def apply_filters(event_df, finding_df, seq_df, spec: FilterSpec):
-    ev = _between_years(event_df.copy(), spec.years)
-    fl = _between_years(finding_df.copy(), spec.years)
-    sq = _between_years(seq_df.copy(), spec.years)
-
-    # severity on event & finding if present
-    if spec.severity:
-        if "ev_highest_injury" in ev.columns:
-            ev = ev[ev["ev_highest_injury"].isin(spec.severity)]
-        if "ev_highest_injury" in fl.columns:
-            fl = fl[fl["ev_highest_injury"].isin(spec.severity)]
-
-    # FAR part (if you've labeled it; handles either numeric or string)
-    if spec.parts and "far_part" in ev.columns:
-        ev = ev[ev["far_part"].astype(str).isin(spec.parts)]
-    if spec.parts and "far_part" in fl.columns:
-        fl = fl[fl["far_part"].astype(str).isin(spec.parts)]
-    if spec.parts and "far_part" in sq.columns:
-        sq = sq[sq["far_part"].astype(str).isin(spec.parts)]
-
-    # sequence filters
-    if spec.defining_only and "Defining_ev" in sq.columns:
-        sq = sq[sq["Defining_ev"] == 1]
-    if spec.phases and "phase_meaning" in sq.columns:
-        sq = sq[sq["phase_meaning"].isin(spec.phases)]
-    if spec.occurrences and "occurrence_meaning" in sq.columns:
-        sq = sq[sq["occurrence_meaning"].isin(spec.occurrences)]
-
-    # finding-level make/model
-    if spec.makes and "acft_make" in fl.columns:
-        fl = fl[fl["acft_make"].isin(spec.makes)]
-    if spec.model_contains and "acft_model" in fl.columns:
-        fl = fl[fl["acft_model"].str.contains(spec.model_contains, case=False, na=False)]
-
-    return ev, fl, sq
-
-
 # -------------------------------
 # Minimal analytics for System Risk
 # -------------------------------
@@ -518,9 +355,188 @@ def pct_notna(series) -> float:
 
 
 # -------------------------------
-# Apply filters once
+# Apply filters once (views are cached per filter state; see the prefetch at the end)
+# -------------------------------
+def view_key(view: str, s: FilterSpec) -> tuple:
+    return (data_version, view, repr(s))
+
+
+# Views take the cache and tables as arguments (bound with partial for the prefetch thread),
+# so computing one never calls a Streamlit API such as a cache_resource getter off the script thread.
+views = result_cache()
+tables = (event_df, finding_df, seq_df, models, texts)
+
+
+def filtered_view(s: FilterSpec, tables: tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray, pd.Index]:
+    """
+    (event rows, finding rows, seq rows, ev_sel) for filter state `s` over (event_df, finding_df, seq_df,
+    models, texts): row positions rather than frames, so cached and prefetched states stay small.
+    """
+    ev_all, fl_all, sq_all, model_idx, text_idx = tables
+    ev_rows, fl_rows, sq_rows = filter_rows(ev_all, fl_all, sq_all, s, model_idx, text_idx)
+    # events passing every filter that applies to them: event-level (years, severity, parts) and sequence rows
+    sq = sq_all.iloc[sq_rows]
+    sel = pd.Index(sq["ev_id"].astype("string").unique()) if "ev_id" in sq.columns else pd.Index([])
+    if "ev_id" in ev_all.columns:
+        sel = sel.intersection(pd.Index(ev_all["ev_id"].iloc[ev_rows].astype("string").unique()))
+    return ev_rows, fl_rows, sq_rows, sel
+
+
+def filtered_frames(view: tuple, tables: tuple) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.Index]:
+    """(event_f, finding_f, seq_f, ev_sel) sliced from a cached filtered_view."""
+    ev_rows, fl_rows, sq_rows, sel = view
+    return tables[0].iloc[ev_rows], tables[1].iloc[fl_rows], tables[2].iloc[sq_rows], sel
+
+
+def system_risk_view(s: FilterSpec, cache: ResultCache, tables: tuple) -> tuple:
+    """(evx, ct, xt, stats) for filter state `s`, from its (cached) event/finding rows."""
+    view = cache.get_or_compute(view_key("filters", s), partial(filtered_view, s, tables))
+    ev, fl, _, _ = filtered_frames(view, tables)
+    evx = event_level_with_system_flags(ev, fl)
+    return (evx, *system_risk_tables(ev, fl, evx=evx))
+
+
+event_f, finding_f, seq_f, ev_sel = filtered_frames(
+    views.get_or_compute(view_key("filters", spec), partial(filtered_view, spec, tables)), tables
+)
+
+
+# -------------------------------
+# Pre-aggregated counts (maintained by the build; see analysis/aggregates.py)
+# -------------------------------
+@st.cache_data(show_spinner=False)
+def load_aggregates(version: str | None, rows: tuple[int, int, int]) -> dict | None:
+    """This version's stored counts, or None when missing or built from different outputs than those loaded."""
+    store = AggregateStore(AGG_DIR if version is None else data_registry().root / version / AGG_DIR.name)
+    if not store.load():
+        return None
+    stored = store.state.get("rows", {})
+    if (stored.get("events"), stored.get("findings"), stored.get("seq")) != rows:
+        return None
+    return store.counts
+
+
+def _unsliceable(df: pd.DataFrame, col: str, sel) -> bool:
+    return bool(sel) and col in df.columns
+
+
+# Event/finding views only slice by year and severity; sequence views cover the unfiltered table
+agg = load_aggregates(data_version, (len(event_df), len(finding_df), len(seq_df)))
+agg_events = (
+    agg is not None
+    and not spec.makes
+    and not spec.model_contains
+    and not spec.text_query
+    and not _unsliceable(event_df, "far_part", spec.parts)
+    and not _unsliceable(finding_df, "far_part", spec.parts)
+)
+agg_seq = (
+    agg is not None
+    and not (spec.phases or spec.occurrences or spec.defining_only)
+    and not _unsliceable(seq_df, "far_part", spec.parts)
+    and not _unsliceable(seq_df, "ev_year", spec.years)
+)
+
+
+# -------------------------------
+# Occurrence chains (sorted once per data version; tables cached per filter state)
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def sequence_chains(version: str | None, rows: tuple[int, int], _seq: pd.DataFrame, _events: pd.DataFrame):
+    """Chains over the full sequence table plus the per-event fatal flag."""
+    return Chains.build(_seq), fatal_by_event(_events)
+
+
+@st.cache_resource(show_spinner=False)
+def sequence_store(version: str | None, rows: int, _seq: pd.DataFrame) -> SequenceStore:
+    """The build's memory-mapped sequence store for this version (built here if absent or stale)."""
+    path = OUT_SEQ_STORE if version is None else data_registry().root / version / OUT_SEQ_STORE.name
+    if (path / "meta.json").exists():
+        store = SequenceStore.load(path)
+        if store.n_rows == rows:
+            return store
+    return SequenceStore.build(_seq)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def sequence_tables(
+    version: str | None, spec_key: str, n: int, min_events: int, _chains: Chains, _ev_ids, _fatal: pd.Series
+) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    """(transition matrix, n-gram table, chains) for the events selected by `spec_key`."""
+    ch = _chains.subset(_ev_ids)
+    return transition_matrix(ch), ngram_table(ch, n, _fatal, min_events=min_events), ch.n_chains
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def phase_occurrence_enrichment(
+    version: str | None, spec_key: str, method: str, min_events: int, _seq: pd.DataFrame, _fatal: pd.Series
+) -> pd.DataFrame:
+    """Per-cell fatal enrichment for the sequence rows selected by `spec_key`."""
+    return enrichment_scan(_seq, _fatal, method=method, min_events=min_events)
+
+
 # -------------------------------
-event_f, finding_f, seq_f = apply_filters(event_df, finding_df, seq_df, spec)
+# Trend arrays (period x label x injury, from the stored month counts)
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def trend_cubes(version: str | None, rows: tuple[int, int, int], _agg: dict | None, _tables: dict) -> dict:
+    """TrendCube per (label column, freq); counted here only when the stored aggregates are unusable."""
+    counts = _agg if _agg is not None else AggregateStore(defs=TREND_AGGREGATES).compute(_tables)
+    dims = {"system_bucket": "system_bucket_trend", "finding_category": "category_trend"}
+    return {
+        (label, freq): TrendCube.from_counts(counts[name], label, freq)
+        for label, name in dims.items()
+        for freq in ("year", "month")
+    }
+
+
+# -------------------------------
+# Downloads (written on request, cached by data version + filter spec + format)
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def export_cache() -> ExportCache:
+    return ExportCache()
+
+
+def lazy_download(label: str, name: str, frame, file_stem: str, key: str, index: bool = False) -> None:
+    """
+    Format picker + Prepare button. The file is serialized (in row chunks) only when prepared,
+    and reused for the same data version, filter state and format; `frame` may be a callable.
+    A prepared file is read and handed to the browser only in the rerun its Download button
+    starts, not on every rerun that shows the button.
+    """
+    c1, c2 = st.columns([1, 3])
+    with c1:
+        fmt = st.selectbox(f"{label} format", available_formats(), key=f"{key}_fmt", label_visibility="collapsed")
+    cache = export_cache()
+    path = cache.get(data_version, repr(spec), name, fmt)
+    with c2:
+        if path is None and st.button(f"Prepare {label}", key=f"{key}_prep"):
+            try:
+                with st.spinner(f"Writing {label}…"):
+                    path = cache.get_or_write(data_version, repr(spec), name, fmt, frame, index=index)
+            except (ImportError, ValueError) as exc:
+                st.warning(str(exc))
+        if path is not None:
+            suffix, mime = FORMATS[fmt]
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:  # evicted by another session since cache.get: show Prepare again
+                st.rerun()
+            if not st.button(f"Download {label} ({fmt.upper()}, {size / 1e6:,.1f} MB)", key=f"{key}_get"):
+                return
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                st.rerun()
+            st.download_button(
+                f"Save {label} ({fmt.upper()})",
+                data=data,
+                file_name=f"{file_stem}{suffix}",
+                mime=mime,
+                key=f"{key}_dl",
+            )
+
 
 # -------------------------------
 # Top banner + quick sanity
@@ -538,7 +554,9 @@ if event_df.empty and finding_df.empty and seq_df.empty:
 # -------------------------------
 # Tabs
 # -------------------------------
-tab1, tab2, tab3, tab4 = st.tabs(["Overview", "PhasexOccurrence", "Findings", "System Risk"])
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+    ["Overview", "PhasexOccurrence", "Findings", "System Risk", "Sequences", "Trends"]
+)
 
 # ---- Overview tab
 with tab1:
@@ -569,30 +587,82 @@ with tab1:
     st.divider()
     st.write("Use the sidebar to filter the dataset. Other tabs will update automatically.")
 
+    st.markdown("**Export filtered rows**")
+    rows_by_name = {"Events": event_f, "Findings": finding_f, "Sequence": seq_f}
+    which = st.radio("Table", list(rows_by_name), horizontal=True, key="export_table")
+    st.caption(f"{len(rows_by_name[which]):,} rows with the current filters")
+    lazy_download(f"{which.lower()} rows", f"rows:{which}", rows_by_name[which], f"filtered_{which.lower()}", "rows")
+
 # ---- Phase x Occurrence heatmap
 with tab2:
     st.subheader("Phase x Occurrence Heatmap (Sequence)")
     if {"phase_meaning", "occurrence_meaning"}.issubset(seq_f.columns):
-        top_occ = seq_f["occurrence_meaning"].value_counts().head(25).index.tolist()
-        top_phase = seq_f["phase_meaning"].value_counts().head(25).index.tolist()
-        heat = (
-            seq_f[seq_f["occurrence_meaning"].isin(top_occ) & seq_f["phase_meaning"].isin(top_phase)]
-            .groupby(["phase_meaning", "occurrence_meaning"])
-            .size()
-            .reset_index(name="count")
-        )
-        st.altair_chart(
-            alt.Chart(heat)
-            .mark_rect()
-            .encode(
-                x=alt.X("occurrence_meaning:N", sort=top_occ, title="Occurrence"),
-                y=alt.Y("phase_meaning:N", sort=top_phase, title="Phase"),
-                color=alt.Color("count:Q", title="Count"),
-                tooltip=["phase_meaning", "occurrence_meaning", "count"],
+        heat, top_phase, top_occ = phase_occurrence_view(agg) if agg_seq else phase_occurrence_counts(seq_f)
+        layer = st.radio("Layer", ["Counts", "Fatal enrichment"], horizontal=True)
+        if layer == "Counts":
+            chart = (
+                alt.Chart(heat)
+                .mark_rect()
+                .encode(
+                    x=alt.X("occurrence_meaning:N", sort=top_occ, title="Occurrence"),
+                    y=alt.Y("phase_meaning:N", sort=top_phase, title="Phase"),
+                    color=alt.Color("count:Q", title="Count"),
+                    tooltip=["phase_meaning", "occurrence_meaning", "count"],
+                )
             )
-            .properties(height=500),
-            use_container_width=True,
-        )
+        elif "ev_id" not in seq_f.columns or event_df.empty:
+            chart = None
+            st.info("Fatal enrichment needs ev_id in the sequence table and the event-level table.")
+        else:
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                method = st.selectbox(
+                    "Test", ["chi2", "midp"], format_func={"chi2": "Chi-square", "midp": "Mid-p exact"}.get
+                )
+            with c2:
+                min_cell = st.number_input("Minimum events per cell", 1, 500, 5)
+            with c3:
+                alpha = st.select_slider("FDR q threshold", [0.001, 0.01, 0.05, 0.1, 0.2], value=0.05)
+            _, fatal = sequence_chains(data_version, (len(seq_df), len(event_df)), seq_df, event_df)
+            seq_sel = seq_f[seq_f["ev_id"].astype("string").isin(ev_sel)]
+            enr = phase_occurrence_enrichment(data_version, repr(spec), method, int(min_cell), seq_sel, fatal)
+            shown = enr[enr["phase_meaning"].isin(top_phase) & enr["occurrence_meaning"].isin(top_occ)].assign(
+                significant=lambda d: d["q"] < alpha, log2_or=lambda d: d["log2_or"].clip(-4, 4)
+            )
+            st.caption(
+                f"{len(ev_sel):,} events | {len(enr):,} cells tested | "
+                f"{int((enr['q'] < alpha).sum()):,} with q < {alpha} (Benjamini-Hochberg); faded cells are not"
+            )
+            chart = (
+                alt.Chart(shown)
+                .mark_rect()
+                .encode(
+                    x=alt.X("occurrence_meaning:N", sort=top_occ, title="Occurrence"),
+                    y=alt.Y("phase_meaning:N", sort=top_phase, title="Phase"),
+                    color=alt.Color(
+                        "log2_or:Q",
+                        title="log2 OR (fatal)",
+                        scale=alt.Scale(scheme="redblue", reverse=True, domain=[-4, 4]),
+                    ),
+                    opacity=alt.condition("datum.significant", alt.value(1.0), alt.value(0.25)),
+                    tooltip=[
+                        "phase_meaning",
+                        "occurrence_meaning",
+                        "events",
+                        "fatal_events",
+                        alt.Tooltip("fatality_rate:Q", format=".1%"),
+                        alt.Tooltip("OR:Q", format=".2f"),
+                        alt.Tooltip("OR_ci_low:Q", format=".2f"),
+                        alt.Tooltip("OR_ci_high:Q", format=".2f"),
+                        alt.Tooltip("p:Q", format=".2e"),
+                        alt.Tooltip("q:Q", format=".2e"),
+                    ],
+                )
+            )
+            with st.expander("All tested cells"):
+                st.dataframe(enr.round({"fatality_rate": 3, "OR": 3, "OR_ci_low": 3, "OR_ci_high": 3, "log2_or": 3}))
+        if chart is not None:
+            st.altair_chart(chart.properties(height=500), use_container_width=True)
     else:
         st.info("Sequence table missing required columns for this chart.")
 
@@ -601,12 +671,7 @@ with tab3:
     st.subheader("Top Finding Categories by Injury Severity")
     if {"finding_category", "ev_highest_injury"}.issubset(finding_f.columns):
         topN = st.slider("Top N categories (by FATL)", 5, 30, 20, step=1)
-        ct = (
-            pd.crosstab(finding_f["finding_category"], finding_f["ev_highest_injury"])
-            .assign(_FATL=lambda d: d.get("FATL", 0))
-            .sort_values("_FATL", ascending=False)
-            .drop(columns=["_FATL"])
-        )
+        ct = category_injury_view(agg, spec.years, spec.severity) if agg_events else category_injury_table(finding_f)
         top_cats = ct.head(topN).reset_index().melt(id_vars="finding_category", var_name="injury", value_name="count")
         st.altair_chart(
             alt.Chart(top_cats)
@@ -630,7 +695,15 @@ with tab4:
     if event_df.empty or finding_df.empty:
         st.info("Need both event-level and finding-level data.")
     else:
-        ct, xt, stats = system_risk_tables(event_f, finding_f)
+        if agg_events:
+            evx = None  # the regex bucketing is already rolled up in the stored counts
+            ct = system_bucket_view(agg, spec.years, spec.severity)
+            xt = flight_controls_view(agg, spec.years, spec.severity)
+            stats = two_by_two_stats(xt)
+        else:
+            evx, ct, xt, stats = views.get_or_compute(
+                view_key("system_risk", spec), partial(system_risk_view, spec, views, tables)
+            )
 
         # By-system table + bar
         if ct.empty:
@@ -654,19 +727,9 @@ with tab4:
         # Downloads
         cdl, xdl = st.columns(2)
         with cdl:
-            st.download_button(
-                "Download system bucket table (CSV)",
-                data=ct.to_csv(index=False).encode("utf-8"),
-                file_name="system_bucket_fatality.csv",
-                mime="text/csv",
-            )
+            lazy_download("system bucket table", "system_buckets", ct, "system_bucket_fatality", "ct")
         with xdl:
-            st.download_button(
-                "Download 2x2 table (CSV)",
-                data=xt.to_csv().encode("utf-8"),
-                file_name="flight_controls_2x2.csv",
-                mime="text/csv",
-            )
+            lazy_download("2x2 table", "flight_controls_2x2", xt, "flight_controls_2x2", "xt", index=True)
 
         # 2x2 table
         if not xt.empty:
@@ -674,6 +737,11 @@ with tab4:
             st.dataframe(xt, use_container_width=True)
 
         # Stats
+        if stats and stats["note"]:
+            st.info(
+                f"**Statistical test unavailable** ({stats['note']}). "
+                "Adjust filters (year range, phases, occurrences) and try again."
+            )
         if stats:
             st.markdown("**Chi-square test (independence)**")
             st.write(
@@ -704,3 +772,154 @@ with tab4:
                 resid_df = pd.DataFrame(stats["std_residuals"], index=xt.index, columns=xt.columns).round(2)
                 st.markdown("**Standardized residuals**")
                 st.dataframe(resid_df, use_container_width=True)
+
+        # Stratified 2x2 (Mantel-Haenszel)
+        strata_opts = ["ev_year"] if evx is None else [c for c in ["ev_year", "far_part"] if c in evx.columns]
+        if strata_opts and (evx is None or {"has_flight_controls", "ev_highest_injury"}.issubset(evx.columns)):
+            st.markdown("**Stratified analysis (Mantel-Haenszel)**")
+            strata_sel = st.multiselect("Stratify by", strata_opts, default=strata_opts[:1])
+            if strata_sel:
+                if evx is None:
+                    keys, counts = year_strata_view(agg, spec.years, spec.severity)
+                else:
+                    fat = _is_fatal(evx["ev_highest_injury"]).fillna(False)
+                    keys, counts = stratified_counts(evx[strata_sel], evx["has_flight_controls"], fat)
+                mh = mantel_haenszel(counts)
+                st.write(
+                    {
+                        "crude OR": round(mh["or_crude"], 3),
+                        "MH pooled OR": round(mh["or_mh"], 3),
+                        "MH 95% CI": (round(mh["or_mh_ci_low"], 3), round(mh["or_mh_ci_high"], 3)),
+                        "MH p_value": f"{mh['mh_p']:.4g}",
+                        "Breslow-Day p (homogeneity)": f"{mh['breslow_day_p']:.4g}",
+                        "strata (informative)": f"{mh['n_strata']} ({mh['n_informative']})",
+                    }
+                )
+                per = pd.concat([keys, per_stratum_or(counts)], axis=1)
+                st.dataframe(per.round(3), use_container_width=True)
+
+# ---- Sequences tab
+with tab5:
+    st.subheader("Occurrence chains")
+    if seq_df.empty or not {"ev_id", "Aircraft_Key", "Occurrence_No"}.issubset(seq_df.columns):
+        st.info("Sequence table missing required columns for chain analytics.")
+    else:
+        chains, fatal = sequence_chains(data_version, (len(seq_df), len(event_df)), seq_df, event_df)
+        c1, c2 = st.columns(2)
+        with c1:
+            n_len = st.slider("Chain length (n-gram)", 1, 4, 2)
+        with c2:
+            min_ev = st.slider("Minimum events per chain", 1, 100, 10)
+        tm, ng, n_chains = sequence_tables(data_version, repr(spec), n_len, min_ev, chains, ev_sel, fatal)
+        st.caption(f"{len(ev_sel):,} events | {n_chains:,} aircraft chains")
+
+        st.markdown("**Most frequent chains, with fatality rate of the events containing them**")
+        st.dataframe(ng.head(200).round({"fatality_rate": 3}), use_container_width=True)
+        lazy_download("chains", f"chains:{n_len}:{min_ev}", ng, f"occurrence_chains_n{n_len}", "chains")
+
+        st.markdown("**Events whose chain contains, in order**")
+        store = sequence_store(data_version, len(seq_df), seq_df)
+        code_by_label = {v: k for k, v in sorted(store.occ_labels.items(), reverse=True)}
+        steps = st.multiselect("Occurrences (selection order = chain order)", sorted(code_by_label), default=[])
+        if steps:
+            hits = pd.Index(store.contains_then(*(code_by_label[s] for s in steps))).intersection(ev_sel)
+            n_fatal = int(fatal.reindex(hits, fill_value=False).sum())
+            st.caption(
+                f"{len(hits):,} events" + (f" | {n_fatal:,} fatal ({n_fatal / len(hits):.1%})" if len(hits) else "")
+            )
+            if len(hits):
+                ev_pick = st.selectbox("Show sequence for event", hits.sort_values().tolist())
+                st.dataframe(store.sequence(ev_pick), use_container_width=True)
+
+        st.markdown("**Transition shares (row = from, column = next occurrence)**")
+        top_k = st.slider("Occurrences shown", 5, 30, 15)
+        keep = tm.sum(axis=1).drop("(start)", errors="ignore").nlargest(top_k).index.tolist()
+        rows = ["(start)", *keep]
+        share = tm.div(tm.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+        long = (
+            share.loc[rows, [*keep, "(end)"]]
+            .rename_axis(index="from", columns="to")
+            .stack()
+            .rename("share")
+            .reset_index()
+            .merge(tm.stack().rename("count").reset_index(), on=["from", "to"])
+        )
+        st.altair_chart(
+            alt.Chart(long)
+            .mark_rect()
+            .encode(
+                x=alt.X("to:N", sort=[*keep, "(end)"], title="Next occurrence"),
+                y=alt.Y("from:N", sort=rows, title="Occurrence"),
+                color=alt.Color("share:Q", title="Share of transitions"),
+                tooltip=["from", "to", "count", alt.Tooltip("share:Q", format=".1%")],
+            )
+            .properties(height=max(300, 22 * len(rows))),
+            use_container_width=True,
+        )
+
+# ---- Trends tab
+with tab6:
+    st.subheader("Fatality rate over time")
+    if event_df.empty or finding_df.empty:
+        st.info("Need both event-level and finding-level data.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            dim = st.radio(
+                "By",
+                ["system_bucket", "finding_category"],
+                format_func={"system_bucket": "System bucket", "finding_category": "Finding category"}.get,
+                horizontal=True,
+            )
+        with c2:
+            freq = st.radio("Period", ["year", "month"], format_func=str.title, horizontal=True)
+        with c3:
+            window = st.slider(
+                "Rolling window (periods)", 1, 24 if freq == "month" else 5, 12 if freq == "month" else 1
+            )
+        cube = trend_cubes(
+            data_version,
+            (len(event_df), len(finding_df), len(seq_df)),
+            agg,
+            {"events": event_df, "findings": finding_df, "seq": seq_df},
+        )[(dim, freq)]
+        picked = st.multiselect("Series", cube.labels.tolist(), default=cube.top_labels(5, spec.years))
+        if picked:
+            trend = cube.table(years=spec.years, severity=spec.severity, labels=picked, window=window)
+            base = alt.Chart(trend).encode(
+                x=alt.X("period:O", title=freq.title()), color=alt.Color("label:N", title=None)
+            )
+            band = base.mark_area(opacity=0.15).encode(y="ci_low:Q", y2="ci_high:Q")
+            line = base.mark_line(point=freq == "year").encode(
+                y=alt.Y("rolling_rate:Q", title="Fatality rate (rolling)", axis=alt.Axis(format="%")),
+                tooltip=[
+                    "period",
+                    "label",
+                    "rolling_events",
+                    "rolling_fatal",
+                    alt.Tooltip("rolling_rate:Q", format=".1%"),
+                    alt.Tooltip("ci_low:Q", format=".1%"),
+                    alt.Tooltip("ci_high:Q", format=".1%"),
+                    alt.Tooltip("yoy_delta:Q", format="+.1%"),
+                ],
+            )
+            st.altair_chart((band + line).properties(height=420), use_container_width=True)
+            st.caption(
+                "Events (not findings) per period; 95% Wilson intervals on the rolling window. "
+                "Only the year and severity filters apply to this view."
+            )
+            st.markdown("**Year-over-year change in the rolling rate**")
+            st.dataframe(
+                trend.pivot(index="period", columns="label", values="yoy_delta").round(3), use_container_width=True
+            )
+
+
+# -------------------------------
+# Speculative prefetch: the filter states one slider step / severity toggle away (prefetch.py)
+# -------------------------------
+# cheap filter passes for every neighbour first; the System Risk roll-up only when not served from aggregates
+nearby = adjacent_specs(spec, (yr_min, yr_max), sev_opts)
+tasks = [(view_key("filters", s), partial(filtered_view, s, tables)) for s in nearby]
+if not agg_events and not (event_df.empty or finding_df.empty):
+    tasks += [(view_key("system_risk", s), partial(system_risk_view, s, views, tables)) for s in nearby]
+prefetcher().submit(tasks)
@@ -5,6 +5,8 @@ from collections.abc import Iterable
 
 import pandas as pd
 
+from quality.profiling import profile_frame
+
 
 def pct(num: int, den: int) -> str:
     try:
@@ -15,38 +17,62 @@ def pct(num: int, den: int) -> str:
         return "0.0%"
 
 
-def coverage(df: pd.DataFrame, cols: Iterable[str]) -> pd.DataFrame:
+def coverage(df: pd.DataFrame, cols: Iterable[str], profile: dict | None = None) -> pd.DataFrame:
     """
     Returns a tiny table: column, non_null, total, coverage_pct
     """
-    rows = []
+    cols = list(cols)
     total = len(df)
+    if profile is None:
+        present = [c for c in cols if c in df.columns]
+        nn = df[present].notna().sum() if present else pd.Series(dtype="int64")
+    else:
+        nn = pd.Series({c: p["non_null"] for c, p in profile["columns"].items()})
+    rows = []
     for c in cols:
-        nn = int(df[c].notna().sum()) if c in df.columns else 0
-        rows.append({"column": c, "non_null": nn, "total": total, "coverage_pct": pct(nn, total)})
+        n = int(nn.get(c, 0))
+        rows.append({"column": c, "non_null": n, "total": total, "coverage_pct": pct(n, total)})
     return pd.DataFrame(rows)
 
 
-def uniques(df: pd.DataFrame, cols: Iterable[str]) -> pd.DataFrame:
+def uniques(df: pd.DataFrame, cols: Iterable[str], profile: dict | None = None) -> pd.DataFrame:
+    """
+    Returns: column, n_unique, approx, total. approx is True where the profile switched the
+    column to a HyperLogLog sketch (past EXACT_DISTINCT_LIMIT distinct values), so n_unique is an estimate.
+    """
+    cols = list(cols)
+    if profile is None:
+        profile = profile_frame(df, columns=[c for c in cols if c in df.columns], top_k=0)
     rows, total = [], len(df)
     for c in cols:
-        if c in df.columns:
-            rows.append({"column": c, "n_unique": int(df[c].nunique(dropna=True)), "total": total})
-        else:
-            rows.append({"column": c, "n_unique": 0, "total": total})
+        p = profile["columns"].get(c)
+        approx = bool(p) and not p["distinct_exact"]
+        rows.append({"column": c, "n_unique": int(p["distinct"]) if p else 0, "approx": approx, "total": total})
     return pd.DataFrame(rows)
 
 
-def quick_audit(name: str, df: pd.DataFrame, key_cols: Iterable[str] | None = None, show: bool = True) -> None:
+def quick_audit(
+    name: str,
+    df: pd.DataFrame,
+    key_cols: Iterable[str] | None = None,
+    show: bool = True,
+    profile: dict | None = None,
+) -> dict:
     """
     Print a concise audit summary for a dataframe.
+    Coverage and unique counts come from one profiling pass (pass `profile` to reuse an existing one).
     """
-    print(f"\n=== AUDIT: {name} ===")
-    print(f"rows: {len(df):,} | cols: {len(df.columns)}")
-    if key_cols:
-        cov = coverage(df, key_cols)
-        print("key coverage:")
-        print(cov.to_string(index=False))
-        uq = uniques(df, key_cols)
-        print("key unique counts:")
-        print(uq.to_string(index=False))
+    key_cols = list(key_cols or [])
+    if profile is None:
+        profile = profile_frame(df, name=name, columns=[c for c in key_cols if c in df.columns], top_k=0)
+    if show:
+        print(f"\n=== AUDIT: {name} ===")
+        print(f"rows: {len(df):,} | cols: {len(df.columns)}")
+        if key_cols:
+            cov = coverage(df, key_cols, profile=profile)
+            print("key coverage:")
+            print(cov.to_string(index=False))
+            uq = uniques(df, key_cols, profile=profile)
+            print("key unique counts:")
+            print(uq.to_string(index=False))
+    return profile
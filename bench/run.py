@@ -0,0 +1,191 @@
+# bench/run.py
+"""
+Benchmark suite: time every pipeline stage and dashboard aggregate on synthetic
+data at several scales, store results/baselines, and flag regressions.
+
+    python -m bench.run --scales 1 10               # compare against bench/baseline.json
+    python -m bench.run --scales 1 10 --save-baseline
+
+Exits 1 on a regression and 2 when there is no baseline to compare against.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from analysis import dashboard
+from analysis.system_buckets import event_level_with_system_flags
+from bench.synth import generate
+from config import BENCH_BASELINE, BENCH_RESULTS, SYNTH_DIR
+from instrument import Instrumenter
+from labelers import AircraftIndex, build_event_level, build_finding_level, label_findings, label_sequence
+from loaders import read_aircraft, read_events, read_events_sequence, read_findings
+from search import ModelIndex
+from store import final_dtypes
+
+
+def _scale_key(scale: float) -> str:
+    return f"x{scale:g}"
+
+
+def ensure_synth(scale: float, regen: bool = False, seed: int = 0) -> Path:
+    d = SYNTH_DIR / _scale_key(scale)
+    if regen or not (d / "events_sequence.csv").exists():
+        generate(d, scale=scale, seed=seed)
+    return d
+
+
+def run_pipeline_stages(inst: Instrumenter, d: Path) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    with inst.stage("read_events") as st:
+        events = read_events(d / "events.csv")
+        st.out(events)
+    with inst.stage("read_findings") as st:
+        findings = read_findings(d / "findings.csv")
+        st.out(findings)
+    with inst.stage("read_aircraft") as st:
+        aircraft = read_aircraft(d / "aircraft.csv")
+        st.out(aircraft)
+    with inst.stage("read_events_sequence") as st:
+        seq = read_events_sequence(d / "events_sequence.csv")
+        st.out(seq)
+    with inst.stage("build_aircraft_index"):
+        acft_idx = AircraftIndex.build(aircraft)
+    with inst.stage("build_event_level") as st:
+        event_level = build_event_level(events, acft_idx)
+        st.out(event_level)
+    with inst.stage("build_finding_level") as st:
+        finding_lvl = build_finding_level(events, findings, acft_idx)
+        st.out(finding_lvl)
+    with inst.stage("label_sequence") as st:
+        seq_labeled = label_sequence(seq, dict_csv_path=d / "eADMSPUB_DataDictionary.csv")
+        st.out(seq_labeled)
+    with inst.stage("label_findings") as st:
+        finding_lab = label_findings(finding_lvl)
+        st.out(finding_lab)
+    return final_dtypes(event_level), final_dtypes(finding_lab), final_dtypes(seq_labeled)
+
+
+def run_dashboard_stages(inst: Instrumenter, ev: pd.DataFrame, fl: pd.DataFrame, sq: pd.DataFrame) -> None:
+    spec = dashboard.FilterSpec(
+        years=(2009, 2023), severity=["FATL", "SERS", "MINR", "NONE"], parts=["91", "121", "135"]
+    )
+    with inst.stage("dashboard.apply_filters") as st:
+        ev_f, fl_f, sq_f = dashboard.apply_filters(ev, fl, sq, spec)
+        st.out(fl_f)
+    with inst.stage("dashboard.event_level_with_system_flags") as st:
+        evx = event_level_with_system_flags(ev_f, fl_f)
+        st.out(evx)
+    with inst.stage("dashboard.system_risk_tables"):
+        dashboard.system_risk_tables(ev_f, fl_f, evx=evx)
+    with inst.stage("dashboard.phase_occurrence_counts"):
+        dashboard.phase_occurrence_counts(sq_f)
+    with inst.stage("dashboard.category_injury_table"):
+        dashboard.category_injury_table(fl_f)
+    with inst.stage("dashboard.model_index"):
+        models = ModelIndex(fl["acft_model"])
+    with inst.stage("dashboard.model_contains"):
+        for q in ("1", "17", "172", "PA-28"):  # one rerun per keystroke
+            dashboard.apply_filters(ev, fl, sq, dashboard.FilterSpec(model_contains=q), models)
+
+
+def bench_scale(scale: float, repeat: int = 3, dashboard: bool = True, regen: bool = False) -> dict[str, float]:
+    """Best-of-`repeat` wall seconds per stage for one scale."""
+    d = ensure_synth(scale, regen=regen)
+    best: dict[str, float] = {}
+    for _ in range(repeat):
+        inst = Instrumenter(enabled=True)
+        ev, fl, sq = run_pipeline_stages(inst, d)
+        if dashboard:
+            run_dashboard_stages(inst, ev, fl, sq)
+        for r in inst.records:
+            best[r.name] = min(best.get(r.name, float("inf")), r.wall_s)
+    return best
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float = 0.25,
+    min_seconds: float = 0.02,
+) -> pd.DataFrame:
+    """
+    One row per (scale, stage) present in both; `regressed` when slower than baseline by more
+    than `tolerance` (fraction) and by at least `min_seconds` (filters timer noise on tiny stages).
+    """
+    rows = []
+    for scale, stages in results.items():
+        for stage, cur in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if base is None:
+                continue
+            ratio = cur / base if base > 0 else float("inf")
+            rows.append(
+                {
+                    "scale": scale,
+                    "stage": stage,
+                    "baseline_s": base,
+                    "current_s": cur,
+                    "ratio": ratio,
+                    "regressed": ratio > 1 + tolerance and cur - base >= min_seconds,
+                }
+            )
+    return pd.DataFrame(rows, columns=["scale", "stage", "baseline_s", "current_s", "ratio", "regressed"])
+
+
+def _write_json(obj: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=2)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Pipeline + dashboard benchmarks on synthetic CAROL data")
+    ap.add_argument("--scales", nargs="*", type=float, default=[1.0], help="Multiples of real row counts")
+    ap.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    ap.add_argument("--no-dashboard", action="store_true", help="Skip the app aggregate benchmarks")
+    ap.add_argument("--regen", action="store_true", help="Regenerate synthetic inputs")
+    ap.add_argument("--baseline", default=str(BENCH_BASELINE))
+    ap.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown fraction before flagging")
+    args = ap.parse_args(argv)
+
+    results = {
+        _scale_key(s): bench_scale(s, repeat=args.repeat, dashboard=not args.no_dashboard, regen=args.regen)
+        for s in args.scales
+    }
+    meta = {"python": sys.version.split()[0], "platform": platform.platform(), "pandas": pd.__version__}
+    _write_json({"meta": meta, "results": results}, BENCH_RESULTS)
+    for scale, stages in results.items():
+        print(f"\n=== {scale} ===")
+        for stage, sec in stages.items():
+            print(f"{stage:<36} {sec:8.3f}s")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        stored = json.loads(baseline_path.read_text())["results"] if baseline_path.exists() else {}
+        stored.update(results)
+        _write_json({"meta": meta, "results": stored}, baseline_path)
+        print(f"\nBaseline saved: {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one.", file=sys.stderr)
+        return 2
+
+    cmp = compare(results, json.loads(baseline_path.read_text())["results"], tolerance=args.tolerance)
+    regressed = cmp[cmp["regressed"]]
+    if regressed.empty:
+        print(f"\nNo regressions beyond {args.tolerance:.0%} vs {baseline_path}.")
+        return 0
+    print(f"\nREGRESSIONS beyond {args.tolerance:.0%}:")
+    print(regressed.to_string(index=False, float_format="{:.3f}".format))
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
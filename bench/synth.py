@@ -0,0 +1,285 @@
+# bench/synth.py
+"""
+Synthetic CAROL/eADMS exports at configurable scale.
+
+Row counts, cardinalities and skew follow the real 2008-2023 extract:
+~3 findings per event (17% of events have none), ~2.2 sequence rows per
+aircraft, a handful of multi-aircraft events, Zipf-distributed makes,
+models, finding descriptions and phase/occurrence codes.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_EVENTS = 30_000  # 1x: roughly the real events table, including rows outside the analysis window
+
+INJURY = (["NONE", "FATL", "MINR", "SERS", None], [0.505, 0.209, 0.134, 0.110, 0.042])
+CAUSE_FACTOR = (["C", None, " ", "F"], [0.57, 0.22, 0.125, 0.085])
+
+MAKES = ["CESSNA", "PIPER", "BOEING", "BEECH", "ROBINSON", "BELL", "AIRBUS", "MOONEY", "CIRRUS", "EUROCOPTER"]
+# raw spellings seen in exports; normalize_make_model folds these into the canonical names
+MAKE_VARIANTS = {
+    "CESSNA": ["CESSNA", "Cessna", "CESSNA AIRCRAFT CO", "Cessna Aircraft Company"],
+    "PIPER": ["PIPER", "Piper", "PIPER AIRCRAFT", "Piper Aircraft Co"],
+    "ROBINSON": ["ROBINSON", "ROBINSON HELICOPTER", "Robinson Helicopter Company"],
+}
+
+PHASES = {
+    100: "Prior to Flight",
+    153: "Standing-Engine(s) Operating",
+    250: "Taxi",
+    300: "Takeoff",
+    350: "Initial Climb",
+    400: "Enroute",
+    402: "Enroute-Cruise",
+    450: "Maneuvering",
+    452: "Maneuvering-Low-alt flying",
+    500: "Approach",
+    508: "Approach-VFR Pattern Final",
+    509: "Approach-VFR Go-Around",
+    550: "Landing",
+    551: "Landing-Flare/Touchdown",
+    552: "Landing-Landing Roll",
+    600: "Emergency Descent",
+    650: "Uncontrolled Descent",
+    700: "Post-Impact",
+    990: "Unknown",
+}
+OCCURRENCES = {
+    470: "Collision with terr/obj (non-CFIT)",
+    240: "Loss of control in flight",
+    230: "Loss of control on ground",
+    341: "Loss of engine power (total)",
+    300: "Runway excursion",
+    440: "Off-field or emergency landing",
+    96: "Nose over/nose down",
+    92: "Hard landing",
+    342: "Loss of engine power (partial)",
+    94: "Landing gear collapse",
+    330: "Sys/Comp malf/fail (non-power)",
+    241: "Aerodynamic stall/spin",
+    250: "Midair collision",
+    192: "Fuel exhaustion",
+    120: "Control flight into terr/obj",
+    334: "Flight instrument malf/fail",
+    337: "Aircraft structural failure",
+    360: "Turbulence encounter",
+}
+UNDECODABLE_OCC = [999]  # codes with no dictionary entry, to exercise decoder misses
+
+FINDING_TREE = {
+    "Aircraft": {
+        "Aircraft systems": ["Flight control system", "Landing gear system", "Fuel system", "Hydraulic system"],
+        "Aircraft power plant": ["Engine (reciprocating)", "Engine (turbine)", "Propeller system"],
+        "Aircraft oper/perf/capability": ["Performance/control parameters", "Aircraft capability"],
+        "Aircraft structures": ["Fuselage", "Wing", "Empennage"],
+    },
+    "Personnel issues": {
+        "Task performance": ["Use of equip/info", "Planning/preparation", "Maintenance", "Inspection"],
+        "Action/decision": ["Info processing/decision", "Action"],
+        "Psychological": ["Attention/monitoring", "Perception/orientation"],
+    },
+    "Environmental issues": {
+        "Conditions/weather/phenomena": ["Wind", "Turbulence", "Visibility"],
+        "Physical environment": ["Object/animal/substance", "Runway/land/takeoff/taxi surfaces"],
+    },
+}
+SUBSECTIONS = [
+    "(general)",
+    "Aileron control system",
+    "Elevator control system",
+    "Rudder control system",
+    "Trim control",
+    "Directional control",
+    "Airspeed",
+    "Altitude",
+    "Checklist",
+    "Preflight inspection",
+]
+MODIFIERS = {
+    1: "Failure",
+    2: "Malfunction",
+    6: "Fatigue/wear/corrosion",
+    10: "Incorrect use/operation",
+    11: "Inadequate inspection",
+    12: "Not serviced",
+    20: "Not attained/maintained",
+    21: "Exceeded",
+    44: "Pilot",
+    45: "Pilot of other aircraft",
+    60: "Capability exceeded",
+    99: "Not specified",
+}
+
+
+def _zipf_choice(rng: np.random.Generator, n_items: int, size: int, a: float = 1.2) -> np.ndarray:
+    """Indexes into n_items with Zipf(a) skew (item 0 most frequent)."""
+    w = 1.0 / np.arange(1, n_items + 1) ** a
+    return rng.choice(n_items, size=size, p=w / w.sum())
+
+
+def _findings_vocab(n: int) -> pd.DataFrame:
+    rows = []
+    for ci, (cat, subs) in enumerate(FINDING_TREE.items(), start=1):
+        for si, (sub, sections) in enumerate(subs.items(), start=1):
+            for ti, sec in enumerate(sections, start=1):
+                for ui, subsec in enumerate(SUBSECTIONS, start=1):
+                    for mod_no, mod in MODIFIERS.items():
+                        rows.append((ci, si, ti, ui, mod_no, f"{cat}-{sub}-{sec}-{subsec}-{mod}"))
+    vocab = pd.DataFrame(
+        rows, columns=["category_no", "subcategory_no", "section_no", "subsection_no", "modifier_no", "desc"]
+    )
+    return vocab.sample(frac=1.0, random_state=0).head(n).reset_index(drop=True)
+
+
+def generate(out_dir: str | Path, scale: float = 1.0, seed: int = 0) -> dict[str, Path]:
+    """Write events/findings/aircraft/events_sequence CSVs plus a matching data dictionary to out_dir."""
+    rng = np.random.default_rng(seed)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    n_ev = max(int(BASE_EVENTS * scale), 10)
+
+    # --- events
+    days = rng.integers(0, (pd.Timestamp("2024-12-31") - pd.Timestamp("2005-01-01")).days, n_ev)
+    dates = pd.Timestamp("2005-01-01") + pd.to_timedelta(days, unit="D")
+    serial = np.arange(n_ev)
+    ev_id = pd.Series(dates.strftime("%Y%m%d")).str.cat(pd.Series(serial).map("X{:05d}".format))
+    fmt_long = rng.random(n_ev) < 0.1  # a minority of rows in the long CAROL date format
+    ev_date = np.where(fmt_long, dates.strftime("%b %d, %Y 12:00:00 AM"), dates.strftime("%m/%d/%Y 00:00"))
+    injury = rng.choice(np.array(INJURY[0], dtype=object), n_ev, p=INJURY[1])
+    events = pd.DataFrame({"ev_id": ev_id, "ev_year": dates.year, "ev_date": ev_date, "ev_highest_injury": injury})
+
+    # --- aircraft (3 in 1000 events have two aircraft)
+    n_ac = 1 + (rng.random(n_ev) < 0.003)
+    ac_ev = np.repeat(np.arange(n_ev), n_ac)
+    ac_key = np.concatenate([np.arange(1, k + 1) for k in n_ac]) if n_ev else np.array([], dtype=int)
+    n_tail = max(int(3700 * min(scale, 10) ** 0.5), len(MAKES))
+    make_names = MAKES + [f"MAKER {i:04d}" for i in range(n_tail - len(MAKES))]
+    make_idx = _zipf_choice(rng, len(make_names), len(ac_ev), a=1.1)
+    make = np.array(make_names, dtype=object)[make_idx]
+    for canon, variants in MAKE_VARIANTS.items():
+        m = make == canon
+        make[m] = rng.choice(np.array(variants, dtype=object), m.sum())
+    model_no = _zipf_choice(rng, 40, len(ac_ev), a=1.3)
+    model = pd.Series(make_idx).map("{:03d}".format).radd("M").str.cat(pd.Series(model_no).map("-{}".format))
+    aircraft = pd.DataFrame(
+        {"ev_id": ev_id.to_numpy()[ac_ev], "Aircraft_Key": ac_key, "acft_make": make, "acft_model": model}
+    )
+
+    # --- findings (~17% of events none; otherwise 1 + Poisson(2.6), capped at 20)
+    n_f = np.where(rng.random(n_ev) < 0.17, 0, np.minimum(1 + rng.poisson(2.6, n_ev), 20))
+    f_ev = np.repeat(np.arange(n_ev), n_f)
+    f_no = np.concatenate([np.arange(1, k + 1) for k in n_f]) if n_f.sum() else np.array([], dtype=int)
+    vocab = _findings_vocab(max(int(7000 * min(scale, 4) ** 0.5), 50))
+    fv = vocab.iloc[_zipf_choice(rng, len(vocab), len(f_ev), a=0.9)].reset_index(drop=True)
+    cf = rng.choice(np.array(CAUSE_FACTOR[0], dtype=object), len(f_ev), p=CAUSE_FACTOR[1])
+    suffix = np.where(pd.isna(cf) | (cf == " "), "", " - " + pd.Series(cf).fillna("").astype(str))
+    code = (
+        fv["category_no"] * 100_000_000
+        + fv["subcategory_no"] * 1_000_000
+        + fv["section_no"] * 10_000
+        + fv["subsection_no"] * 100
+        + fv["modifier_no"]
+    )
+    findings = pd.DataFrame(
+        {
+            "ev_id": ev_id.to_numpy()[f_ev],
+            "Aircraft_Key": 1,
+            "finding_no": f_no,
+            "finding_code": code,
+            "finding_description": fv["desc"] + suffix,
+            "category_no": fv["category_no"],
+            "subcategory_no": fv["subcategory_no"],
+            "section_no": fv["section_no"],
+            "subsection_no": fv["subsection_no"],
+            "modifier_no": fv["modifier_no"],
+            "Cause_Factor": cf,
+        }
+    )
+
+    # --- events_sequence (per aircraft: 1 + Poisson(1.2) occurrences, one defining)
+    n_s = np.minimum(1 + rng.poisson(1.2, len(ac_ev)), 10)
+    s_ac = np.repeat(np.arange(len(ac_ev)), n_s)
+    s_no = np.concatenate([np.arange(1, k + 1) for k in n_s]) if len(ac_ev) else np.array([], dtype=int)
+    phase_codes = np.array(list(PHASES))
+    occ_codes = np.array(list(OCCURRENCES) + UNDECODABLE_OCC)
+    phase = phase_codes[_zipf_choice(rng, len(phase_codes), len(s_ac), a=0.8)]
+    occ_w = 1.0 / np.arange(1, len(occ_codes) + 1) ** 1.1
+    occ_w[-1] = occ_w[:-1].sum() * 0.003
+    occ = rng.choice(occ_codes, len(s_ac), p=occ_w / occ_w.sum())
+    defining_pick = np.floor(rng.random(len(ac_ev)) * n_s).astype(int) + 1
+    seq = pd.DataFrame(
+        {
+            "ev_id": aircraft["ev_id"].to_numpy()[s_ac],
+            "Aircraft_Key": aircraft["Aircraft_Key"].to_numpy()[s_ac],
+            "Occurrence_No": s_no,
+            "phase_no": phase,
+            "eventsoe_no": occ,
+            "Occurrence_Code": pd.Series(phase).map("{:03d}".format) + pd.Series(occ).map("{:03d}".format),
+            "Defining_ev": (s_no == defining_pick[s_ac]).astype(int),
+        }
+    )
+
+    # --- data dictionary (eADMS layout: Table, Column, code_iaids, meaning)
+    dd = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "Table": "Events_Sequence",
+                    "Column": "Occurrence_Code",
+                    "code_iaids": [f"{p:03d}xxx" for p in PHASES],
+                    "meaning": list(PHASES.values()),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Table": "Events_Sequence",
+                    "Column": "Occurrence_Code",
+                    "code_iaids": [f"xxx{o:03d}" for o in OCCURRENCES],
+                    "meaning": list(OCCURRENCES.values()),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Table": "Findings",
+                    "Column": "modifier_no",
+                    "code_iaids": [f"xxxxxxxx{m:02d}" for m in MODIFIERS],
+                    "meaning": list(MODIFIERS.values()),
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+
+    paths = {
+        "events": out / "events.csv",
+        "findings": out / "findings.csv",
+        "aircraft": out / "aircraft.csv",
+        "events_sequence": out / "events_sequence.csv",
+        "dictionary": out / "eADMSPUB_DataDictionary.csv",
+    }
+    events.to_csv(paths["events"], index=False)
+    findings.to_csv(paths["findings"], index=False)
+    aircraft.to_csv(paths["aircraft"], index=False)
+    seq.to_csv(paths["events_sequence"], index=False)
+    dd.to_csv(paths["dictionary"], index=False)
+    return paths
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Generate synthetic CAROL/eADMS CSVs")
+    ap.add_argument("--out", required=True, help="Output directory (e.g. data/synth/x10)")
+    ap.add_argument("--scale", type=float, default=1.0, help="Multiple of the real row counts (1, 10, 100, ...)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    for name, p in generate(args.out, args.scale, args.seed).items():
+        print(f"{name:<16} {p}")
+
+
+if __name__ == "__main__":
+    main()
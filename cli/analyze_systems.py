@@ -1,30 +1,184 @@
 # cli/analyze_systems.py
 import argparse
+import itertools
 import json
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 
-from analysis.logit_models import fit_logit
-from analysis.system_risk import FilterSpec, build_contingency, chisq_table
+from analysis.logit_models import fit_logit, fit_logit_batch, fit_logit_cached
+from analysis.system_risk import FilterSpec, build_contingency, chisq_table, spec_label, stratified_analysis
+from config import OUT_FINDING_TEXT_INDEX
+from search import TextIndex
+from store import read_table
+
+# -------------------------
+# Grid mode: many specs, one load
+# -------------------------
+
+GRID_COLUMNS = ["spec", "start", "end", "parts", "exclude_rotorcraft", "table", "row", "metric", "value"]
+
+
+def load_grid(path: str) -> list[FilterSpec]:
+    """
+    Expand a JSON spec file into the cross product of its axes, e.g.
+      {"years": [[2009, 2015], [2016, 2025]],
+       "parts": [["91"], ["121", "135"]],
+       "exclude_rotorcraft": [true, false]}
+    Missing axes fall back to FilterSpec defaults. Parts are compared as strings (91 == "91"),
+    and specs repeated by duplicate axis values are kept once.
+    """
+    with open(path) as f:
+        grid = json.load(f)
+    d = FilterSpec()
+    years = [tuple(y) for y in grid.get("years", [d.years])]
+    parts = [{str(v) for v in p} if p else None for p in grid.get("parts", [None])]
+    rotor = grid.get("exclude_rotorcraft", [d.exclude_rotorcraft])
+    specs = {}
+    for y, p, r in itertools.product(years, parts, rotor):
+        spec = FilterSpec(years=y, include_far_parts=p, exclude_rotorcraft=bool(r))
+        specs.setdefault(spec_label(spec), spec)  # run_grid keys its logit slices by label
+    return list(specs.values())
+
+
+def _long(table: str, df: pd.DataFrame, row_col: str | None = None) -> pd.DataFrame:
+    d = df.reset_index() if row_col is None else df
+    row_col = row_col or d.columns[0]
+    m = d.melt(id_vars=row_col, var_name="metric", value_name="value").rename(columns={row_col: "row"})
+    m["row"] = m["row"].astype(str)
+    m["value"] = pd.to_numeric(m["value"], errors="coerce").astype(float)
+    m.insert(0, "table", table)
+    return m
+
+
+LOGIT_METRICS = ["term", "coef", "se", "OR", "OR_ci_low", "OR_ci_high", "p", "n", "converged"]
+
+
+def evaluate_spec(
+    ev: pd.DataFrame, spec: FilterSpec, logit: pd.DataFrame | None = None, logit_error: str | None = None
+) -> pd.DataFrame:
+    """
+    All single-run outputs for one spec as long-format rows (table, row, metric, value).
+    `logit` is this spec's slice of fit_logit_batch; when the batch fit failed, `logit_error`
+    becomes a logit_error row (row = the error text, metric "failed").
+    """
+    import scipy.stats as st
+
+    parts = [_long("system_contingency", build_contingency(ev, spec=spec), "system_bucket")]
+
+    xt = chisq_table(ev, spec=spec)
+    parts.append(_long("fc_vs_other_2x2", xt))
+    try:
+        chi2, p, dof, _ = st.chi2_contingency(xt.values)
+        parts.append(_long("chisq", pd.DataFrame({"test": ["chi2"], "chi2": [chi2], "p": [p], "dof": [dof]})))
+    except ValueError:
+        pass
+
+    if logit is not None:
+        parts.append(_long("logit_or", logit[LOGIT_METRICS], "term"))
+    if logit_error is not None:
+        parts.append(_long("logit_error", pd.DataFrame({"error": [logit_error], "failed": [1.0]}), "error"))
+
+    out = pd.concat(parts, ignore_index=True)
+    out.insert(0, "exclude_rotorcraft", spec.exclude_rotorcraft)
+    out.insert(0, "parts", ",".join(sorted(spec.include_far_parts)) if spec.include_far_parts else "all")
+    out.insert(0, "end", spec.years[1])
+    out.insert(0, "start", spec.years[0])
+    out.insert(0, "spec", spec_label(spec))
+    return out
+
+
+_WORKER_EVENTS: pd.DataFrame | None = None
+
+
+def _init_worker(ev: pd.DataFrame) -> None:
+    global _WORKER_EVENTS
+    _WORKER_EVENTS = ev
+
+
+def _evaluate_in_worker(spec: FilterSpec, logit: pd.DataFrame | None, logit_error: str | None) -> pd.DataFrame:
+    return evaluate_spec(_WORKER_EVENTS, spec, logit, logit_error)
+
+
+def run_grid(ev: pd.DataFrame, specs: list[FilterSpec], workers: int = 1) -> pd.DataFrame:
+    """
+    Evaluate every spec against one loaded event table; workers > 1 uses a process pool.
+    The logit is fitted for all specs at once by fit_logit_batch (one design matrix).
+    """
+    logit, error = {}, None
+    if specs:
+        try:
+            batch = fit_logit_batch(ev, specs, workers=workers)
+            logit = {label: d for label, d in batch.groupby("spec", sort=False)}
+        except (KeyError, ValueError, np.linalg.LinAlgError) as e:
+            error = f"{type(e).__name__}: {e}"
+    fits = [logit.get(spec_label(s)) for s in specs]
+    if workers <= 1 or len(specs) <= 1:
+        frames = [evaluate_spec(ev, s, f, error) for s, f in zip(specs, fits, strict=True)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ev,)) as ex:
+            frames = list(ex.map(_evaluate_in_worker, specs, fits, itertools.repeat(error)))
+    if not frames:
+        return pd.DataFrame(columns=GRID_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[GRID_COLUMNS]
+
+
+def events_matching_text(ev: pd.DataFrame, findings: pd.DataFrame, query: str, index_path=None) -> pd.DataFrame:
+    """Events with at least one finding whose description matches `query`."""
+    idx = TextIndex.for_texts(findings["finding_description"], index_path)
+    return ev[ev["ev_id"].isin(findings["ev_id"].to_numpy()[idx.rows(query)])]
 
 
 def main():
     ap = argparse.ArgumentParser(description="System risk analysis (CAROL/eADMS)")
-    ap.add_argument("--events", required=True, help="Path to event-level Parquet/CSV")
+    ap.add_argument("--events", required=True, help="Path to event-level Arrow (memory-mapped)/Parquet/CSV")
     ap.add_argument("--out", required=True, help="Directory for outputs")
     ap.add_argument("--parts", nargs="*", default=["91", "121", "135"], help="FAR parts to include")
     ap.add_argument("--start", type=int, default=2009)
     ap.add_argument("--end", type=int, default=2025)
     ap.add_argument("--format", choices=["parquet", "csv"], default="csv")
+    ap.add_argument(
+        "--no-cache", action="store_true", help="Refit the single-spec model instead of using the on-disk model cache"
+    )
+    ap.add_argument("--grid", help="JSON spec file (years x parts x exclude_rotorcraft); writes grid_results.parquet")
+    ap.add_argument("--workers", type=int, default=1, help="Processes for --grid")
+    ap.add_argument(
+        "--strata",
+        nargs="*",
+        default=[],
+        help="Columns to stratify the 2x2 by (e.g. ev_year far_part); enables Mantel-Haenszel output",
+    )
+    ap.add_argument("--findings", help="Finding-level table (needed for --text)")
+    ap.add_argument(
+        "--text",
+        help='Keep events with a finding matching this query (AND/OR/NOT, "phrase", prefix*), e.g. \'fuel* -"not specified"\'',
+    )
+    ap.add_argument(
+        "--text-index", default=str(OUT_FINDING_TEXT_INDEX), help="Persisted index for --findings (rebuilt if stale)"
+    )
     args = ap.parse_args()
+    if args.text and not args.findings:
+        ap.error("--text requires --findings")
 
     # Load events
-    ev = pd.read_parquet(args.events) if args.events.endswith(".parquet") else pd.read_csv(args.events)
+    ev = read_table(args.events)
+    if args.text:
+        ev = events_matching_text(ev, read_table(args.findings), args.text, args.text_index)
+
+    if args.grid:
+        specs = load_grid(args.grid)
+        for s in specs:
+            s.text_query = args.text
+        res = run_grid(ev, specs, workers=args.workers)
+        res.to_parquet(f"{args.out.rstrip('/')}/grid_results.parquet", index=False)
+        return
 
     spec = FilterSpec(
         years=(args.start, args.end),
         include_far_parts=set(args.parts),
         exclude_rotorcraft=True,
+        text_query=args.text,
     )
 
     ct = build_contingency(ev, spec=spec)
@@ -44,11 +198,23 @@ def main():
     except Exception as e:
         stats = {"error": str(e)}
 
+    # Stratified 2x2 (optional)
+    strat_per, strat_stats = None, None
+    if args.strata:
+        try:
+            strat_per, strat_stats = stratified_analysis(ev, strata=args.strata, spec=spec)
+        except Exception as e:
+            strat_stats = {"error": str(e)}
+
     # Logistic regression (optional if statsmodels installed)
     try:
-        model, or_df = fit_logit(ev, spec=spec)
+        if args.no_cache:
+            model, or_df = fit_logit(ev, spec=spec)
+            summ = model.summary().as_text()
+        else:
+            fit, or_df = fit_logit_cached(ev, spec=spec)
+            summ = fit.summary_text
         or_out = or_df
-        summ = model.summary().as_text()
     except Exception as e:
         or_out = pd.DataFrame({"term": [], "coef": [], "OR": [], "p": []})
         summ = f"Logit not run: {e}"
@@ -63,12 +229,19 @@ def main():
             json.dump(stats, f, indent=2)
         with open(f"{out}/logit_summary.txt", "w") as f:
             f.write(summ)
+        if strat_per is not None:
+            strat_per.to_csv(f"{out}/stratified_or.csv", index=False)
     else:
         ct.to_parquet(f"{out}/system_contingency.parquet", index=False)
         xt.to_parquet(f"{out}/fc_vs_other_2x2.parquet")
         or_out.to_parquet(f"{out}/logit_or.parquet", index=False)
         with open(f"{out}/chisq.json", "w") as f:
             json.dump(stats, f, indent=2)
+        if strat_per is not None:
+            strat_per.to_parquet(f"{out}/stratified_or.parquet", index=False)
+    if strat_stats is not None:
+        with open(f"{out}/mantel_haenszel.json", "w") as f:
+            json.dump(strat_stats, f, indent=2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,428 @@
+# cli/serve_api.py
+"""
+Local HTTP service for the system-risk numbers (stdlib asyncio, JSON in and out).
+
+  GET  /health
+  POST /counts            filtered events / fatal events / finding and sequence rows
+  POST /contingency       fatality by system bucket (build_contingency)
+  POST /2x2               Flight Control vs Other x Fatal vs Nonfatal, chi-square and OR
+  POST /phase-occurrence  phase x occurrence counts (?top=25)
+  POST /logit             fatal ~ fc + C(far_part) + ev_year odds ratios
+
+Every POST body is a FilterSpec as JSON, e.g. {"years": [2009, 2025], "include_far_parts": ["91"]};
+missing fields take the FilterSpec defaults and an empty body is the default spec. The sequence
+filters (phases, occurrences, defining_only) apply to /phase-occurrence only; the event-level
+endpoints answer 422 when they are set rather than ignore them.
+
+Tables are loaded once (Arrow outputs are memory-mapped) and shared read-only. Handlers
+run on a worker pool: threads over the service's own tables, or processes that each load
+the same files once (--workers > 0). Responses are cached per (endpoint, query, spec)
+and concurrent identical requests share one computation; at most --max-concurrency
+computations run at a time and the rest wait.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from analysis.logit_models import LogitDesign, build_logit_design, fit_logit_batch
+from analysis.system_buckets import event_level_with_system_flags
+from analysis.system_risk import FilterSpec, _is_fatal, build_contingency, chisq_table, filter_mask
+from config import (
+    OUT_EVENT_LEVEL,
+    OUT_EVENT_LEVEL_ARROW,
+    OUT_FINDING_LEVEL_LABELED,
+    OUT_FINDING_LEVEL_LABELED_ARROW,
+    OUT_FINDING_TEXT_INDEX,
+    OUT_SEQ_LABELED,
+    OUT_SEQ_LABELED_ARROW,
+)
+from search import QuerySyntaxError, TextIndex
+from store import read_table
+
+MAX_BODY = 64 * 1024
+
+# -------------------------
+# Shared tables
+# -------------------------
+
+
+@dataclass
+class Tables:
+    """The loaded outputs plus per-process derived structures, built on first use."""
+
+    events: pd.DataFrame
+    findings: pd.DataFrame | None = None
+    seq: pd.DataFrame | None = None
+    text_index_path: str | None = str(OUT_FINDING_TEXT_INDEX)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _text: TextIndex | None = field(default=None, repr=False)
+    _design: LogitDesign | None = field(default=None, repr=False)
+
+    @classmethod
+    def load(
+        cls, events: str, findings: str | None = None, seq: str | None = None, text_index: str | None = None
+    ) -> Tables:
+        ev = read_table(events)
+        fl = read_table(findings) if findings else None
+        if "system_component" not in ev.columns and fl is not None:
+            # derive it from the findings like the app does; named so _normalize_system yields "Flight Control"
+            top = event_level_with_system_flags(ev, fl).drop_duplicates("ev_id").set_index("ev_id")["system_bucket"]
+            ev = ev.assign(system_component=ev["ev_id"].map(top.replace({"Flight Controls": "Flight Control"})))
+        return cls(ev, fl, read_table(seq) if seq else None, text_index)
+
+    def text_index(self) -> TextIndex:
+        with self._lock:
+            if self._text is None:
+                self._text = TextIndex.for_texts(self.findings["finding_description"], self.text_index_path)
+            return self._text
+
+    def design(self) -> LogitDesign:
+        with self._lock:
+            if self._design is None:
+                self._design = build_logit_design(self.events)
+            return self._design
+
+
+class BadRequest(ValueError):
+    """A request the service cannot answer as asked (bad JSON, unknown field, missing table/column)."""
+
+
+_LIST_FIELDS = {"severity", "phases", "occurrences", "makes", "parts"}
+
+
+def spec_from_json(body: dict) -> FilterSpec:
+    known = {f.name for f in fields(FilterSpec)}
+    unknown = set(body) - known
+    if unknown:
+        raise BadRequest(f"unknown FilterSpec fields: {sorted(unknown)}")
+    kw = dict(body)
+    if "years" in kw:
+        if not (isinstance(kw["years"], list) and len(kw["years"]) == 2):
+            raise BadRequest("years must be [start, end]")
+        kw["years"] = (int(kw["years"][0]), int(kw["years"][1]))
+    for k in (_LIST_FIELDS | {"include_far_parts"}) & set(kw):
+        if kw[k] is None:
+            continue
+        if not (isinstance(kw[k], list) and all(isinstance(v, str | int) for v in kw[k])):
+            raise BadRequest(f"{k} must be a list of strings")  # a bare string would split into characters
+        kw[k] = [str(v) for v in kw[k]]
+    if kw.get("include_far_parts") is not None:
+        kw["include_far_parts"] = set(kw["include_far_parts"])
+    return FilterSpec(**kw)
+
+
+def spec_key(spec: FilterSpec) -> str:
+    """Canonical JSON for a spec (sets and lists sorted), so equivalent bodies share a cache entry."""
+    d = {f.name: getattr(spec, f.name) for f in fields(FilterSpec)}
+    d = {k: sorted(v) if isinstance(v, set | list) and k != "years" else v for k, v in d.items()}
+    return json.dumps(d, sort_keys=True, default=list)
+
+
+# -------------------------
+# Handlers (run on the worker pool)
+# -------------------------
+
+
+def _has_extra_filters(spec: FilterSpec) -> bool:
+    return bool(spec.severity or spec.parts or spec.makes or spec.model_contains or spec.text_query)
+
+
+def _no_sequence_filters(spec: FilterSpec, endpoint: str) -> None:
+    """Event-level endpoints cannot honor the sequence-row filters; refuse them instead of ignoring them."""
+    used = [k for k in ("phases", "occurrences", "defining_only") if getattr(spec, k)]
+    if used:
+        raise BadRequest(f"{endpoint} does not apply the sequence filters {used}; use /phase-occurrence")
+
+
+def event_mask(t: Tables, spec: FilterSpec) -> np.ndarray:
+    """Events passing the spec: filter_mask plus severity, FAR part, make, model and finding-text filters."""
+    ev = t.events
+    m = filter_mask(ev, spec)
+    if spec.parts:
+        if "far_part" not in ev:
+            raise BadRequest("parts needs a far_part column in the events table")
+        m &= ev["far_part"].astype(str).isin(spec.parts).to_numpy(dtype=bool)
+    if spec.severity and "ev_highest_injury" in ev:
+        m &= ev["ev_highest_injury"].astype("string").isin(spec.severity).fillna(False).to_numpy(dtype=bool)
+    if spec.makes and "acft_make" in ev:
+        m &= ev["acft_make"].astype("string").isin(spec.makes).fillna(False).to_numpy(dtype=bool)
+    if spec.model_contains and "acft_model" in ev:
+        hit = ev["acft_model"].astype("string").str.contains(spec.model_contains, case=False, regex=False)
+        m &= hit.fillna(False).to_numpy(dtype=bool)
+    if spec.text_query:
+        if t.findings is None:
+            raise BadRequest("text_query needs the service to be started with --findings")
+        try:
+            rows = t.text_index().rows(spec.text_query)
+        except QuerySyntaxError as e:
+            raise BadRequest(str(e)) from e
+        m &= ev["ev_id"].isin(t.findings["ev_id"].to_numpy()[rows]).to_numpy(dtype=bool)
+    return m
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    return json.loads(df.to_json(orient="records"))
+
+
+def counts(t: Tables, spec: FilterSpec, query: dict) -> dict:
+    _no_sequence_filters(spec, "/counts")
+    ev = t.events[event_mask(t, spec)]
+    ids = ev["ev_id"] if "ev_id" in ev else pd.Series(dtype="string")
+    out = {"events": len(ev), "fatal_events": int(_is_fatal(ev["ev_highest_injury"]).fillna(False).sum())}
+    if t.findings is not None:
+        out["findings"] = int(t.findings["ev_id"].isin(ids).sum())
+    if t.seq is not None:
+        out["seq"] = int(t.seq["ev_id"].isin(ids).sum())
+    return out
+
+
+def contingency(t: Tables, spec: FilterSpec, query: dict) -> dict:
+    _no_sequence_filters(spec, "/contingency")
+    return {"rows": _records(build_contingency(t.events[event_mask(t, spec)], spec=spec))}
+
+
+def two_by_two(t: Tables, spec: FilterSpec, query: dict) -> dict:
+    from scipy.stats import chi2_contingency
+
+    _no_sequence_filters(spec, "/2x2")
+    xt = chisq_table(t.events[event_mask(t, spec)], spec=spec)
+    out = {"table": {row: {k: int(v) for k, v in r.items()} for row, r in xt.to_dict(orient="index").items()}}
+    (a, b), (c, d) = xt.to_numpy() + 0.5  # Haldane-Anscombe
+    log_or, se = np.log(a * d / (b * c)), np.sqrt(1 / a + 1 / b + 1 / c + 1 / d)
+    out.update(
+        odds_ratio=float(np.exp(log_or)), or_ci=[float(np.exp(log_or - 1.96 * se)), float(np.exp(log_or + 1.96 * se))]
+    )
+    try:
+        chi2, p, dof, _ = chi2_contingency(xt.to_numpy())
+        out.update(chi2=float(chi2), p=float(p), dof=int(dof))
+    except ValueError as e:
+        out.update(chi2=None, p=None, dof=None, note=str(e))
+    return out
+
+
+def phase_occurrence(t: Tables, spec: FilterSpec, query: dict) -> dict:
+    if t.seq is None:
+        raise BadRequest("phase-occurrence needs the service to be started with --seq")
+    top = int(query.get("top", 25))
+    s = t.seq[t.seq["ev_id"].isin(t.events.loc[event_mask(t, spec), "ev_id"])]
+    if spec.phases:
+        s = s[s["phase_meaning"].isin(spec.phases)]
+    if spec.occurrences:
+        s = s[s["occurrence_meaning"].isin(spec.occurrences)]
+    if spec.defining_only and "Defining_ev" in s:
+        s = s[pd.to_numeric(s["Defining_ev"], errors="coerce").eq(1)]
+    top_occ = s["occurrence_meaning"].value_counts().head(top).index.tolist()
+    top_phase = s["phase_meaning"].value_counts().head(top).index.tolist()
+    heat = (
+        s[s["occurrence_meaning"].isin(top_occ) & s["phase_meaning"].isin(top_phase)]
+        .groupby(["phase_meaning", "occurrence_meaning"])
+        .size()
+        .reset_index(name="count")
+    )
+    return {"phases": top_phase, "occurrences": top_occ, "cells": _records(heat)}
+
+
+def logit(t: Tables, spec: FilterSpec, query: dict) -> dict:
+    _no_sequence_filters(spec, "/logit")
+    # the shared design covers the years / FAR part / rotorcraft filters; other filters refit on the subset
+    data = t.events[event_mask(t, spec)] if _has_extra_filters(spec) else t.design()
+    return {"terms": _records(fit_logit_batch(data, [spec]))}
+
+
+HANDLERS = {
+    "/counts": counts,
+    "/contingency": contingency,
+    "/2x2": two_by_two,
+    "/phase-occurrence": phase_occurrence,
+    "/logit": logit,
+}
+
+_WORKER_TABLES: Tables | None = None
+
+
+def _init_worker(paths: dict) -> None:
+    global _WORKER_TABLES
+    _WORKER_TABLES = Tables.load(**paths)
+
+
+def run_handler(path: str, body: dict, query: dict, tables: Tables | None = None) -> dict:
+    """Entry point on the pool: the given tables (thread pool) or this worker process's own."""
+    try:
+        return HANDLERS[path](tables or _WORKER_TABLES, spec_from_json(body), query)
+    except KeyError as e:
+        raise BadRequest(f"missing column: {e}") from e
+
+
+# -------------------------
+# Service
+# -------------------------
+
+
+class Service:
+    def __init__(
+        self,
+        tables: Tables,
+        executor: Executor | None = None,
+        max_concurrency: int = 4,
+        cache_entries: int = 256,
+        in_process: bool | None = None,
+    ):
+        self.tables = tables
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="api")
+        self.in_process = not isinstance(self.executor, ProcessPoolExecutor) if in_process is None else in_process
+        self.cache: OrderedDict[str, bytes] = OrderedDict()
+        self.cache_entries = cache_entries
+        self.inflight: dict[str, asyncio.Future] = {}
+        self.limit = asyncio.Semaphore(max_concurrency)
+        self.stats = {"requests": 0, "cache_hits": 0, "computed": 0}
+
+    async def respond(self, method: str, target: str, body: bytes) -> tuple[int, bytes]:
+        self.stats["requests"] += 1
+        url = urlsplit(target)
+        if url.path == "/health" and method == "GET":
+            t = self.tables
+            rows = {"events": len(t.events), "findings": None if t.findings is None else len(t.findings)}
+            rows["seq"] = None if t.seq is None else len(t.seq)
+            return 200, _json({"status": "ok", "rows": rows, **self.stats})
+        if url.path not in HANDLERS:
+            return 404, _json({"error": f"no endpoint {url.path}", "endpoints": ["/health", *HANDLERS]})
+        if method != "POST":
+            return 405, _json({"error": "use POST with a FilterSpec JSON body"})
+        try:
+            spec_body = json.loads(body or b"{}")
+            if not isinstance(spec_body, dict):
+                raise BadRequest("body must be a JSON object")
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            key = f"{url.path}?{json.dumps(query, sort_keys=True)}|{spec_key(spec_from_json(spec_body))}"
+        except (json.JSONDecodeError, BadRequest, TypeError, ValueError) as e:
+            return 400, _json({"error": str(e)})
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return 200, self.cache[key]
+        if key in self.inflight:  # same request already computing: share its result
+            self.stats["cache_hits"] += 1
+            return await asyncio.shield(self.inflight[key])
+
+        fut = asyncio.get_running_loop().create_future()
+        self.inflight[key] = fut
+        out = None
+        try:
+            async with self.limit:
+                call = partial(run_handler, url.path, spec_body, query, self.tables if self.in_process else None)
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, call)
+            out = (200, _json(result))
+            self.stats["computed"] += 1
+            self.cache[key] = out[1]
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        except BadRequest as e:
+            out = (422, _json({"error": str(e)}))
+        except Exception as e:  # keep serving; report the failure to this caller
+            out = (500, _json({"error": f"{type(e).__name__}: {e}"}))
+        finally:
+            del self.inflight[key]
+            # `out` is unset only when this task was cancelled; requests sharing it still get an answer
+            fut.set_result(out or (503, _json({"error": "request cancelled before it completed; retry"})))
+        return out
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {k.strip().lower(): v.strip() for k, _, v in (h.partition(":") for h in header_lines if h)}
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY:
+                status, payload = 413, _json({"error": f"body over {MAX_BODY} bytes"})
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.respond(method.upper(), target, body)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            status, payload = 400, _json({"error": "malformed HTTP request"})
+        reason = HTTPStatus(status).phrase
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.Server:
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+def _json(obj) -> bytes:
+    return json.dumps(_clean(obj), allow_nan=False, default=str).encode()
+
+
+def _clean(obj):
+    """NaN/inf -> None so the payload is strict JSON."""
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _clean(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clean(v) for v in obj]
+    return obj
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve system-risk analytics over HTTP (JSON FilterSpec in, JSON out)")
+    ap.add_argument("--events", default=None, help="Event-level Arrow/Parquet/CSV (default: the build's outputs)")
+    ap.add_argument("--findings", default=None, help="Finding-level table (text_query, derived system_component)")
+    ap.add_argument("--seq", default=None, help="Sequence table (phase-occurrence)")
+    ap.add_argument("--text-index", default=str(OUT_FINDING_TEXT_INDEX), help="Persisted finding text index")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=0, help="Worker processes (0: threads in this process)")
+    ap.add_argument("--max-concurrency", type=int, default=4, help="Computations running at once; others wait")
+    ap.add_argument("--cache-entries", type=int, default=256, help="Responses kept in the LRU response cache")
+    args = ap.parse_args()
+
+    def default(arrow, parquet):
+        return str(arrow if arrow.exists() else parquet)
+
+    paths = {
+        "events": args.events or default(OUT_EVENT_LEVEL_ARROW, OUT_EVENT_LEVEL),
+        "findings": args.findings or default(OUT_FINDING_LEVEL_LABELED_ARROW, OUT_FINDING_LEVEL_LABELED),
+        "seq": args.seq or default(OUT_SEQ_LABELED_ARROW, OUT_SEQ_LABELED),
+        "text_index": args.text_index,
+    }
+    tables = Tables.load(**paths)
+    executor = (
+        ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(paths,))
+        if args.workers > 0
+        else None
+    )
+
+    async def serve() -> None:
+        service = Service(tables, executor, max_concurrency=args.max_concurrency, cache_entries=args.cache_entries)
+        server = await service.start(args.host, args.port)
+        print(f"Serving on http://{args.host}:{args.port} ({len(tables.events):,} events)")
+        async with server:
+            await server.serve_forever()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
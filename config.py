@@ -5,6 +5,9 @@ ROOT = Path("data")
 RAW = ROOT / "raw"
 DICT = ROOT / "dict"
 
+# Make/model alias table (exact + pattern rows); its content hash versions the resolution cache
+MAKE_MODEL_ALIASES = DICT / "make_model_aliases.csv"
+
 # Data dictionary (master source)
 DICT_CSV = RAW / "eADMSPUB_DataDictionary.csv"  # keep as-is (from eADMS)
 
@@ -53,3 +56,59 @@ OUT_EVENT_LEVEL = ROOT / "out/event_level.parquet"
 OUT_FINDING_LEVEL = ROOT / "out/finding_level.parquet"
 OUT_FINDING_LEVEL_LABELED = ROOT / "out/finding_level_labeled.parquet"
 OUT_SEQ_LABELED = ROOT / "out/events_sequence_labeled.parquet"
+
+# Uncompressed Arrow IPC copies with final dtypes (memory-mapped by the app/CLI)
+OUT_EVENT_LEVEL_ARROW = ROOT / "out/event_level.arrow"
+OUT_FINDING_LEVEL_LABELED_ARROW = ROOT / "out/finding_level_labeled.arrow"
+OUT_SEQ_LABELED_ARROW = ROOT / "out/events_sequence_labeled.arrow"
+
+# Inverted index over finding descriptions (search.TextIndex; rebuilt with the outputs)
+OUT_FINDING_TEXT_INDEX = ROOT / "out/finding_text_index.npz"
+
+# Ragged per-event sequence arrays (seqstore.SequenceStore; one .npy per array)
+OUT_SEQ_STORE = ROOT / "out/seq_store"
+
+# Sparse event x feature matrix for cohort queries (analysis.cohorts.FeatureMatrix)
+OUT_COHORT_MATRIX = ROOT / "out/event_features.npz"
+
+# Published output versions: the app follows the CURRENT pointer and hot-swaps new versions
+PUBLISH_DIR = ROOT / "out/versions"
+CURRENT_POINTER = ROOT / "out/CURRENT"
+PUBLISH_KEEP = 3
+APP_POLL_SECONDS = 5.0
+
+# Year-partitioned outputs maintained by delta ingestion (main.py --delta)
+OUT_PARTS = ROOT / "out/parts"
+
+# Which aircraft row(s) finding_level joins per finding: "first" | "all" | "finding" (labelers.AIRCRAFT_POLICIES)
+FINDING_AIRCRAFT_POLICY = "first"
+
+# Incrementally maintained dashboard aggregates (analysis/aggregates.py); full cross-check every N updates
+AGG_DIR = ROOT / "out/aggregates"
+AGG_VERIFY_EVERY = 10
+
+# Build reports (timings, traces, profiles)
+REPORTS = Path("reports")
+
+# Benchmarks: synthetic inputs per scale, results, and the stored baseline
+SYNTH_DIR = ROOT / "synth"
+BENCH_RESULTS = REPORTS / "bench" / "results.json"
+BENCH_BASELINE = Path("bench") / "baseline.json"
+
+# Caches (safe to delete; rebuilt on demand)
+CACHE_DIR = ROOT / "cache"
+MODEL_CACHE_DIR = CACHE_DIR / "models"
+CANON_CACHE_DIR = CACHE_DIR / "canonical"
+MODEL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Download files (exports.ExportCache), keyed by data version + filter spec + dataset + format
+EXPORT_CACHE_DIR = CACHE_DIR / "exports"
+EXPORT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+EXPORT_CHUNK_ROWS = 50_000
+
+# Speculative prefetch of the filter states next to the current one (prefetch.Prefetcher):
+# cached views, thread CPU seconds per batch, max share of wall time, and the worker's nice value
+PREFETCH_CACHE_ENTRIES = 32
+PREFETCH_CPU_SECONDS = 2.0
+PREFETCH_DUTY = 0.5
+PREFETCH_NICE = 10
@@ -0,0 +1,154 @@
+# exports.py
+"""
+Download files, written only when asked for and cached on disk.
+
+A download is identified by (data version, filter spec, dataset, format). The first
+request writes the file into EXPORT_CACHE_DIR in row chunks (CSV appended chunk by
+chunk, Parquet one row group per chunk, Excel rows written at increasing offsets),
+so a large filtered table is never rendered as one string; later requests for the
+same key reuse the file. Least-recently-used files are evicted past max_bytes.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import importlib.util
+import os
+import tempfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES, EXPORT_CHUNK_ROWS
+
+EXCEL_ENGINE = next((e for e in ("openpyxl", "xlsxwriter") if importlib.util.find_spec(e)), None)
+EXCEL_MAX_ROWS = 1_048_576
+
+# format -> (file suffix, mime type)
+FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def available_formats() -> list[str]:
+    """Formats this environment can write (Excel needs openpyxl or xlsxwriter)."""
+    return [f for f in FORMATS if f != "xlsx" or EXCEL_ENGINE is not None]
+
+
+def _chunks(df: pd.DataFrame, rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, max(len(df), 1), max(rows, 1)):
+        yield df.iloc[start : start + rows]
+
+
+def write_export(
+    df: pd.DataFrame, path: str | Path, fmt: str, index: bool = False, chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> None:
+    """Write `df` to `path` as `fmt`, `chunk_rows` rows at a time."""
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            for i, chunk in enumerate(_chunks(df, chunk_rows)):
+                chunk.to_csv(f, header=i == 0, index=index)
+    elif fmt == "parquet":
+        schema = pa.Schema.from_pandas(df, preserve_index=index)
+        with pq.ParquetWriter(path, schema) as w:
+            for chunk in _chunks(df, chunk_rows):
+                w.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=index))
+    elif fmt == "xlsx":
+        if EXCEL_ENGINE is None:
+            raise ImportError("Excel export needs openpyxl or xlsxwriter")
+        if len(df) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"{len(df):,} rows exceed Excel's sheet limit of {EXCEL_MAX_ROWS - 1:,}; use CSV or Parquet"
+            )
+        with pd.ExcelWriter(path, engine=EXCEL_ENGINE) as xw:
+            row = 0
+            for i, chunk in enumerate(_chunks(df, chunk_rows)):
+                chunk.to_excel(xw, sheet_name="data", startrow=row, header=i == 0, index=index)
+                row += len(chunk) + (i == 0)
+    else:
+        raise ValueError(f"unknown export format {fmt!r}; expected one of {list(FORMATS)}")
+
+
+def export_key(version: str | None, spec_key: str, name: str, fmt: str) -> str:
+    return hashlib.sha256(repr((version, spec_key, name, fmt)).encode()).hexdigest()[:32]
+
+
+class ExportCache:
+    """On-disk cache of export files keyed by export_key, evicting least-recently-used files past max_bytes."""
+
+    def __init__(
+        self,
+        root: str | Path = EXPORT_CACHE_DIR,
+        max_bytes: int = EXPORT_CACHE_MAX_BYTES,
+        chunk_rows: int = EXPORT_CHUNK_ROWS,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.chunk_rows = chunk_rows
+
+    def path(self, version: str | None, spec_key: str, name: str, fmt: str) -> Path:
+        return self.root / f"{export_key(version, spec_key, name, fmt)}{FORMATS[fmt][0]}"
+
+    def get(self, version: str | None, spec_key: str, name: str, fmt: str) -> Path | None:
+        p = self.path(version, spec_key, name, fmt)
+        try:
+            os.utime(p)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return p
+
+    def get_or_write(
+        self,
+        version: str | None,
+        spec_key: str,
+        name: str,
+        fmt: str,
+        frame: pd.DataFrame | Callable[[], pd.DataFrame],
+        index: bool = False,
+    ) -> Path:
+        """The cached file for the key, writing it from `frame` (or `frame()`, called only on a miss) first."""
+        hit = self.get(version, spec_key, name, fmt)
+        if hit is not None:
+            return hit
+        df = frame() if callable(frame) else frame
+        p = self.path(version, spec_key, name, fmt)
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            write_export(df, tmp, fmt, index=index, chunk_rows=self.chunk_rows)
+            os.replace(tmp, p)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+        self.evict(protect=p)
+        return p
+
+    def evict(self, protect: Path | None = None) -> None:
+        # other sessions share the directory and may evict or replace files while we scan
+        suffixes = {s for s, _ in FORMATS.values()}
+        entries, total = [], 0
+        for p in self.root.iterdir():
+            if p.suffix not in suffixes:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                st = p.stat()
+                total += st.st_size
+                if p != protect:
+                    entries.append((st.st_mtime, st.st_size, p))
+        entries.sort(key=lambda e: e[0])
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            p.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for p in self.root.glob("*"):
+            if p.suffix in {s for s, _ in FORMATS.values()}:
+                p.unlink(missing_ok=True)
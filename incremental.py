@@ -0,0 +1,368 @@
+# incremental.py
+"""
+Delta ingestion of a new CAROL export into year-partitioned outputs.
+
+Every event gets a content hash over its rows in all four raw tables. Against the
+hashes stored from the previous ingest, ev_ids are classified new / changed /
+deleted; only new and changed events go through the builders and labelers (all
+of which are row- or ev_id-local), and the affected ev_year partitions are
+rewritten with those events upserted. The manifest records a generation number
+per partition so downstream caches can invalidate just what changed.
+
+The data-quality suite gates every write: "load" checks run on the whole export,
+"build"/"label" checks on the rebuilt events before any partition is touched, and
+the hash state and manifest are persisted last, so a rejected export is retried
+on the next run instead of being recorded as ingested. The manifest's
+consolidated_generation only advances once the caller has published a generation
+(mark_consolidated), so a run that fails after ingest is consolidated again next time.
+
+A full rebuild is forced when there is no prior state, or when the data
+dictionary or aircraft policy differs from the one the partitions were built with.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    FINDING_AIRCRAFT_POLICY,
+    OUT_EVENT_LEVEL,
+    OUT_FINDING_LEVEL,
+    OUT_FINDING_LEVEL_LABELED,
+    OUT_PARTS,
+    OUT_SEQ_LABELED,
+    RAW,
+)
+from instrument import Instrumenter
+from labelers import AircraftIndex, build_event_level, build_finding_level, label_findings, label_sequence
+from loaders import read_aircraft, read_events, read_events_sequence, read_findings
+from quality.checks import enforce, run_expectations
+from store import write_parquet
+
+RAW_FILES = {
+    "events": "events.csv",
+    "findings": "findings.csv",
+    "aircraft": "aircraft.csv",
+    "seq": "events_sequence.csv",
+}
+DICT_FILE = "eADMSPUB_DataDictionary.csv"
+
+# partitioned table -> flat output it consolidates into
+PART_TABLES = {
+    "event_level": OUT_EVENT_LEVEL,
+    "finding_level": OUT_FINDING_LEVEL,
+    "finding_level_labeled": OUT_FINDING_LEVEL_LABELED,
+    "events_sequence_labeled": OUT_SEQ_LABELED,
+}
+NULL_PART = "__null__"
+STATE_FILE = "_ev_hashes.parquet"
+MANIFEST_FILE = "_manifest.json"
+
+Check = Callable[[str, dict[str, pd.DataFrame]], object]  # (stage, tables) -> report; raises DataQualityError
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)  # odd multiplier to combine per-table hashes
+
+
+# -------------------------
+# Hashing + diff
+# -------------------------
+
+
+def event_hashes(events: pd.DataFrame, related: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per ev_id seen in any table: ev_id, ev_year (NA when the event row is
+    absent, e.g. outside the loader's year window), row_hash. row_hash is an
+    order-insensitive (wrapping uint64 sum) combination of the ev_id's rows in every
+    table, so a reordered export hashes the same but any edited, added or removed row does not.
+    """
+    tables = [events, *(related[k] for k in sorted(related))]
+    ids = pd.Index(pd.unique(pd.concat([t["ev_id"] for t in tables], ignore_index=True).dropna()))
+    total = np.zeros(len(ids), dtype=np.uint64)
+    for df in tables:
+        acc = np.zeros(len(ids), dtype=np.uint64)
+        if len(df):
+            codes = ids.get_indexer(df["ev_id"])
+            keep = codes >= 0
+            h = pd.util.hash_pandas_object(df, index=False).to_numpy()
+            np.add.at(acc, codes[keep], h[keep])
+        total = total * _MIX + acc
+    year_of = events.drop_duplicates("ev_id").set_index("ev_id")["ev_year"]
+    return pd.DataFrame({"ev_id": ids.to_numpy(), "ev_year": year_of.reindex(ids).to_numpy(), "row_hash": total})
+
+
+@dataclass(frozen=True)
+class Delta:
+    new: pd.Index
+    changed: pd.Index
+    deleted: pd.Index
+    years: frozenset  # partition keys touched by any of the above
+
+    @property
+    def touched(self) -> pd.Index:
+        """ev_ids to (re)build."""
+        return self.new.append(self.changed)
+
+    @property
+    def removed(self) -> pd.Index:
+        """ev_ids whose existing rows must leave their old partitions."""
+        return self.changed.append(self.deleted)
+
+    def summary(self) -> dict:
+        return {"new": len(self.new), "changed": len(self.changed), "deleted": len(self.deleted)}
+
+
+def _part_key(year) -> str:
+    return NULL_PART if pd.isna(year) else str(int(year))
+
+
+def diff_events(old: pd.DataFrame, new: pd.DataFrame) -> Delta:
+    """Classify ev_ids between two event_hashes() frames."""
+    m = old.merge(new, on="ev_id", how="outer", suffixes=("_old", "_new"), indicator=True)
+    is_new = m["_merge"].eq("right_only")
+    is_del = m["_merge"].eq("left_only")
+    is_chg = m["_merge"].eq("both") & m["row_hash_old"].ne(m["row_hash_new"])
+    years = {_part_key(y) for y in m.loc[is_chg | is_del, "ev_year_old"]}
+    years |= {_part_key(y) for y in m.loc[is_chg | is_new, "ev_year_new"]}
+    return Delta(
+        new=pd.Index(m.loc[is_new, "ev_id"]),
+        changed=pd.Index(m.loc[is_chg, "ev_id"]),
+        deleted=pd.Index(m.loc[is_del, "ev_id"]),
+        years=frozenset(years),
+    )
+
+
+# -------------------------
+# Partition IO
+# -------------------------
+
+
+def part_path(parts_dir: Path, table: str, key: str) -> Path:
+    return Path(parts_dir) / table / f"ev_year={key}" / "part.parquet"
+
+
+def read_partitions(parts_dir: Path, table: str) -> pd.DataFrame:
+    """All partitions of one table, concatenated (empty frame when none exist)."""
+    files = sorted((Path(parts_dir) / table).glob("ev_year=*/part.parquet"))
+    if not files:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+
+
+def read_manifest(parts_dir: Path = OUT_PARTS) -> dict:
+    p = Path(parts_dir) / MANIFEST_FILE
+    return json.loads(p.read_text()) if p.exists() else {}
+
+
+def _write_manifest(parts_dir: Path, manifest: dict) -> None:
+    tmp = Path(parts_dir) / (MANIFEST_FILE + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, Path(parts_dir) / MANIFEST_FILE)
+
+
+def needs_consolidation(manifest: dict) -> bool:
+    """True while the partitions hold a generation the flat outputs were not (successfully) rebuilt from."""
+    return int(manifest.get("consolidated_generation", 0)) < int(manifest.get("generation", 0))
+
+
+def mark_consolidated(generation: int, parts_dir: str | Path = OUT_PARTS) -> None:
+    """Record that everything downstream of the partitions is up to date with `generation`."""
+    manifest = read_manifest(parts_dir)
+    manifest["consolidated_generation"] = generation
+    _write_manifest(Path(parts_dir), manifest)
+
+
+def _sha256(path: Path) -> str | None:
+    if not Path(path).exists():
+        return None
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+# -------------------------
+# Ingest
+# -------------------------
+
+
+def load_export(raw_dir: Path) -> dict[str, pd.DataFrame]:
+    raw_dir = Path(raw_dir)
+    return {
+        "events": read_events(raw_dir / RAW_FILES["events"]),
+        "findings": read_findings(raw_dir / RAW_FILES["findings"]),
+        "aircraft": read_aircraft(raw_dir / RAW_FILES["aircraft"]),
+        "seq": read_events_sequence(raw_dir / RAW_FILES["seq"]),
+    }
+
+
+def build_tables(raw: dict[str, pd.DataFrame], dict_csv: Path, policy: str) -> dict[str, pd.DataFrame]:
+    """The main.py build, on whatever subset of events `raw` holds."""
+    events, findings, aircraft, seq = raw["events"], raw["findings"], raw["aircraft"], raw["seq"]
+    acft_idx = AircraftIndex.build(aircraft)
+    finding_lvl = build_finding_level(events, findings, acft_idx, policy=policy)
+    return {
+        "event_level": build_event_level(events, acft_idx),
+        "finding_level": finding_lvl,
+        "finding_level_labeled": label_findings(finding_lvl),
+        "events_sequence_labeled": label_sequence(seq, dict_csv_path=dict_csv),
+    }
+
+
+def _enforce(stage: str, tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    report = run_expectations(tables, stage=stage)
+    enforce(report)
+    return report
+
+
+# expectation-suite table name -> partitioned table, per check stage
+CHECKED = {
+    "build": {"event_level": "event_level", "finding_level": "finding_level"},
+    "label": {"seq_labeled": "events_sequence_labeled"},
+}
+
+
+def check_built(tables: dict[str, pd.DataFrame], check: Check = _enforce) -> None:
+    """Run the "build" and "label" checks on whichever build_tables() frames are present."""
+    for stage, names in CHECKED.items():
+        check(stage, {name: tables[t] for name, t in names.items() if t in tables})
+
+
+def _year_keys(df: pd.DataFrame, year_of: pd.Series) -> pd.Series:
+    """Partition key per row, from the row's own ev_year or the event's."""
+    years = df["ev_year"] if "ev_year" in df.columns else df["ev_id"].map(year_of)
+    return years.map(_part_key)
+
+
+def ingest(
+    raw_dir: str | Path = RAW,
+    parts_dir: str | Path = OUT_PARTS,
+    dict_csv: str | Path | None = None,
+    policy: str = FINDING_AIRCRAFT_POLICY,
+    full: bool = False,
+    inst: Instrumenter | None = None,
+    check: Check = _enforce,
+) -> dict:
+    """
+    Upsert one export into the partitioned outputs; returns the new manifest.
+    `check(stage, tables)` runs the expectation suite and raises before anything is written.
+    """
+    raw_dir, parts_dir = Path(raw_dir), Path(parts_dir)
+    dict_csv = Path(dict_csv) if dict_csv is not None else raw_dir / DICT_FILE
+    inst = inst or Instrumenter(enabled=False)
+    manifest = read_manifest(parts_dir)
+    dict_sha = _sha256(dict_csv)
+
+    with inst.stage("delta_read_export"):
+        raw = load_export(raw_dir)
+    with inst.stage("checks_load"):
+        check("load", raw)
+    with inst.stage("delta_hash", rows_in=len(raw["events"])):
+        state = event_hashes(raw["events"], {k: v for k, v in raw.items() if k != "events"})
+
+    state_path = parts_dir / STATE_FILE
+    rebuild = (
+        full
+        or not state_path.exists()
+        or manifest.get("dictionary_sha256") != dict_sha
+        or manifest.get("aircraft_policy") != policy
+    )
+    old_state = state.iloc[:0] if rebuild else pd.read_parquet(state_path)
+    delta = diff_events(old_state, state)
+    if rebuild:
+        # stale partitions from an earlier layout are dropped below
+        for table in PART_TABLES:
+            delta = Delta(delta.new, delta.changed, delta.deleted, delta.years | _existing_keys(parts_dir, table))
+
+    with inst.stage("delta_build", rows_in=len(delta.touched)):
+        touched = set(delta.touched)
+        sub = {k: v[v["ev_id"].isin(touched)] for k, v in raw.items()}
+        built = build_tables(sub, dict_csv, policy)
+    with inst.stage("checks_build"):
+        check_built(built, check)
+
+    year_of = state.set_index("ev_id")["ev_year"]
+    drop_ids = set(delta.removed) | touched
+    generation = int(manifest.get("generation", 0)) + 1
+    partitions = manifest.get("partitions", {}) if not rebuild else {}
+    changed: dict[str, list[str]] = {}
+
+    with inst.stage("delta_upsert") as st:
+        for table, fresh in built.items():
+            fresh_keys = _year_keys(fresh, year_of)
+            parts = partitions.setdefault(table, {})
+            for key in sorted(delta.years):
+                path = part_path(parts_dir, table, key)
+                cur = pd.read_parquet(path) if path.exists() and not rebuild else None
+                add = fresh[fresh_keys.eq(key).to_numpy()]
+                if cur is None:
+                    out = add
+                else:
+                    kept = cur[~cur["ev_id"].isin(drop_ids)]
+                    if len(kept) == len(cur) and add.empty:
+                        continue  # the touched events have no rows in this table/partition
+                    out = pd.concat([kept, add], ignore_index=True) if len(add) else kept.reset_index(drop=True)
+                if out.empty:
+                    if path.exists():
+                        path.unlink()
+                        path.parent.rmdir()
+                    if parts.pop(key, None) is not None:
+                        changed.setdefault(table, []).append(key)
+                    continue
+                write_parquet(out, path)
+                st.wrote(path)
+                parts[key] = {"rows": len(out), "generation": generation}
+                changed.setdefault(table, []).append(key)
+
+    if not changed and not rebuild:
+        generation -= 1
+    # state and manifest last: an interrupted upsert is redone from the old state next run
+    write_parquet(state, state_path)
+    consolidated = 0 if rebuild else int(manifest.get("consolidated_generation", 0))
+    manifest = {
+        "generation": generation,
+        "consolidated_generation": consolidated,
+        "updated_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "source": str(raw_dir),
+        "dictionary_sha256": dict_sha,
+        "aircraft_policy": policy,
+        "full_rebuild": rebuild,
+        "delta": delta.summary(),
+        "changed_partitions": changed,
+        "partitions": partitions,
+    }
+    _write_manifest(parts_dir, manifest)
+    return manifest
+
+
+def _existing_keys(parts_dir: Path, table: str) -> frozenset:
+    root = Path(parts_dir) / table
+    return frozenset(p.name.split("=", 1)[1] for p in root.glob("ev_year=*")) if root.exists() else frozenset()
+
+
+def consolidate(
+    parts_dir: str | Path = OUT_PARTS,
+    tables: dict[str, Path] | None = None,
+    check: Check | None = _enforce,
+) -> dict[str, pd.DataFrame]:
+    """
+    Rewrite the flat outputs the app reads from the partitions; returns the frames.
+    With `check`, the consolidated frames must pass the build/label checks before any flat file is replaced.
+    """
+    tables = tables or PART_TABLES
+    out = {}
+    for table in tables:
+        df = read_partitions(Path(parts_dir), table)
+        if "ev_id" in df.columns:
+            df = df.sort_values("ev_id", kind="stable", ignore_index=True)
+        out[table] = df
+    if check is not None:
+        check_built(out, check)
+    for table, flat in tables.items():
+        write_parquet(out[table], Path(flat))
+    return out
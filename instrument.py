@@ -0,0 +1,175 @@
+# instrument.py
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+try:  # POSIX only; peak RSS is reported as None elsewhere
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+def _peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak) if os.uname().sysname == "Darwin" else int(peak) * 1024  # Linux reports KiB
+
+
+class StageRecord:
+    """Mutable record handed to the `with` body so it can attach rows/bytes."""
+
+    __slots__ = ("bytes_written", "cpu_s", "name", "peak_rss_delta", "rows_in", "rows_out", "start", "wall_s")
+
+    def __init__(self, name: str, rows_in: int | None = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: int | None = None
+        self.bytes_written = 0
+        self.start = 0.0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_delta: int | None = None
+
+    def out(self, obj) -> None:
+        """Record rows out from a DataFrame (or any sized object)."""
+        self.rows_out = len(obj)
+
+    def wrote(self, *paths: str | Path) -> None:
+        for p in paths:
+            self.bytes_written += Path(p).stat().st_size
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "peak_rss_delta_bytes": self.peak_rss_delta,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class _NullRecord:
+    """Shared no-op record used when instrumentation is disabled."""
+
+    __slots__ = ()
+    rows_in = rows_out = None
+
+    def out(self, obj) -> None:
+        pass
+
+    def wrote(self, *paths) -> None:
+        pass
+
+
+_NULL = _NullRecord()
+
+
+@contextmanager
+def _null_stage():
+    yield _NULL
+
+
+class Instrumenter:
+    """
+    Per-stage wall/CPU time, peak-RSS delta, rows in/out and bytes written.
+    Disabled instances hand out a shared no-op context, so call sites cost a method call.
+    """
+
+    def __init__(self, enabled: bool = False, profile_dir: str | Path | None = None):
+        self.enabled = enabled or profile_dir is not None
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.records: list[StageRecord] = []
+        self.t0 = time.perf_counter()
+
+    def stage(self, name: str, rows_in: int | None = None):
+        if not self.enabled:
+            return _null_stage()
+        return self._stage(name, rows_in)
+
+    @contextmanager
+    def _stage(self, name: str, rows_in: int | None):
+        rec = StageRecord(name, rows_in)
+        prof = cProfile.Profile() if self.profile_dir else None
+        rss0 = _peak_rss_bytes()
+        cpu0 = time.process_time()
+        rec.start = time.perf_counter()
+        if prof:
+            prof.enable()
+        try:
+            yield rec
+        finally:
+            if prof:
+                prof.disable()
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                prof.dump_stats(self.profile_dir / f"{len(self.records):02d}_{name}.prof")
+            rec.wall_s = time.perf_counter() - rec.start
+            rec.cpu_s = time.process_time() - cpu0
+            rss1 = _peak_rss_bytes()
+            rec.peak_rss_delta = None if rss0 is None else rss1 - rss0
+            self.records.append(rec)
+
+    def timed(self, name: str | None = None):
+        """Decorator form of stage(); rows_out is taken from the return value when it is sized."""
+
+        def deco(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.stage(name or fn.__name__) as rec:
+                    result = fn(*args, **kwargs)
+                    if hasattr(result, "__len__"):
+                        rec.out(result)
+                    return result
+
+            return wrapper
+
+        return deco
+
+    def report(self) -> dict:
+        return {
+            "total_wall_s": round(time.perf_counter() - self.t0, 6),
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "stages": [r.as_dict() for r in self.records],
+        }
+
+    def write_json(self, path: str | Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_chrome_trace(self, path: str | Path) -> None:
+        """chrome://tracing / Perfetto 'complete' events, one per stage."""
+        events = [
+            {
+                "name": r.name,
+                "ph": "X",
+                "ts": (r.start - self.t0) * 1e6,
+                "dur": r.wall_s * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {k: v for k, v in r.as_dict().items() if k != "stage"},
+            }
+            for r in self.records
+        ]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def print_summary(self) -> None:
+        if not self.records:
+            return
+        print("\n=== STAGE TIMINGS ===")
+        for r in self.records:
+            rows = "" if r.rows_out is None else f" rows_out={r.rows_out:,}"
+            mb = "" if not r.bytes_written else f" wrote={r.bytes_written / 1e6:.1f}MB"
+            print(f"{r.name:<24} wall={r.wall_s:7.3f}s cpu={r.cpu_s:7.3f}s{rows}{mb}")
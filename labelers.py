@@ -1,21 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
 from decoder import build_occ_phase_maps
 from normalize import split_finding_description
 
+# -------------------------
+# Aircraft-per-event index
+# -------------------------
+
+# first:   lowest Aircraft_Key per event (one row per event; the historical behaviour)
+# all:     every aircraft row (multi-aircraft events fan out)
+# finding: the aircraft whose Aircraft_Key matches the finding's (finding level only)
+AIRCRAFT_POLICIES = ("first", "all", "finding")
+
+
+@dataclass(frozen=True)
+class AircraftIndex:
+    """
+    Built once per pipeline run and shared by both level builders. Locates the first aircraft
+    of every event with a hash group-min over Aircraft_Key instead of sorting/copying the table.
+    """
+
+    aircraft: pd.DataFrame
+    first_pos: np.ndarray  # positional rows of the first aircraft per event
+    n_aircraft: np.ndarray  # aircraft rows in each row's event, aligned to `aircraft`
+
+    @classmethod
+    def build(cls, aircraft: pd.DataFrame) -> AircraftIndex:
+        ev = aircraft["ev_id"]
+        key = aircraft["Aircraft_Key"]
+        grp = key.groupby(ev, sort=False)
+        kmin = grp.transform("min")
+        # ties (and all-NA keys) resolve to the earliest row, as the stable sort did
+        cand = ev.notna() & (key.eq(kmin).fillna(False) | kmin.isna())
+        first = cand & ~ev.where(cand).duplicated(keep="first")
+        n = grp.transform("size").fillna(0).to_numpy(dtype=np.int32)
+        return cls(aircraft=aircraft, first_pos=np.flatnonzero(first.to_numpy(dtype=bool)), n_aircraft=n)
+
+    @property
+    def n_multi(self) -> int:
+        """Events with more than one aircraft row."""
+        return int((self.n_aircraft[self.first_pos] > 1).sum())
+
+    def select(self, policy: str = "first") -> pd.DataFrame:
+        """Aircraft rows for `policy` ("first" or "all"), with an explicit n_aircraft column."""
+        if policy == "first":
+            return self.aircraft.iloc[self.first_pos].assign(n_aircraft=self.n_aircraft[self.first_pos])
+        if policy in ("all", "finding"):
+            return self.aircraft.assign(n_aircraft=self.n_aircraft)
+        raise ValueError(f"Unknown aircraft policy {policy!r}; expected one of {AIRCRAFT_POLICIES}")
+
+
+def _as_index(aircraft: pd.DataFrame | AircraftIndex) -> AircraftIndex:
+    return aircraft if isinstance(aircraft, AircraftIndex) else AircraftIndex.build(aircraft)
+
+
 # -------------------------
 # Event/Finding builders
 # -------------------------
 
 
-def build_event_level(events: pd.DataFrame, aircraft: pd.DataFrame) -> pd.DataFrame:
-    aircraft_per_event = aircraft.sort_values(["ev_id", "Aircraft_Key"]).drop_duplicates(subset=["ev_id"], keep="first")
-    return events.merge(aircraft_per_event, on="ev_id", how="left")
+def build_event_level(
+    events: pd.DataFrame, aircraft: pd.DataFrame | AircraftIndex, policy: str = "first"
+) -> pd.DataFrame:
+    if policy == "finding":
+        raise ValueError("policy='finding' only applies to build_finding_level")
+    return events.merge(_as_index(aircraft).select(policy), on="ev_id", how="left")
 
 
-def build_finding_level(events: pd.DataFrame, findings: pd.DataFrame, aircraft: pd.DataFrame) -> pd.DataFrame:
-    aircraft_per_event = aircraft.sort_values(["ev_id", "Aircraft_Key"]).drop_duplicates(subset=["ev_id"], keep="first")
-    return findings.merge(events, on="ev_id", how="inner").merge(aircraft_per_event, on="ev_id", how="left")
+def build_finding_level(
+    events: pd.DataFrame,
+    findings: pd.DataFrame,
+    aircraft: pd.DataFrame | AircraftIndex,
+    policy: str = "first",
+) -> pd.DataFrame:
+    """
+    Findings x events x aircraft. Aircraft_Key_x is the finding's key, Aircraft_Key_y the joined
+    aircraft's, under every policy; with policy="finding" unmatched keys leave aircraft columns NA.
+    """
+    acft = _as_index(aircraft).select(policy)
+    base = findings.merge(events, on="ev_id", how="inner")
+    if policy != "finding":
+        return base.merge(acft, on="ev_id", how="left")
+    acft = acft.assign(_acft_key=acft["Aircraft_Key"])
+    out = base.merge(acft, left_on=["ev_id", "Aircraft_Key"], right_on=["ev_id", "_acft_key"], how="left")
+    return out.drop(columns="_acft_key")
 
 
 def label_findings(finding_level: pd.DataFrame) -> pd.DataFrame:
@@ -26,7 +99,7 @@ def label_findings(finding_level: pd.DataFrame) -> pd.DataFrame:
     """
     fd_parts = split_finding_description(finding_level["finding_description"])
     df = pd.concat([finding_level, fd_parts], axis=1)
-    df["finding_category"] = df["cat_text"].astype("string").str.split(" - ", n=1, expand=True).iloc[:, 0].fillna("")
+    df["finding_category"] = df["cat_text"].astype("string").str.split(" - ", n=1).str[0].fillna("")
     return df
 
 
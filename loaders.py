@@ -69,13 +69,13 @@ def read_csv_safe(path: str | Path, **kwargs) -> pd.DataFrame:
 # ------------ Events ---------------------------------------------------------
 
 
-def read_events() -> pd.DataFrame:
+def read_events(path: str | Path = EVENTS_CSV) -> pd.DataFrame:
     """
     Load events with strict dtypes, parse dates across known CAROL formats,
     and filter to the 2008-2023 analysis window.
     """
     df = read_csv_safe(
-        EVENTS_CSV,
+        path,
         usecols=[c for c in EVENTS_COLS if c],
         dtype={"ev_id": "string", "ev_year": "Int64", "ev_highest_injury": "string"},
     )
@@ -98,13 +98,13 @@ def read_events() -> pd.DataFrame:
 # ------------ Findings -------------------------------------------------------
 
 
-def read_findings() -> pd.DataFrame:
+def read_findings(path: str | Path = FINDINGS_CSV) -> pd.DataFrame:
     """
     Load findings; keep only the columns we care about; enforce dtypes that
     make joining/labeling deterministic.
     """
     df = read_csv_safe(
-        FINDINGS_CSV,
+        path,
         usecols=[c for c in FINDINGS_COLS if c],
         dtype={
             "ev_id": "string",
@@ -130,12 +130,12 @@ def read_findings() -> pd.DataFrame:
 # ------------ Aircraft -------------------------------------------------------
 
 
-def read_aircraft() -> pd.DataFrame:
+def read_aircraft(path: str | Path = AIRCRAFT_CSV) -> pd.DataFrame:
     """
     Load aircraft table and normalize make/model tokens for consistent grouping.
     """
     df = read_csv_safe(
-        AIRCRAFT_CSV,
+        path,
         usecols=[c for c in AIRCRAFT_COLS if c],
         dtype={
             "ev_id": "string",
@@ -155,12 +155,12 @@ def read_aircraft() -> pd.DataFrame:
 # ------------ Events Sequence ------------------------------------------------
 
 
-def read_events_sequence() -> pd.DataFrame:
+def read_events_sequence(path: str | Path = EVENTS_SEQUENCE_CSV) -> pd.DataFrame:
     """
     Load sequence-of-events and ensure the core keys/fields are correctly typed.
     If Occurrence_Code is missing, derive it deterministically as phase_no(3d)+eventsoe_no(3d).
     """
-    df = read_csv_safe(EVENTS_SEQUENCE_CSV)
+    df = read_csv_safe(path)
 
     # Keep only expected columns if present
     keep = [c for c in SEQ_COLS if c in df.columns]
@@ -194,3 +194,20 @@ def read_events_sequence() -> pd.DataFrame:
         df[col] = df[col].str.strip()
 
     return df
+
+
+def occurrence_parts(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    """
+    (phase_no, eventsoe_no) per sequence row: the columns when present, otherwise the first and
+    last three digits of Occurrence_Code (the inverse of the derivation in read_events_sequence).
+    """
+    code = df["Occurrence_Code"].astype("string").str.strip().str.zfill(6) if "Occurrence_Code" in df.columns else None
+
+    def part(col: str, digits: slice) -> pd.Series:
+        if col in df.columns:
+            return df[col]
+        if code is None:
+            return pd.Series(pd.NA, index=df.index, dtype="Int64")
+        return pd.to_numeric(code.str[digits], errors="coerce").astype("Int64")
+
+    return part("phase_no", slice(0, 3)), part("eventsoe_no", slice(-3, None))
@@ -1,23 +1,43 @@
 # main.py
 from __future__ import annotations
 
+import argparse
+import sys
+
 import pandas as pd
 
 from audit import quick_audit
 from config import (
+    AGG_DIR,
     DICT_CSV,  # eADMS data dictionary (ground truth for decoding)
+    FINDING_AIRCRAFT_POLICY,
+    OUT_COHORT_MATRIX,
     OUT_EVENT_LEVEL,
+    OUT_EVENT_LEVEL_ARROW,
     OUT_FINDING_LEVEL,
     OUT_FINDING_LEVEL_LABELED,
+    OUT_FINDING_LEVEL_LABELED_ARROW,
+    OUT_FINDING_TEXT_INDEX,
     OUT_SEQ_LABELED,
+    OUT_SEQ_LABELED_ARROW,
+    OUT_SEQ_STORE,
+    RAW,
+    REPORTS,
 )
+from instrument import Instrumenter
 from labelers import (
+    AIRCRAFT_POLICIES,
+    AircraftIndex,
     build_event_level,
     build_finding_level,
     label_findings,
     label_sequence,
 )
 from loaders import read_aircraft, read_events, read_events_sequence, read_findings
+from normalize import default_canonicalizer
+from quality.checks import DataQualityError, enforce, run_expectations
+from quality.profiling import diff_profiles, profile_frame, profile_path, read_profile, write_profile
+from store import final_dtypes, load_outputs, write_arrow
 
 
 def pct(series_like) -> float:
@@ -34,26 +54,279 @@ def existing(cols: list[str], df: pd.DataFrame) -> list[str]:
     return [c for c in cols if c in df.columns]
 
 
-def main():
+def check_stage(stage: str, tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Run the expectation suite for one pipeline stage, print the report, fail on thresholds."""
+    report = run_expectations(tables, stage=stage)
+    if not report.empty:
+        print(f"\n=== EXPECTATIONS: {stage} ===")
+        cols = ["name", "table", "severity", "failed", "fail_frac", "passed", "seconds"]
+        print(
+            report[cols].to_string(index=False, formatters={"fail_frac": "{:.2%}".format, "seconds": "{:.3f}".format})
+        )
+        for r in report[(report["failed"] > 0)].itertuples():
+            print(f"  {r.name} e.g.: {r.examples[:3]}")
+    enforce(report)
+    return report
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Build CAROL/eADMS Parquet outputs")
+    ap.add_argument(
+        "--timings", action="store_true", help=f"Record per-stage timings to {REPORTS / 'build_timings.json'}"
+    )
+    ap.add_argument("--trace", action="store_true", help="Also write a Chrome trace (chrome://tracing, Perfetto)")
+    ap.add_argument("--profile", action="store_true", help="Capture cProfile output per stage (implies --timings)")
+    ap.add_argument(
+        "--finding-aircraft",
+        choices=AIRCRAFT_POLICIES,
+        default=FINDING_AIRCRAFT_POLICY,
+        help="Aircraft joined to each finding: first per event, all, or the finding's Aircraft_Key",
+    )
+    ap.add_argument(
+        "--delta",
+        action="store_true",
+        help="Ingest only new/changed/deleted events into year-partitioned outputs, then refresh the flat outputs",
+    )
+    ap.add_argument("--raw", default=str(RAW), help="Export directory for --delta (CAROL CSVs + data dictionary)")
+    ap.add_argument("--full", action="store_true", help="With --delta: rebuild every partition")
+    ap.add_argument(
+        "--watch", action="store_true", help="Keep running: rebuild only the stages affected by changes in data/raw"
+    )
+    ap.add_argument("--interval", type=float, default=1.0, help="With --watch: polling interval (seconds)")
+    ap.add_argument("--debounce", type=float, default=2.0, help="With --watch: wait for files to settle (seconds)")
+    ap.add_argument(
+        "--verify-aggregates",
+        action="store_true",
+        help="Cross-check the incrementally updated dashboard aggregates against a full recompute",
+    )
+    return ap.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    inst = Instrumenter(
+        enabled=args.timings or args.trace,
+        profile_dir=REPORTS / "profile" if args.profile else None,
+    )
+    try:
+        if args.watch:
+            from watch import Watcher
+
+            def on_rebuilt(built: dict) -> None:
+                refresh_derived(inst, verify=args.verify_aggregates)
+                publish_outputs(inst)
+
+            Watcher(
+                policy=args.finding_aircraft,
+                interval=args.interval,
+                debounce=args.debounce,
+                inst=inst,
+                on_rebuilt=on_rebuilt,
+            ).run()
+        elif args.delta:
+            run_delta(
+                inst,
+                raw_dir=args.raw,
+                finding_aircraft=args.finding_aircraft,
+                full=args.full,
+                verify_aggregates=args.verify_aggregates,
+            )
+        else:
+            run_pipeline(inst, finding_aircraft=args.finding_aircraft, verify_aggregates=args.verify_aggregates)
+    except DataQualityError as e:
+        print(f"{e}\nTry: {e.ux.hint}", file=sys.stderr)
+        raise SystemExit(1) from None
+    finally:
+        if inst.enabled:
+            inst.print_summary()
+            inst.write_json(REPORTS / "build_timings.json")
+            if args.trace:
+                inst.write_chrome_trace(REPORTS / "build_trace.json")
+
+
+def update_aggregates(inst: Instrumenter, tables: dict[str, pd.DataFrame], verify: bool = False) -> dict:
+    """Apply this build's change set to the stored dashboard aggregates."""
+    from analysis.aggregates import AggregateStore
+
+    with inst.stage("aggregates"):
+        summary = AggregateStore().update(tables, verify=verify or None)
+    if summary["mode"] == "rebuild":
+        print(f"Aggregates rebuilt ({summary['seconds']:.2f}s)")
+    else:
+        print(
+            f"Aggregates updated: +{sum(summary['added'].values()):,} / -{sum(summary['removed'].values()):,} rows, "
+            f"{summary['events_touched']:,} events re-derived ({summary['seconds']:.2f}s)"
+        )
+        if "mismatches" in summary:
+            print(f"  verification vs full recompute: {summary['mismatches']} mismatched cells (repaired if any)")
+    return summary
+
+
+def update_text_index(inst: Instrumenter, findings: pd.DataFrame) -> None:
+    """Rebuild the finding-description search index for this build's findings table."""
+    from search import TextIndex
+
+    with inst.stage("text_index", rows_in=len(findings)) as st:
+        TextIndex.build(findings["finding_description"]).save(OUT_FINDING_TEXT_INDEX)
+        st.wrote(OUT_FINDING_TEXT_INDEX)
+
+
+def update_seq_store(inst: Instrumenter, seq: pd.DataFrame) -> None:
+    """Rebuild the ragged per-event sequence store for this build's sequence table."""
+    from seqstore import SequenceStore
+
+    with inst.stage("seq_store", rows_in=len(seq)) as st:
+        SequenceStore.build(seq).save(OUT_SEQ_STORE)
+        st.wrote(*OUT_SEQ_STORE.iterdir())
+
+
+def update_cohort_matrix(inst: Instrumenter, tables: dict[str, pd.DataFrame]) -> None:
+    """Rebuild the sparse event x feature matrix behind cohort queries."""
+    from analysis.cohorts import FeatureMatrix
+
+    with inst.stage("cohort_matrix", rows_in=len(tables["findings"]) + len(tables["seq"])) as st:
+        fm = FeatureMatrix.build(tables["events"], tables["findings"], tables["seq"])
+        fm.save(OUT_COHORT_MATRIX)
+        st.wrote(OUT_COHORT_MATRIX)
+    print(f"Cohort matrix: {fm.X.shape[0]:,} events x {fm.X.shape[1]:,} features, {fm.X.nnz:,} nonzeros")
+
+
+def update_derived(inst: Instrumenter, tables: dict[str, pd.DataFrame], verify: bool = False) -> dict:
+    """Everything derived from the three app-facing tables: search index, sequence store, cohort matrix, aggregates."""
+    update_text_index(inst, tables["findings"])
+    update_seq_store(inst, tables["seq"])
+    update_cohort_matrix(inst, tables)
+    return update_aggregates(inst, tables, verify=verify)
+
+
+def publish_outputs(inst: Instrumenter) -> str:
+    """Publish the app-facing outputs as a new version and flip the CURRENT pointer."""
+    from publish import publish
+
+    with inst.stage("publish"):
+        version = publish(
+            [
+                OUT_EVENT_LEVEL,
+                OUT_EVENT_LEVEL_ARROW,
+                OUT_FINDING_LEVEL_LABELED,
+                OUT_FINDING_LEVEL_LABELED_ARROW,
+                OUT_SEQ_LABELED,
+                OUT_SEQ_LABELED_ARROW,
+                OUT_FINDING_TEXT_INDEX,
+                OUT_SEQ_STORE,
+                OUT_COHORT_MATRIX,
+                AGG_DIR,
+            ]
+        )
+    print(f"Published data version {version}")
+    return version
+
+
+def refresh_derived(inst: Instrumenter, verify: bool = False) -> dict:
+    """Update the derived outputs (see update_derived) from the outputs currently on disk."""
+    ev, fl, sq = load_outputs(
+        [
+            (OUT_EVENT_LEVEL_ARROW, OUT_EVENT_LEVEL),
+            (OUT_FINDING_LEVEL_LABELED_ARROW, OUT_FINDING_LEVEL_LABELED),
+            (OUT_SEQ_LABELED_ARROW, OUT_SEQ_LABELED),
+        ]
+    )
+    return update_derived(inst, {"events": ev, "findings": fl, "seq": sq}, verify=verify)
+
+
+def run_delta(
+    inst: Instrumenter,
+    raw_dir,
+    finding_aircraft: str = FINDING_AIRCRAFT_POLICY,
+    full: bool = False,
+    verify_aggregates: bool = False,
+):
+    from incremental import consolidate, ingest, mark_consolidated, needs_consolidation
+
+    manifest = ingest(raw_dir, policy=finding_aircraft, full=full, inst=inst, check=check_stage)
+    d = manifest["delta"]
+    kind = "full rebuild" if manifest["full_rebuild"] else "delta"
+    print(
+        f"Ingest ({kind}, generation {manifest['generation']}): {d['new']:,} new | {d['changed']:,} changed | "
+        f"{d['deleted']:,} deleted"
+    )
+    for table, keys in manifest["changed_partitions"].items():
+        print(f"  {table}: {len(keys)} partition(s) rewritten ({', '.join(keys)})")
+    if not any(d.values()) and not manifest["full_rebuild"]:
+        if not needs_consolidation(manifest):
+            return
+        print(f"Generation {manifest['generation']} was ingested but never published; consolidating it now")
+
+    with inst.stage("delta_consolidate"):
+        tables = consolidate(check=check_stage)  # checked before the flat outputs are replaced
+    with inst.stage("write_arrow") as st:
+        write_arrow(final_dtypes(tables["event_level"]), OUT_EVENT_LEVEL_ARROW)
+        write_arrow(final_dtypes(tables["finding_level_labeled"]), OUT_FINDING_LEVEL_LABELED_ARROW)
+        write_arrow(final_dtypes(tables["events_sequence_labeled"]), OUT_SEQ_LABELED_ARROW)
+        st.wrote(OUT_EVENT_LEVEL_ARROW, OUT_FINDING_LEVEL_LABELED_ARROW, OUT_SEQ_LABELED_ARROW)
+    update_derived(
+        inst,
+        {
+            "events": tables["event_level"],
+            "findings": tables["finding_level_labeled"],
+            "seq": tables["events_sequence_labeled"],
+        },
+        verify=verify_aggregates,
+    )
+    publish_outputs(inst)
+    mark_consolidated(manifest["generation"])  # only now: a failure above is consolidated again next run
+
+
+def run_pipeline(inst: Instrumenter, finding_aircraft: str = FINDING_AIRCRAFT_POLICY, verify_aggregates: bool = False):
     # -------------------------
     # Load raw frames
     # -------------------------
-    events = read_events()  # ev_id, ev_year, ev_date, ev_highest_injury, ...
-    findings = read_findings()  # finding_description, codes, Cause_Factor, ...
-    aircraft = read_aircraft()  # ev_id, Aircraft_Key, acft_make, acft_model
-    seq = read_events_sequence()  # ev_id, Aircraft_Key, Occurrence_No, phase_no, Occurrence_Code, Defining_ev
+    with inst.stage("read_events") as st:
+        events = read_events()  # ev_id, ev_year, ev_date, ev_highest_injury, ...
+        st.out(events)
+    with inst.stage("read_findings") as st:
+        findings = read_findings()  # finding_description, codes, Cause_Factor, ...
+        st.out(findings)
+    with inst.stage("read_aircraft") as st:
+        aircraft = read_aircraft()  # ev_id, Aircraft_Key, acft_make, acft_model
+        st.out(aircraft)
+        absorbed = default_canonicalizer().report("make", min_spellings=2)
+        if len(absorbed):
+            REPORTS.mkdir(parents=True, exist_ok=True)
+            absorbed.to_csv(REPORTS / "make_canonicalization.csv", index=False)
+            print(f"Make canonicalization: {absorbed['spellings'].sum():,} raw spellings -> {len(absorbed):,} names")
+    with inst.stage("read_events_sequence") as st:
+        seq = read_events_sequence()  # ev_id, Aircraft_Key, Occurrence_No, phase_no, Occurrence_Code, Defining_ev
+        st.out(seq)
+    with inst.stage("checks_load"):
+        check_stage("load", {"events": events, "findings": findings, "aircraft": aircraft, "seq": seq})
 
     # -------------------------
     # Build base tables
     # -------------------------
-    event_level = build_event_level(events, aircraft)
-    finding_lvl = build_finding_level(events, findings, aircraft)
+    with inst.stage("build_aircraft_index", rows_in=len(aircraft)):
+        acft_idx = AircraftIndex.build(aircraft)
+        print(f"Multi-aircraft events: {acft_idx.n_multi:,}")
+    with inst.stage("build_event_level", rows_in=len(events)) as st:
+        event_level = build_event_level(events, acft_idx)
+        st.out(event_level)
+    with inst.stage("build_finding_level", rows_in=len(findings)) as st:
+        finding_lvl = build_finding_level(events, findings, acft_idx, policy=finding_aircraft)
+        st.out(finding_lvl)
+    with inst.stage("checks_build"):
+        check_stage("build", {"event_level": event_level, "finding_level": finding_lvl})
 
     # -------------------------
     # Label sequence & findings (dictionary-native decoding)
     # -------------------------
-    seq_labeled = label_sequence(seq, dict_csv_path=DICT_CSV)
-    finding_lab = label_findings(finding_lvl)
+    with inst.stage("label_sequence", rows_in=len(seq)) as st:
+        seq_labeled = label_sequence(seq, dict_csv_path=DICT_CSV)
+        st.out(seq_labeled)
+    with inst.stage("label_findings", rows_in=len(finding_lvl)) as st:
+        finding_lab = label_findings(finding_lvl)
+        st.out(finding_lab)
+    with inst.stage("checks_label"):
+        check_stage("label", {"seq_labeled": seq_labeled})
 
     # Optional: show decoder hit mix (exact vs right-3)
     from decoder import build_occ_phase_maps
@@ -68,10 +341,21 @@ def main():
     # Save Parquet outputs
     # -------------------------
     OUT_EVENT_LEVEL.parent.mkdir(parents=True, exist_ok=True)
-    event_level.to_parquet(OUT_EVENT_LEVEL, index=False)
-    finding_lvl.to_parquet(OUT_FINDING_LEVEL, index=False)
-    finding_lab.to_parquet(OUT_FINDING_LEVEL_LABELED, index=False)
-    seq_labeled.to_parquet(OUT_SEQ_LABELED, index=False)
+    with inst.stage("write_parquet") as st:
+        event_level.to_parquet(OUT_EVENT_LEVEL, index=False)
+        finding_lvl.to_parquet(OUT_FINDING_LEVEL, index=False)
+        finding_lab.to_parquet(OUT_FINDING_LEVEL_LABELED, index=False)
+        seq_labeled.to_parquet(OUT_SEQ_LABELED, index=False)
+        st.wrote(OUT_EVENT_LEVEL, OUT_FINDING_LEVEL, OUT_FINDING_LEVEL_LABELED, OUT_SEQ_LABELED)
+
+    # Uncompressed Arrow IPC copies with final dtypes for memory-mapped loads (app/CLI)
+    with inst.stage("write_arrow") as st:
+        write_arrow(final_dtypes(event_level.copy()), OUT_EVENT_LEVEL_ARROW)
+        write_arrow(final_dtypes(finding_lab.copy()), OUT_FINDING_LEVEL_LABELED_ARROW)
+        write_arrow(final_dtypes(seq_labeled.copy()), OUT_SEQ_LABELED_ARROW)
+        st.wrote(OUT_EVENT_LEVEL_ARROW, OUT_FINDING_LEVEL_LABELED_ARROW, OUT_SEQ_LABELED_ARROW)
+    update_derived(inst, {"events": event_level, "findings": finding_lab, "seq": seq_labeled}, verify=verify_aggregates)
+    publish_outputs(inst)
 
     # -------------------------
     # Coverage summaries (safe)
@@ -84,23 +368,27 @@ def main():
         print(f"Phase label coverage (final): {pct(seq_labeled['phase_meaning']):.1f}%")
 
     # -------------------------
-    # Audits (defensive: only request columns that exist)
+    # Audits + column profiles (one pass per table; JSON written next to the Parquets)
     # -------------------------
-    quick_audit(
-        "event_level",
-        event_level,
-        key_cols=existing(["ev_id", "ev_date", "ev_highest_injury", "far_part"], event_level),
-    )
-    quick_audit(
-        "finding_level",
-        finding_lvl,
-        key_cols=existing(["ev_id", "Aircraft_Key", "finding_description", "Cause_Factor"], finding_lvl),
-    )
-    quick_audit(
-        "sequence_labeled",
-        seq_labeled,
-        key_cols=existing(["ev_id", "Occurrence_Code", "phase_no", "Defining_ev"], seq_labeled),
-    )
+    audits = [
+        ("event_level", event_level, OUT_EVENT_LEVEL, ["ev_id", "ev_date", "ev_highest_injury", "far_part"]),
+        (
+            "finding_level",
+            finding_lvl,
+            OUT_FINDING_LEVEL,
+            ["ev_id", "Aircraft_Key", "finding_description", "Cause_Factor"],
+        ),
+        ("sequence_labeled", seq_labeled, OUT_SEQ_LABELED, ["ev_id", "Occurrence_Code", "phase_no", "Defining_ev"]),
+    ]
+    for name, frame, out_path, keys in audits:
+        with inst.stage(f"profile_{name}", rows_in=len(frame)):
+            prof = profile_frame(frame, name=name)
+            quick_audit(name, frame, key_cols=existing(keys, frame), profile=prof)
+            changes = diff_profiles(read_profile(profile_path(out_path)), prof)
+            if not changes.empty:
+                print(f"profile changes vs previous build ({name}):")
+                print(changes.to_string(index=False))
+            write_profile(prof, profile_path(out_path))
 
     # -------------------------
     # Quick exploratory tables (defensive)
@@ -169,28 +457,7 @@ def main():
         print(f"- defining events: {len(scfnp_ev_ids):,}")
 
     # B1. Label procedure-related findings (finding-level)
-    PROC_KEYWORDS = [
-        "CHECKLIST",
-        "PROCEDURE",
-        "SOP",
-        "STANDARD OPERATING PROCEDURE",
-        "BRIEFING",
-        "BRIEF",
-        "CALLOUT",
-        "CALL OUT",
-        "INSPECTION",
-        "INSPECT",
-        "MAINTENANCE PROCEDURE",
-        "CONFIGURATION",
-        "CONFIGURE",
-        "VERIFY",
-        "VERIFICATION",
-        "CROSSCHECK",
-        "CROSS-CHECK",
-        "CROSS CHECK",
-        "USE OF EQUIP/INFO",  # eADMS phrasing
-        "TASK PERFORMANCE-USE OF EQUIP",  # category string fragment
-    ]
+    from analysis.cohorts import PROCEDURAL_KEYWORDS as PROC_KEYWORDS
 
     def is_procedural(text: pd.Series) -> pd.Series:
         s = text.fillna("").str.upper()
@@ -199,7 +466,8 @@ def main():
             mask = mask | s.str.contains(kw, na=False)
         return mask
 
-    finding_lab["ProcedureFinding"] = is_procedural(finding_lab["finding_description"])
+    with inst.stage("procedural_flags", rows_in=len(finding_lab)):
+        finding_lab["ProcedureFinding"] = is_procedural(finding_lab["finding_description"])
 
     # Optionally restrict to CAUSE ('C') or BOTH ('B') if you want “mitigation failure” not just contributing factors:
     is_cause_like = finding_lab["Cause_Factor"].isin(["C", "B"])
@@ -233,9 +501,10 @@ def main():
     print(events["ev_id"].dtype, findings["ev_id"].dtype, aircraft["ev_id"].dtype)
 
     import numpy as np
-    import statsmodels.formula.api as smf
     from scipy.stats import fisher_exact
 
+    from analysis.model_cache import ModelCache
+
     # ------------------------------
     # C1.  - x Procedural (Cause/Both)
     # ------------------------------
@@ -263,8 +532,11 @@ def main():
     df["is_scfnp"] = df["is_scfnp"].astype(int)
     df["proc_cb"] = df["proc_cause_or_both"].astype(int)
 
-    model = smf.logit("fatal ~ is_scfnp + proc_cb + is_scfnp:proc_cb", data=df).fit(disp=False)
-    print(model.summary())
+    # Cached on disk: identical inputs skip the refit on the next build
+    formula = "fatal ~ is_scfnp + proc_cb + is_scfnp:proc_cb"
+    with inst.stage("logit", rows_in=len(df)):
+        model = ModelCache().logit(formula, df[["fatal", "is_scfnp", "proc_cb"]])
+    print(model.summary_text)
     print("\nExponentiated coefficients (odds ratios):")
     print(np.exp(model.params))
 
@@ -7,6 +7,7 @@ from config import (
     OUT_FINDING_LEVEL_LABELED,
     OUT_SEQ_LABELED,
 )
+from labelers import AircraftIndex, build_event_level, build_finding_level
 from loaders import read_aircraft, read_events, read_events_sequence, read_findings
 from lookups import build_finding_lookup, build_occurrence_lookup, build_phase_lookup
 
@@ -19,11 +20,11 @@ def main():
     seq = read_events_sequence()
 
     # ---- Event-level (first aircraft per event)
-    aircraft_per_event = aircraft.sort_values(["ev_id", "Aircraft_Key"]).drop_duplicates(subset=["ev_id"], keep="first")
-    event_level = events.merge(aircraft_per_event, on="ev_id", how="left")
+    acft_idx = AircraftIndex.build(aircraft)
+    event_level = build_event_level(events, acft_idx)
 
     # ---- Finding-level (1:N to events)
-    finding_level = findings.merge(events, on="ev_id", how="inner").merge(aircraft_per_event, on="ev_id", how="left")
+    finding_level = build_finding_level(events, findings, acft_idx)
 
     # ---- Build & join lookups
     finding_lk = build_finding_lookup()
@@ -1,7 +1,15 @@
+import hashlib
+import re
 import warnings
+from dataclasses import dataclass
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+from config import CANON_CACHE_DIR, MAKE_MODEL_ALIASES
+from store import write_parquet
+
 
 def parse_flexible_datetime(s: pd.Series, formats: list[str]) -> pd.Series:
     s = s.astype("string").str.strip()
@@ -20,20 +28,163 @@ def parse_flexible_datetime(s: pd.Series, formats: list[str]) -> pd.Series:
     return out
 
 
-def normalize_make_model(df: pd.DataFrame) -> pd.DataFrame:
-    if "acft_make" in df:
-        df["acft_make"] = df["acft_make"].astype("string").str.upper().str.strip()
-        repl = {
-            r"\bROBINSON HELICOPTER COMPANY\b": "ROBINSON",
-            r"\bROBINSON HELICOPTER\b": "ROBINSON",
-            r"\bCESSNA AIRCRAFT CO(MPANY)?\b": "CESSNA",
-            r"\bPIPER AIRCRAFT( CO(MPANY)?)?\b": "PIPER",
+# ------------ Make / model canonicalization ----------------------------------
+# Raw exports spell one manufacturer hundreds of ways ("PIPER", "Piper Aircraft Co",
+# "PIPER, INC."). Resolution runs once per distinct raw value, never per row:
+# basic cleanup, an exact alias lookup, then the compiled alias patterns (and the
+# exact lookup again on their result). Resolved values are cached on disk keyed by
+# the alias table version, so a rebuild only resolves spellings it has not seen.
+
+FIELDS = {"acft_make": "make", "acft_model": "model"}
+_WS = re.compile(r"\s+")
+
+
+def _clean(value: str) -> str:
+    return _WS.sub(" ", value.upper()).strip()
+
+
+@dataclass(frozen=True)
+class AliasTable:
+    """
+    Aliases from a CSV with columns field (make|model), kind (exact|pattern), match,
+    canonical. Patterns are regex substitutions applied in file order; `version` is
+    the table's content hash, so editing the file invalidates cached resolutions.
+    """
+
+    exact: dict[str, dict[str, str]]
+    patterns: dict[str, list[tuple[re.Pattern, str]]]
+    version: str
+
+    @classmethod
+    def load(cls, path: str | Path = MAKE_MODEL_ALIASES) -> "AliasTable":
+        path = Path(path)
+        if not path.exists():
+            return cls({}, {}, "none")
+        raw = path.read_bytes()
+        df = pd.read_csv(path, dtype="string", keep_default_na=False)
+        exact: dict[str, dict[str, str]] = {}
+        patterns: dict[str, list[tuple[re.Pattern, str]]] = {}
+        for field, kind, match, canonical in df[["field", "kind", "match", "canonical"]].itertuples(index=False):
+            if kind == "exact":
+                exact.setdefault(field, {})[_clean(match)] = canonical
+            elif kind == "pattern":
+                patterns.setdefault(field, []).append((re.compile(match), canonical))
+            else:
+                raise ValueError(f"{path}: unknown alias kind {kind!r}")
+        return cls(exact, patterns, hashlib.sha256(raw).hexdigest()[:12])
+
+
+class Canonicalizer:
+    """Maps raw make/model spellings to canonical names; see `apply` and `report`."""
+
+    def __init__(self, aliases: AliasTable | None = None, cache_dir: str | Path | None = CANON_CACHE_DIR):
+        self.aliases = aliases if aliases is not None else AliasTable.load()
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._cache: dict[str, dict[str, str]] = {}
+        # one alternation per field: a value no pattern can touch skips the substitution loop
+        self._any = {
+            f: re.compile("|".join(f"(?:{p.pattern})" for p, _ in pats)) for f, pats in self.aliases.patterns.items()
         }
-        for pat, sub in repl.items():
-            df["acft_make"] = df["acft_make"].str.replace(pat, sub, regex=True)
-    if "acft_model" in df:
-        df["acft_model"] = df["acft_model"].astype("string").str.upper().str.strip()
-    return df
+        self._seen: dict[str, pd.DataFrame] = {}  # field -> raw, canonical, rows from the last apply
+
+    def _cache_path(self, field: str) -> Path | None:
+        return None if self.cache_dir is None else self.cache_dir / f"{field}-{self.aliases.version}.parquet"
+
+    def _load_cache(self, field: str) -> dict[str, str]:
+        if field not in self._cache:
+            path = self._cache_path(field)
+            self._cache[field] = {}
+            if path is not None and path.exists():
+                c = pd.read_parquet(path)
+                self._cache[field] = dict(zip(c["raw"], c["canonical"], strict=True))
+        return self._cache[field]
+
+    def _save_cache(self, field: str) -> None:
+        path = self._cache_path(field)
+        if path is None:
+            return
+        c = self._cache[field]
+        write_parquet(pd.DataFrame({"raw": list(c), "canonical": list(c.values())}, dtype="string"), path)
+        for stale in path.parent.glob(f"{field}-*.parquet"):  # built with an older alias table
+            if stale != path:
+                stale.unlink(missing_ok=True)
+
+    def resolve(self, field: str, value: str) -> str:
+        """Canonical name for one raw value (uncached)."""
+        exact = self.aliases.exact.get(field, {})
+        s = _clean(value)
+        if s in exact:
+            return exact[s]
+        any_pat = self._any.get(field)
+        if any_pat is None or not any_pat.search(s):
+            return s
+        out = s
+        for pat, sub in self.aliases.patterns[field]:
+            out = pat.sub(sub, out)
+        out = _clean(out)
+        return exact.get(out, out) if out else s
+
+    def map_unique(self, field: str, values) -> np.ndarray:
+        """Canonical names for an array of distinct raw values, through the cross-build cache."""
+        cache = self._load_cache(field)
+        missing = [v for v in values if v not in cache]
+        for v in missing:
+            cache[v] = self.resolve(field, v)
+        if missing:
+            self._save_cache(field)
+        return np.array([cache[v] for v in values], dtype=object)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Canonicalize acft_make/acft_model in place, resolving each distinct value once."""
+        for col, field in FIELDS.items():
+            if col not in df:
+                continue
+            codes, uniques = pd.factorize(df[col].astype("string"))
+            uniques = np.asarray(uniques, dtype=object)
+            canon = self.map_unique(field, uniques)
+            out = pd.array(canon, dtype="string").take(codes, allow_fill=True)
+            df[col] = pd.Series(out, index=df.index)
+            rows = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            self._seen[field] = pd.DataFrame({"raw": uniques, "canonical": canon, "rows": rows})
+        return df
+
+    def report(self, field: str | None = None, min_spellings: int = 1) -> pd.DataFrame:
+        """How many raw spellings (and rows) each canonical name absorbed in the last `apply`."""
+        fields = [field] if field is not None else list(self._seen)
+        parts = [_absorption(f, self._seen[f], min_spellings) for f in fields if f in self._seen]
+        if not parts:
+            return pd.DataFrame(columns=["field", "canonical", "spellings", "rows", "examples"])
+        return pd.concat(parts, ignore_index=True)
+
+
+def _absorption(field: str, seen: pd.DataFrame, min_spellings: int = 1) -> pd.DataFrame:
+    d = seen[seen.groupby("canonical")["raw"].transform("size").ge(min_spellings)]
+    d = d.sort_values("rows", ascending=False, kind="stable")
+    g = d.groupby("canonical", sort=False)
+    out = pd.DataFrame(
+        {
+            "spellings": g["raw"].size(),
+            "rows": g["rows"].sum(),
+            "examples": g["raw"].agg(lambda s: " | ".join(s.head(5))),
+        }
+    ).reset_index()
+    out.insert(0, "field", field)
+    return out.sort_values(["spellings", "rows"], ascending=False, ignore_index=True)
+
+
+_DEFAULT: Canonicalizer | None = None
+
+
+def default_canonicalizer() -> Canonicalizer:
+    """Process-wide canonicalizer over the repo alias table (built on first use)."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = Canonicalizer()
+    return _DEFAULT
+
+
+def normalize_make_model(df: pd.DataFrame, canonicalizer: Canonicalizer | None = None) -> pd.DataFrame:
+    return (canonicalizer or default_canonicalizer()).apply(df)
 
 
 def split_finding_description(desc: pd.Series) -> pd.DataFrame:
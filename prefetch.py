@@ -0,0 +1,188 @@
+# prefetch.py
+"""
+Speculative computation of the filter states a user is likely to pick next.
+
+Analysts mostly move one end of the year slider a step or toggle one severity, so
+after a view is served the app submits those neighbouring states to a Prefetcher.
+One daemon thread (at raised nice value where the OS allows it per thread) computes
+them into the shared ResultCache the foreground reads. A new submission or cancel()
+drops the unfinished batch; a task already running completes and is cached. Each
+batch stops after `cpu_budget` seconds of the thread's CPU time (a task whose kind
+last cost more than what is left is skipped, since a running task cannot be
+interrupted), and the thread sleeps after each task so it uses at most `duty` of
+wall time.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from dataclasses import replace
+from typing import Any
+
+from config import PREFETCH_CACHE_ENTRIES, PREFETCH_CPU_SECONDS, PREFETCH_DUTY, PREFETCH_NICE
+
+Task = tuple[Hashable, Callable[[], Any]]
+
+
+def adjacent_specs(spec, year_bounds: tuple[int, int], severity_options: Sequence[str]) -> list:
+    """
+    Filter states one control step from `spec` (any dataclass with `years` and `severity`):
+    either end of the year range moved by one within `year_bounds` (start <= end kept), and
+    each of `severity_options` toggled, never to an empty selection.
+    """
+    out = []
+    lo, hi = spec.years
+    for y in [(lo - 1, hi), (lo, hi + 1), (lo + 1, hi), (lo, hi - 1)]:
+        if year_bounds[0] <= y[0] <= y[1] <= year_bounds[1]:
+            out.append(replace(spec, years=y))
+    sel = set(spec.severity or [])
+    for s in severity_options:
+        toggled = [v for v in severity_options if (v in sel) != (v == s)]
+        if toggled:
+            out.append(replace(spec, severity=toggled))
+    return out
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of computed views; a key another thread is computing is waited for, not
+    recomputed. The thread CPU seconds of the last computation of each `kind(key)` are kept
+    as the cost estimate for keys of that kind.
+    """
+
+    def __init__(self, max_entries: int = PREFETCH_CACHE_ENTRIES, kind: Callable[[Hashable], Hashable] | None = None):
+        self.max_entries = max_entries
+        self.kind = kind or (lambda key: None)
+        self.costs: dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._computing: dict[Hashable, threading.Event] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def get_or_compute(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    return self._data[key]
+                done = self._computing.get(key)
+                if done is None:
+                    self._computing[key] = threading.Event()
+                    break
+            done.wait()  # then re-check: absent if that computation failed
+        try:
+            cpu = time.thread_time()
+            value = fn()
+            with self._lock:
+                self.costs[self.kind(key)] = time.thread_time() - cpu
+                self._data[key] = value
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._computing.pop(key).set()
+
+    def cost(self, key: Hashable) -> float | None:
+        """Estimated CPU seconds to compute `key` (None until a key of its kind has been computed)."""
+        with self._lock:
+            return self.costs.get(self.kind(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def _lower_priority(nice: int) -> None:
+    """Raise the calling thread's nice value (Linux applies setpriority to thread ids); no-op elsewhere."""
+    if nice and sys.platform.startswith("linux"):
+        with contextlib.suppress(OSError):
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+
+
+class Prefetcher:
+    """Runs the latest submitted batch of (key, fn) tasks into `cache` on one background thread."""
+
+    def __init__(
+        self,
+        cache: ResultCache,
+        cpu_budget: float = PREFETCH_CPU_SECONDS,
+        duty: float = PREFETCH_DUTY,
+        nice: int = PREFETCH_NICE,
+    ):
+        self.cache = cache
+        self.cpu_budget = cpu_budget
+        self.duty = min(max(duty, 0.01), 1.0)
+        self.nice = nice
+        self.stats = {"computed": 0, "skipped": 0, "failed": 0, "cancelled": 0, "over_budget": 0}
+        self._cond = threading.Condition()
+        self._batch: list[Task] = []
+        self._generation = 0
+        self._busy = False
+        self._thread: threading.Thread | None = None
+
+    def submit(self, tasks: Iterable[Task]) -> None:
+        """Replace any unfinished batch with `tasks` (most likely first)."""
+        with self._cond:
+            self.stats["cancelled"] += len(self._batch)
+            self._generation += 1
+            self._batch = list(tasks)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def cancel(self) -> None:
+        """Drop the unfinished batch (call when the foreground starts work of its own)."""
+        self.submit([])
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """True once no task is queued or running."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._batch and not self._busy, timeout)
+
+    def _run(self) -> None:
+        _lower_priority(self.nice)
+        generation, spent = -1, 0.0
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._batch)
+                if self._generation != generation:
+                    generation, spent = self._generation, 0.0
+                if spent >= self.cpu_budget:
+                    self.stats["over_budget"] += len(self._batch)
+                    self._batch = []
+                    continue
+                key, fn = self._batch.pop(0)
+                self._busy = True
+            if key in self.cache:
+                self.stats["skipped"] += 1
+                continue
+            est = self.cache.cost(key)
+            if est is not None and spent + est > self.cpu_budget:
+                self.stats["over_budget"] += 1
+                continue
+            cpu = time.thread_time()
+            try:
+                self.cache.get_or_compute(key, fn)
+                self.stats["computed"] += 1
+            except Exception:  # speculative: the foreground recomputes this view and reports any error
+                self.stats["failed"] += 1
+            cpu = time.thread_time() - cpu
+            spent += cpu
+            time.sleep(cpu * (1 - self.duty) / self.duty)
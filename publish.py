@@ -0,0 +1,181 @@
+# publish.py
+"""
+Versioned publishing of build outputs, and the app-side registry that hot-swaps them.
+
+The pipeline copies its outputs into data/out/versions/<version>/ (staged under a
+temp name, then renamed) and flips data/out/CURRENT to the new version with an
+atomic replace, so a reader never sees a half-written set. The app keeps one
+DataRegistry per process: it polls the pointer (one stat call, rate-limited),
+loads a new version on a background thread, and swaps it in for subsequent reruns;
+a rerun already in flight keeps the frames it started with.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from config import CURRENT_POINTER, PUBLISH_DIR, PUBLISH_KEEP
+
+# -------------------------
+# Pipeline side
+# -------------------------
+
+
+def publish(
+    files: list[str | Path],
+    root: str | Path = PUBLISH_DIR,
+    pointer: str | Path = CURRENT_POINTER,
+    keep: int = PUBLISH_KEEP,
+) -> str:
+    """Copy `files` (or directories) into a new version, flip the pointer, prune old versions. Returns the version."""
+    root, pointer = Path(root), Path(pointer)
+    seq = int(versions(root)[-1].split("-", 1)[0]) + 1 if versions(root) else 1
+    version = f"{seq:05d}-{datetime.now():%Y%m%dT%H%M%S}"
+    staging = root / f".{version}.{uuid.uuid4().hex[:6]}.tmp"
+    staging.mkdir(parents=True)
+    for f in files:
+        if Path(f).is_dir():
+            shutil.copytree(f, staging / Path(f).name)
+        elif Path(f).exists():
+            shutil.copy2(f, staging / Path(f).name)
+    os.replace(staging, root / version)
+
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(version + "\n")
+    os.replace(tmp, pointer)
+    prune(root, keep=keep, protect=version)
+    return version
+
+
+def versions(root: str | Path = PUBLISH_DIR) -> list[str]:
+    """Published versions, oldest first (names start with a zero-padded sequence number)."""
+    root = Path(root)
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")) if root.exists() else []
+
+
+def prune(root: str | Path = PUBLISH_DIR, keep: int = PUBLISH_KEEP, protect: str | None = None) -> list[str]:
+    """Remove all but the newest `keep` versions (never `protect`). Open memory maps stay valid on POSIX."""
+    old = [v for v in versions(root)[:-keep] if v != protect] if keep > 0 else []
+    for v in old:
+        shutil.rmtree(Path(root) / v, ignore_errors=True)
+    return old
+
+
+def read_pointer(pointer: str | Path = CURRENT_POINTER) -> str | None:
+    try:
+        return Path(pointer).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# -------------------------
+# App side
+# -------------------------
+
+
+class DataRegistry:
+    """
+    Process-wide holder of the active data version. `loader(version_dir | None)` builds
+    whatever the app needs from one version (None means the unversioned flat outputs).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Path | None], Any],
+        root: str | Path = PUBLISH_DIR,
+        pointer: str | Path = CURRENT_POINTER,
+        poll_seconds: float = 2.0,
+        on_swap: Callable[[str | None, str | None], None] | None = None,
+    ):
+        self.loader = loader
+        self.root, self.pointer = Path(root), Path(pointer)
+        self.poll_seconds = poll_seconds
+        self.on_swap = on_swap
+        self.active_version: str | None = None
+        self.active: Any = None
+        self.loading: str | None = None
+        self.last_error: str | None = None
+        self._lock = threading.Lock()
+        self._last_poll = 0.0
+        self._pointer_mtime: int | None = None
+
+    def _dir(self, version: str | None) -> Path | None:
+        return None if version is None else self.root / version
+
+    def current(self) -> tuple[str | None, Any]:
+        """(version, data) for this rerun; loads synchronously only on first use."""
+        with self._lock:
+            if self.active is not None:
+                return self.active_version, self.active
+        version = read_pointer(self.pointer)
+        if version is not None and not self.root.joinpath(version).exists():
+            version = None
+        data = self.loader(self._dir(version))
+        with self._lock:
+            if self.active is None:
+                self.active_version, self.active = version, data
+            return self.active_version, self.active
+
+    def poll(self, wait: bool = False) -> str | None:
+        """
+        Cheap check of the pointer (rate-limited stat). When it names a version other than the
+        active one, load it in the background (or inline with wait=True). Returns the pointer version.
+        """
+        now = time.monotonic()
+        if not wait and now - self._last_poll < self.poll_seconds:
+            return self.active_version
+        self._last_poll = now
+        try:
+            mtime = self.pointer.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self.active_version
+        if mtime == self._pointer_mtime and not wait:
+            return self.active_version
+        self._pointer_mtime = mtime
+        version = read_pointer(self.pointer)
+        with self._lock:
+            # before the first current() there is nothing to swap; current() loads the pointer version
+            if version is None or self.active is None or version in (self.active_version, self.loading):
+                return version
+            self.loading = version
+        if wait:
+            self._load(version)
+        else:
+            threading.Thread(target=self._load, args=(version,), name=f"load-{version}", daemon=True).start()
+        return version
+
+    def _load(self, version: str) -> None:
+        try:
+            data = self.loader(self._dir(version))
+        except Exception as e:  # keep serving the old version
+            with self._lock:
+                self.last_error = f"{version}: {type(e).__name__}: {e}"
+                if self.loading == version:
+                    self.loading = None
+                self._pointer_mtime = None  # retry on the next poll
+            return
+        with self._lock:
+            if self.loading == version:
+                self.loading = None
+            # overlapping loads can finish out of order: never swap back to an older version
+            if version != read_pointer(self.pointer) and _seq(version) <= _seq(self.active_version):
+                self._pointer_mtime = None  # re-check the pointer on the next poll
+                return
+            old = self.active_version
+            self.active_version, self.active = version, data
+            self.last_error = None
+        if self.on_swap is not None:
+            self.on_swap(old, version)
+
+
+def _seq(version: str | None) -> int:
+    """Sequence number of a published version name (-1 for the unversioned outputs)."""
+    return -1 if version is None else int(version.split("-", 1)[0])
@@ -1,6 +1,14 @@
 # quality/checks.py
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
 import pandas as pd
 
+from .errors import QUALITY_FAIL
+
 
 def event_expectations(df: pd.DataFrame) -> dict:
     out = {}
@@ -9,3 +17,180 @@ def event_expectations(df: pd.DataFrame) -> dict:
     out["injury_present"] = "ev_highest_injury" in df and df["ev_highest_injury"].notna().mean() > 0.9
     out["system_present"] = "system_component" in df and df["system_component"].notna().mean() > 0.7
     return out
+
+
+# -------------------------
+# Expectation suite (declared as data, run as vectorized checks)
+# -------------------------
+
+
+class DataQualityError(Exception):
+    """Raised when an error-severity expectation exceeds its failure threshold (message starts with E-QA-001)."""
+
+    ux = QUALITY_FAIL
+
+
+@dataclass(frozen=True)
+class Expectation:
+    name: str
+    stage: str  # "load" | "build" | "label"
+    table: str
+    kind: str  # not_null | between | unique | foreign_key | not_null_when
+    columns: tuple[str, ...]
+    params: dict = field(default_factory=dict)
+    max_fail_frac: float = 0.0  # fraction of rows allowed to fail
+    severity: str = "error"  # "error" fails the build; "warn" only reports
+
+
+DEFAULT_SUITE: list[Expectation] = [
+    # --- raw tables
+    Expectation("events_ev_id_present", "load", "events", "not_null", ("ev_id",)),
+    Expectation("events_ev_id_unique", "load", "events", "unique", ("ev_id",)),
+    Expectation("events_year_in_window", "load", "events", "between", ("ev_year",), {"lo": 2008, "hi": 2023}),
+    Expectation(
+        "findings_key_unique",
+        "load",
+        "findings",
+        "unique",
+        ("ev_id", "Aircraft_Key", "finding_no"),
+        max_fail_frac=0.001,
+    ),
+    # events are filtered to the analysis window on load, so orphans vs events are reported, not fatal
+    Expectation(
+        "findings_orphan_ev_id",
+        "load",
+        "findings",
+        "foreign_key",
+        ("ev_id",),
+        {"parent": "events", "parent_columns": ("ev_id",)},
+        severity="warn",
+    ),
+    Expectation(
+        "sequence_orphan_ev_id",
+        "load",
+        "seq",
+        "foreign_key",
+        ("ev_id",),
+        {"parent": "events", "parent_columns": ("ev_id",)},
+        severity="warn",
+    ),
+    Expectation(
+        "sequence_orphan_aircraft",
+        "load",
+        "seq",
+        "foreign_key",
+        ("ev_id", "Aircraft_Key"),
+        {"parent": "aircraft", "parent_columns": ("ev_id", "Aircraft_Key")},
+        max_fail_frac=0.01,
+    ),
+    # --- built tables
+    Expectation("event_level_one_row_per_event", "build", "event_level", "unique", ("ev_id",)),
+    Expectation(
+        "finding_level_injury_present",
+        "build",
+        "finding_level",
+        "not_null",
+        ("ev_highest_injury",),
+        max_fail_frac=0.1,
+        severity="warn",
+    ),
+    # --- labeled tables
+    Expectation(
+        "occurrence_code_decodes",
+        "label",
+        "seq_labeled",
+        "not_null_when",
+        ("occurrence_meaning",),
+        {"when_notna": "Occurrence_Code"},
+        max_fail_frac=0.05,
+    ),
+]
+
+
+def _key_hash(df: pd.DataFrame, cols: tuple[str, ...]) -> np.ndarray:
+    return pd.util.hash_pandas_object(df[list(cols)], index=False).to_numpy()
+
+
+def _fail_mask(exp: Expectation, df: pd.DataFrame, tables: dict[str, pd.DataFrame]) -> np.ndarray:
+    cols = list(exp.columns)
+    if exp.kind == "not_null":
+        return df[cols].isna().any(axis=1).to_numpy()
+    if exp.kind == "between":
+        s = pd.to_numeric(df[cols[0]], errors="coerce")
+        return (~s.between(exp.params["lo"], exp.params["hi"])).fillna(True).to_numpy(dtype=bool)
+    if exp.kind == "unique":
+        # hashed duplicate detection over the composite key
+        return pd.Series(_key_hash(df, exp.columns)).duplicated(keep=False).to_numpy()
+    if exp.kind == "foreign_key":
+        # sorted-key anti-join: child key hashes searched in the sorted parent key hashes
+        parent = tables[exp.params["parent"]]
+        pkeys = np.unique(_key_hash(parent, tuple(exp.params["parent_columns"])))
+        present = df[cols].notna().all(axis=1).to_numpy()
+        ckeys = _key_hash(df, exp.columns)
+        pos = np.searchsorted(pkeys, ckeys).clip(max=max(len(pkeys) - 1, 0))
+        found = (pkeys[pos] == ckeys) if len(pkeys) else np.zeros(len(df), dtype=bool)
+        return present & ~found
+    if exp.kind == "not_null_when":
+        return (df[exp.params["when_notna"]].notna() & df[cols].isna().any(axis=1)).to_numpy()
+    raise ValueError(f"Unknown expectation kind: {exp.kind}")
+
+
+def run_expectations(
+    tables: dict[str, pd.DataFrame],
+    suite: list[Expectation] | None = None,
+    stage: str | None = None,
+    sample_rows: int = 5,
+) -> pd.DataFrame:
+    """
+    Run every expectation for `stage` whose tables are available; one report row per check
+    with failure counts, timing and a small sample of offending rows.
+    """
+    suite = DEFAULT_SUITE if suite is None else suite
+    rows = []
+    for exp in suite:
+        if stage is not None and exp.stage != stage:
+            continue
+        df = tables.get(exp.table)
+        needed = [exp.table, *([exp.params["parent"]] if exp.kind == "foreign_key" else [])]
+        if df is None or any(t not in tables for t in needed):
+            continue
+        cols = [*exp.columns, *([exp.params["when_notna"]] if exp.kind == "not_null_when" else [])]
+        t0 = time.perf_counter()
+        if [c for c in cols if c not in df.columns]:
+            failed, sample, status = 0, [], "skipped"
+        else:
+            mask = _fail_mask(exp, df, tables)
+            failed = int(mask.sum())
+            sample = df.loc[mask, list(dict.fromkeys(cols))].head(sample_rows).astype(str).to_dict("records")
+            status = "ok"
+        frac = failed / len(df) if len(df) else 0.0
+        rows.append(
+            {
+                "stage": exp.stage,
+                "name": exp.name,
+                "table": exp.table,
+                "severity": exp.severity,
+                "rows": len(df),
+                "failed": failed,
+                "fail_frac": frac,
+                "max_fail_frac": exp.max_fail_frac,
+                "passed": status == "skipped" or frac <= exp.max_fail_frac,
+                "status": status,
+                "seconds": time.perf_counter() - t0,
+                "examples": sample,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def enforce(report: pd.DataFrame) -> None:
+    """Raise DataQualityError if any error-severity check is over its threshold."""
+    if report.empty:
+        return
+    bad = report[(report["severity"] == "error") & ~report["passed"]]
+    if not bad.empty:
+        lines = [
+            f"{r.name}: {r.failed:,}/{r.rows:,} rows ({r.fail_frac:.2%} > {r.max_fail_frac:.2%}); e.g. {r.examples[:2]}"
+            for r in bad.itertuples()
+        ]
+        raise DataQualityError(f"[{QUALITY_FAIL.code}] {QUALITY_FAIL.title}:\n  " + "\n  ".join(lines))
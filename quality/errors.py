@@ -29,3 +29,9 @@ PIPELINE_FAIL = UXError(
     title="Pipeline step failed",
     hint="Re-run `make build` and review console output; see README > Troubleshooting.",
 )
+
+QUALITY_FAIL = UXError(
+    code="E-QA-001",
+    title="Data-quality expectations failed",
+    hint="Review the expectation report printed by `make build` (offending rows are sampled); fix or re-export the inputs.",
+)
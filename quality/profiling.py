@@ -0,0 +1,254 @@
+# quality/profiling.py
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+EXACT_DISTINCT_LIMIT = 100_000  # switch a column to a HyperLogLog sketch past this many distinct values
+HLL_P = 14  # 2**14 registers -> ~0.8% standard error
+
+
+# -------------------------
+# HyperLogLog
+# -------------------------
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes (pd.util.hash_array)."""
+
+    def __init__(self, p: int = HLL_P):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, h: np.ndarray) -> None:
+        h = np.asarray(h, dtype=np.uint64)
+        if h.size == 0:
+            return
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        w = (h << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))  # sentinel bit bounds the run length
+        rank = (64 - np.floor(np.log2(w.astype(np.float64)))).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def add_values(self, values: pd.Index | np.ndarray) -> None:
+        self.add_hashes(pd.util.hash_array(np.asarray(values, dtype=object)))
+
+    def merge(self, other: HyperLogLog) -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return float(est)
+
+
+# -------------------------
+# Column / table profiles
+# -------------------------
+
+
+def _jsonable(v):
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.isoformat()
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, np.floating):
+        return float(v)
+    if isinstance(v, np.bool_):
+        return bool(v)
+    return v
+
+
+class ColumnProfile:
+    """Per-column accumulator; every statistic comes from one value_counts per chunk."""
+
+    def __init__(self, name: str, top_k: int = 10, exact_limit: int = EXACT_DISTINCT_LIMIT):
+        self.name = name
+        self.top_k = top_k
+        self.exact_limit = exact_limit
+        self.dtype: str | None = None
+        self.rows = 0
+        self.nulls = 0
+        self.counts: pd.Series | None = None  # value -> count (all values while exact, heavy hitters after)
+        self.hll: HyperLogLog | None = None
+        self.vmin = None
+        self.vmax = None
+        self.len_n = 0
+        self.len_sum = 0
+        self.len_min: int | None = None
+        self.len_max: int | None = None
+
+    def update(self, s: pd.Series) -> None:
+        self.dtype = self.dtype or str(s.dtype)
+        vc = s.value_counts(dropna=True, sort=False)
+        self.rows += len(s)
+        self.nulls += len(s) - int(vc.sum())
+        if vc.empty:
+            return
+
+        # min/max from the distinct values only
+        try:
+            lo, hi = vc.index.min(), vc.index.max()
+            self.vmin = lo if self.vmin is None else min(self.vmin, lo)
+            self.vmax = hi if self.vmax is None else max(self.vmax, hi)
+        except TypeError:
+            pass
+
+        # string length stats, weighted by counts
+        if pd.api.types.is_string_dtype(s.dtype) or s.dtype == object:
+            lens = pd.Series(vc.index.astype("string")).str.len().to_numpy(dtype="float64")
+            w = vc.to_numpy()
+            self.len_n += int(w.sum())
+            self.len_sum += int((lens * w).sum())
+            self.len_min = int(lens.min()) if self.len_min is None else min(self.len_min, int(lens.min()))
+            self.len_max = int(lens.max()) if self.len_max is None else max(self.len_max, int(lens.max()))
+
+        # distinct + top-k
+        self.counts = vc if self.counts is None else self.counts.add(vc, fill_value=0)
+        if self.hll is not None:
+            self.hll.add_values(vc.index)
+            self._prune()
+        elif len(self.counts) > self.exact_limit:
+            self.hll = HyperLogLog()
+            self.hll.add_values(self.counts.index)
+            self._prune()
+
+    def _prune(self) -> None:
+        # keep a bounded heavy-hitter set once we are sketching
+        keep = max(1000, 50 * self.top_k)
+        if len(self.counts) > keep:
+            self.counts = self.counts.nlargest(keep)
+
+    def result(self) -> dict:
+        non_null = self.rows - self.nulls
+        counts = self.counts if self.counts is not None else pd.Series(dtype="int64")
+        top = counts.sort_values(ascending=False, kind="mergesort").head(self.top_k)
+        out = {
+            "dtype": self.dtype,
+            "rows": self.rows,
+            "nulls": self.nulls,
+            "non_null": non_null,
+            "coverage_pct": round(100.0 * non_null / self.rows, 3) if self.rows else 0.0,
+            "distinct": round(self.hll.estimate()) if self.hll is not None else len(counts),
+            "distinct_exact": self.hll is None,
+            "min": _jsonable(self.vmin),
+            "max": _jsonable(self.vmax),
+            "top": [[_jsonable(k), int(v)] for k, v in top.items()],
+        }
+        if self.len_n:
+            out["str_len"] = {
+                "min": self.len_min,
+                "max": self.len_max,
+                "mean": round(self.len_sum / self.len_n, 3),
+            }
+        return out
+
+
+class TableProfiler:
+    """Chunk-at-a-time profiler: feed frames with update() (e.g. while streaming a CSV), then result()."""
+
+    def __init__(
+        self,
+        name: str,
+        columns: Iterable[str] | None = None,
+        top_k: int = 10,
+        exact_limit: int = EXACT_DISTINCT_LIMIT,
+    ):
+        self.name = name
+        self.columns = list(columns) if columns is not None else None
+        self.top_k = top_k
+        self.exact_limit = exact_limit
+        self.rows = 0
+        self.cols: dict[str, ColumnProfile] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        cols = self.columns if self.columns is not None else list(chunk.columns)
+        for c in cols:
+            if c not in chunk.columns:
+                continue
+            if c not in self.cols:
+                self.cols[c] = ColumnProfile(c, self.top_k, self.exact_limit)
+            self.cols[c].update(chunk[c])
+
+    def result(self) -> dict:
+        return {
+            "table": self.name,
+            "rows": self.rows,
+            "columns": {c: p.result() for c, p in self.cols.items()},
+        }
+
+
+def profile_frame(
+    df: pd.DataFrame,
+    name: str = "",
+    columns: Iterable[str] | None = None,
+    top_k: int = 10,
+    chunk_rows: int | None = None,
+) -> dict:
+    """Profile an in-memory frame (optionally in row chunks to bound peak memory)."""
+    prof = TableProfiler(name, columns=columns, top_k=top_k)
+    step = chunk_rows or max(len(df), 1)
+    for start in range(0, max(len(df), 1), step):
+        prof.update(df.iloc[start : start + step])
+    return prof.result()
+
+
+# -------------------------
+# Persisted profiles + diffs
+# -------------------------
+
+
+def profile_path(table_path: str | Path) -> Path:
+    """data/out/event_level.parquet -> data/out/event_level.profile.json"""
+    p = Path(table_path)
+    return p.with_name(p.stem + ".profile.json")
+
+
+def write_profile(profile: dict, path: str | Path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2, default=str)
+
+
+def read_profile(path: str | Path) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+DIFF_METRICS = ["rows", "nulls", "distinct", "min", "max"]
+
+
+def diff_profiles(old: dict | None, new: dict) -> pd.DataFrame:
+    """Compare two profiles metric-by-metric (no data access); returns only what changed."""
+    rows = []
+    if old and old.get("rows") != new.get("rows"):
+        rows.append({"column": "<table>", "metric": "rows", "old": old.get("rows"), "new": new.get("rows")})
+    old_cols = (old or {}).get("columns", {})
+    for col, cur in new["columns"].items():
+        prev = old_cols.get(col)
+        if prev is None:
+            rows.append({"column": col, "metric": "added", "old": None, "new": cur.get("dtype")})
+            continue
+        for m in DIFF_METRICS:
+            if prev.get(m) != cur.get(m):
+                # HyperLogLog estimates are labeled so they are not read as exact counts
+                approx = m == "distinct" and not (prev.get("distinct_exact", True) and cur.get("distinct_exact", True))
+                label = f"{m} (approx)" if approx else m
+                rows.append({"column": col, "metric": label, "old": prev.get(m), "new": cur.get(m)})
+    for col in old_cols.keys() - new["columns"].keys():
+        rows.append({"column": col, "metric": "removed", "old": old_cols[col].get("dtype"), "new": None})
+    return pd.DataFrame(rows, columns=["column", "metric", "old", "new"])
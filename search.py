@@ -0,0 +1,294 @@
+# search.py
+"""
+Indexes behind the app's free-text filters.
+
+ModelIndex serves "Model contains": acft_model is factorized once into per-row
+codes, and substring queries are answered over the few thousand distinct values
+through trigram posting lists (candidates are then verified, since sharing every
+trigram does not imply containment). Matching codes become a row mask via a
+boolean lookup table, so a keystroke costs one gather over the codes, not a string
+scan of every finding row. A sorted copy of the values gives prefix autocomplete.
+
+TextIndex serves boolean/phrase/prefix search over finding descriptions. It is
+built once per build over the distinct descriptions, persisted next to the
+outputs, and answers a query as a mask over distinct texts, gathered to rows.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import re
+import tempfile
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def _trigrams(s: str) -> set[str]:
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+class ModelIndex:
+    """Substring + prefix lookup over the distinct values of one string column."""
+
+    def __init__(self, values: pd.Series):
+        codes, uniques = pd.factorize(values.astype("string"))
+        self.codes = codes.astype(np.int32)  # -1 for NA
+        self.values = np.asarray(uniques, dtype=object)
+        self.folded = [v.casefold() for v in self.values]
+        self.counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.values))
+
+        postings: dict[str, list[int]] = defaultdict(list)
+        for i, v in enumerate(self.folded):
+            for g in _trigrams(v):
+                postings[g].append(i)
+        self.postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+        order = sorted(range(len(self.folded)), key=self.folded.__getitem__)
+        self._sorted = [self.folded[i] for i in order]
+        self._sorted_ids = np.asarray(order, dtype=np.int32)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.codes)
+
+    def match_codes(self, query: str) -> np.ndarray:
+        """Codes of the distinct values containing `query` (case-insensitive, literal)."""
+        q = query.casefold()
+        if not q:
+            return np.arange(len(self.values), dtype=np.int32)
+        grams = _trigrams(q)
+        if grams:
+            lists = sorted((self.postings.get(g) for g in grams), key=lambda a: -1 if a is None else len(a))
+            if lists[0] is None:
+                return np.empty(0, dtype=np.int32)
+            cand = lists[0]
+            for ids in lists[1:]:
+                cand = np.intersect1d(cand, ids, assume_unique=True)
+                if not len(cand):
+                    break
+        else:  # 1-2 characters: a scan over distinct values is already cheap
+            cand = np.arange(len(self.values), dtype=np.int32)
+        return np.asarray([i for i in cand if q in self.folded[i]], dtype=np.int32)
+
+    def row_mask(self, query: str) -> np.ndarray:
+        """Boolean mask over the indexed rows; NA rows never match."""
+        hit = np.zeros(len(self.values) + 1, dtype=bool)  # slot -1 (NA) stays False
+        hit[self.match_codes(query)] = True
+        return hit[self.codes]
+
+    def complete(self, prefix: str, limit: int = 10) -> list[str]:
+        """Up to `limit` values starting with `prefix`, most frequent first."""
+        p = prefix.casefold()
+        if not p:
+            return []
+        lo = bisect.bisect_left(self._sorted, p)
+        hi = bisect.bisect_left(self._sorted, p + "\U0010ffff")
+        ids = self._sorted_ids[lo:hi]
+        top = ids[np.argsort(-self.counts[ids], kind="stable")[:limit]]
+        return [self.values[i] for i in top]
+
+
+# -------------------------
+# Full-text search over finding descriptions
+# -------------------------
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUERY_TOKEN = re.compile(r'\(|\)|-?"[^"]*"|[^\s()"]+')
+_OPERATORS = {"AND", "OR", "NOT"}
+
+
+class QuerySyntaxError(ValueError):
+    """A search query that cannot be parsed (unbalanced parentheses, dangling operator, ...)."""
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+@dataclass
+class TextIndex:
+    """
+    Inverted index over the distinct values of a text column. Postings map each term
+    to the distinct texts (docs) containing it; the token sequence of every doc is kept
+    as a ragged array for phrase checks; `row_codes` maps table rows to docs.
+    """
+
+    docs: np.ndarray  # distinct texts
+    row_codes: np.ndarray  # row -> doc, -1 for NA
+    terms: np.ndarray  # sorted vocabulary
+    post_offsets: np.ndarray  # docs of term t: post_docs[post_offsets[t] : post_offsets[t + 1]]
+    post_docs: np.ndarray
+    tok_offsets: np.ndarray  # token ids of doc d: tok_ids[tok_offsets[d] : tok_offsets[d + 1]]
+    tok_ids: np.ndarray
+
+    @classmethod
+    def build(cls, texts: pd.Series) -> TextIndex:
+        codes, uniques = pd.factorize(texts.astype("string"))
+        docs = np.asarray(uniques, dtype=str)
+        toks = [tokenize(d) for d in docs]
+        terms = np.asarray(sorted({t for ts in toks for t in ts}), dtype=str)
+        term_id = {t: i for i, t in enumerate(terms)}
+        lens = np.fromiter((len(ts) for ts in toks), dtype=np.int64, count=len(toks))
+        tok_ids = np.fromiter((term_id[t] for ts in toks for t in ts), dtype=np.int32, count=int(lens.sum()))
+        tok_offsets = np.concatenate([[0], np.cumsum(lens)])
+
+        # (term, doc) pairs, deduplicated and sorted by term then doc
+        doc_of_tok = np.repeat(np.arange(len(docs), dtype=np.int32), lens)
+        pairs = np.unique(tok_ids.astype(np.int64) * max(len(docs), 1) + doc_of_tok)
+        post_terms = pairs // max(len(docs), 1)
+        post_docs = (pairs % max(len(docs), 1)).astype(np.int32)
+        post_offsets = np.concatenate([[0], np.cumsum(np.bincount(post_terms, minlength=len(terms)))])
+        return cls(docs, codes.astype(np.int32), terms, post_offsets, post_docs, tok_offsets, tok_ids)
+
+    @classmethod
+    def load(cls, path: str | Path) -> TextIndex:
+        with np.load(path, allow_pickle=False) as z:
+            return cls(**{f.name: z[f.name] for f in fields(cls)})
+
+    @classmethod
+    def for_texts(cls, texts: pd.Series, path: str | Path | None = None) -> TextIndex:
+        """The persisted index at `path` when it was built for the same rows, else a fresh build."""
+        if path is not None and Path(path).exists():
+            idx = cls.load(path)
+            codes, uniques = pd.factorize(texts.astype("string"))
+            if np.array_equal(idx.row_codes, codes) and np.array_equal(idx.docs, np.asarray(uniques, dtype=str)):
+                return idx
+        return cls.build(texts)
+
+    def save(self, path: str | Path) -> None:
+        """Atomic .npz write (temp file in the same directory, then rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **{fl.name: getattr(self, fl.name) for fl in fields(self)})
+        os.replace(tmp, path)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.row_codes)
+
+    # --- term lookups (sets of docs as boolean masks) ---
+
+    def _docs_of(self, t: int) -> np.ndarray:
+        return self.post_docs[self.post_offsets[t] : self.post_offsets[t + 1]]
+
+    def _mask(self, doc_ids: np.ndarray) -> np.ndarray:
+        m = np.zeros(len(self.docs), dtype=bool)
+        m[doc_ids] = True
+        return m
+
+    def term_mask(self, term: str) -> np.ndarray:
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return self._mask(self._docs_of(i))
+        return np.zeros(len(self.docs), dtype=bool)
+
+    def prefix_mask(self, prefix: str) -> np.ndarray:
+        lo, hi = np.searchsorted(self.terms, [prefix, prefix + "\U0010ffff"])
+        if lo == hi:
+            return np.zeros(len(self.docs), dtype=bool)
+        return self._mask(self.post_docs[self.post_offsets[lo] : self.post_offsets[hi]])
+
+    def phrase_mask(self, words: list[str]) -> np.ndarray:
+        if len(words) == 1:
+            return self.term_mask(words[0])
+        ids = np.searchsorted(self.terms, words)
+        if (ids >= len(self.terms)).any() or (self.terms[np.minimum(ids, len(self.terms) - 1)] != words).any():
+            return np.zeros(len(self.docs), dtype=bool)
+        # runs of the phrase's token ids anywhere in the token stream, kept when they do not cross a doc boundary
+        k, n = len(ids), len(self.tok_ids)
+        ok = self.tok_ids[: max(n - k + 1, 0)] == ids[0]
+        for j in range(1, k):
+            ok &= self.tok_ids[j : n - k + 1 + j] == ids[j]
+        starts = np.flatnonzero(ok)
+        doc = np.searchsorted(self.tok_offsets, starts, side="right") - 1
+        return self._mask(doc[starts + k <= self.tok_offsets[doc + 1]])
+
+    # --- queries ---
+
+    def doc_mask(self, query: str) -> np.ndarray:
+        """
+        Boolean mask over docs. Terms are ANDed by default; OR, NOT (or a leading -),
+        parentheses, "quoted phrases" and trailing-* prefixes are supported.
+        """
+        return evaluate_query(query, self._leaf, len(self.docs))
+
+    def row_mask(self, query: str) -> np.ndarray:
+        hit = np.append(self.doc_mask(query), False)  # slot -1 (NA) never matches
+        return hit[self.row_codes]
+
+    def rows(self, query: str) -> np.ndarray:
+        """Row positions matching `query`."""
+        return np.flatnonzero(self.row_mask(query))
+
+    def _leaf(self, tok: str) -> np.ndarray:
+        if tok.startswith('"'):
+            return self.phrase_mask(tokenize(tok.strip('"')))
+        words = tokenize(tok)
+        if tok.endswith("*") and words:
+            m = self.prefix_mask(words[-1])
+            return m & self.phrase_mask(words[:-1]) if len(words) > 1 else m
+        return self.phrase_mask(words) if words else np.ones(len(self.docs), dtype=bool)
+
+
+# -------------------------
+# Boolean query evaluation
+# -------------------------
+
+
+def evaluate_query(query: str, leaf: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """
+    Evaluate a boolean query over masks of length `size`. Adjacent terms are ANDed;
+    OR, NOT (or a leading -) and parentheses are supported; every other token
+    (bare, "quoted" or trailing-*) is handed to `leaf`, which returns its mask.
+    An empty query matches everything.
+    """
+    toks = _QUERY_TOKEN.findall(query)
+    if not toks:
+        return np.ones(size, dtype=bool)
+
+    def _or(pos: int) -> tuple[np.ndarray, int]:
+        m, pos = _and(pos)
+        while pos < len(toks) and toks[pos] == "OR":
+            rhs, pos = _and(pos + 1)
+            m = m | rhs
+        return m, pos
+
+    def _and(pos: int) -> tuple[np.ndarray, int]:
+        m, pos = _unary(pos)
+        while pos < len(toks) and toks[pos] not in {"OR", ")"}:
+            if toks[pos] == "AND":
+                pos += 1
+            rhs, pos = _unary(pos)
+            m = m & rhs
+        return m, pos
+
+    def _unary(pos: int) -> tuple[np.ndarray, int]:
+        if pos >= len(toks):
+            raise QuerySyntaxError("query ends where a term was expected")
+        tok = toks[pos]
+        if tok == "NOT":
+            m, pos = _unary(pos + 1)
+            return ~m, pos
+        if tok == "(":
+            m, pos = _or(pos + 1)
+            if pos >= len(toks) or toks[pos] != ")":
+                raise QuerySyntaxError("unbalanced parentheses")
+            return m, pos + 1
+        if tok in _OPERATORS or tok == ")":
+            raise QuerySyntaxError(f"unexpected {tok!r}")
+        if tok.startswith("-") and len(tok) > 1:
+            return ~leaf(tok[1:]), pos + 1
+        return leaf(tok), pos + 1
+
+    m, pos = _or(0)
+    if pos != len(toks):
+        raise QuerySyntaxError(f"unexpected {toks[pos]!r} in query {query!r}")
+    return m
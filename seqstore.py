@@ -0,0 +1,199 @@
+# seqstore.py
+"""
+Compact, memory-mappable store of per-event occurrence sequences.
+
+Rows of events_sequence_labeled are sorted by (ev_id, Aircraft_Key, Occurrence_No)
+and split into flat arrays: int16 occurrence (eventsoe_no), phase and aircraft codes
+(-1 for missing), a bit-packed Defining_ev mask, and an offsets array so event i owns
+rows offsets[i]:offsets[i + 1]. Each array is its own .npy file, so loading is a
+handful of np.load(mmap_mode="r") calls and one event's sequence is a slice.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import OUT_SEQ_STORE
+from loaders import occurrence_parts
+
+SORT_KEYS = ["ev_id", "Aircraft_Key", "Occurrence_No"]
+ARRAYS = ("ev_ids", "offsets", "occ", "phase", "aircraft", "defining_bits")
+META_FILE = "meta.json"
+
+
+def _int16(s: pd.Series) -> np.ndarray:
+    return pd.to_numeric(s, errors="coerce").fillna(-1).to_numpy(dtype=np.int16)
+
+
+def _labels(codes: pd.Series, meanings: pd.Series) -> dict[int, str]:
+    d = pd.DataFrame({"code": pd.to_numeric(codes, errors="coerce"), "meaning": meanings.astype("string")}).dropna()
+    d = d.drop_duplicates("code")
+    return dict(zip(d["code"].astype(int), d["meaning"], strict=True))
+
+
+@dataclass(frozen=True)
+class SequenceStore:
+    ev_ids: np.ndarray  # sorted, one per event
+    offsets: np.ndarray  # int64, len(ev_ids) + 1
+    occ: np.ndarray  # int16 eventsoe_no per row
+    phase: np.ndarray  # int16 phase_no per row
+    aircraft: np.ndarray  # int16 Aircraft_Key per row
+    defining_bits: np.ndarray  # np.packbits of Defining_ev == 1
+    occ_labels: dict[int, str]
+    phase_labels: dict[int, str]
+
+    @classmethod
+    def build(cls, seq: pd.DataFrame) -> SequenceStore:
+        d = seq[seq["ev_id"].notna()].sort_values(SORT_KEYS, kind="stable", na_position="last")
+        ev_codes, ev_ids = pd.factorize(d["ev_id"].astype("string"), sort=True)
+        starts = np.flatnonzero(np.r_[True, ev_codes[1:] != ev_codes[:-1]]) if len(d) else np.empty(0, np.int64)
+        phase_meaning = d["phase_meaning"] if "phase_meaning" in d.columns else pd.Series(pd.NA, index=d.index)
+        phase_no, eventsoe_no = occurrence_parts(d)  # split from Occurrence_Code when the columns are absent
+        return cls(
+            ev_ids=np.asarray(ev_ids, dtype=str),
+            offsets=np.append(starts, len(d)).astype(np.int64),
+            occ=_int16(eventsoe_no),
+            phase=_int16(phase_no),
+            aircraft=_int16(d["Aircraft_Key"]),
+            defining_bits=np.packbits(pd.to_numeric(d["Defining_ev"], errors="coerce").eq(1).to_numpy(dtype=bool)),
+            occ_labels=_labels(eventsoe_no, d["occurrence_meaning"]),
+            phase_labels=_labels(phase_no, phase_meaning),
+        )
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+
+    def save(self, path: str | Path = OUT_SEQ_STORE) -> None:
+        """Write the arrays into a staging directory, then swap it in for `path`."""
+        path = Path(path)
+        staging = path.with_name(f".{path.name}.{uuid.uuid4().hex[:6]}.tmp")
+        staging.mkdir(parents=True)
+        for name in ARRAYS:
+            np.save(staging / f"{name}.npy", getattr(self, name), allow_pickle=False)
+        meta = {
+            "events": self.n_events,
+            "rows": self.n_rows,
+            "occ_labels": {str(k): v for k, v in self.occ_labels.items()},
+            "phase_labels": {str(k): v for k, v in self.phase_labels.items()},
+        }
+        (staging / META_FILE).write_text(json.dumps(meta))
+        old = path.with_name(f".{path.name}.{uuid.uuid4().hex[:6]}.old")
+        if path.exists():
+            os.replace(path, old)
+        os.replace(staging, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str | Path = OUT_SEQ_STORE, mmap: bool = True) -> SequenceStore:
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text())
+        arrays = {n: np.load(path / f"{n}.npy", mmap_mode="r" if mmap else None) for n in ARRAYS}
+        return cls(
+            **arrays,
+            occ_labels={int(k): v for k, v in meta["occ_labels"].items()},
+            phase_labels={int(k): v for k, v in meta["phase_labels"].items()},
+        )
+
+    # -------------------------
+    # Access
+    # -------------------------
+
+    @property
+    def n_events(self) -> int:
+        return len(self.ev_ids)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.occ)
+
+    @property
+    def defining(self) -> np.ndarray:
+        return np.unpackbits(self.defining_bits, count=self.n_rows).astype(bool)
+
+    def position(self, ev_id: str) -> int:
+        """Index of `ev_id` in the store (binary search); KeyError when absent."""
+        i = int(np.searchsorted(self.ev_ids, ev_id))
+        if i == self.n_events or self.ev_ids[i] != ev_id:
+            raise KeyError(ev_id)
+        return i
+
+    def rows(self, i: int) -> slice:
+        """Row slice of event number `i` (O(1))."""
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def sequence(self, ev_id: str) -> pd.DataFrame:
+        """One event's ordered occurrences (all aircraft)."""
+        sl = self.rows(self.position(ev_id))
+        bits = np.unpackbits(self.defining_bits[sl.start // 8 : (sl.stop + 7) // 8])
+        occ = np.asarray(self.occ[sl])
+        phase = np.asarray(self.phase[sl])
+        return pd.DataFrame(
+            {
+                "Aircraft_Key": np.asarray(self.aircraft[sl]),
+                "eventsoe_no": occ,
+                "occurrence_meaning": [self.occ_labels.get(int(c)) for c in occ],
+                "phase_no": phase,
+                "phase_meaning": [self.phase_labels.get(int(c)) for c in phase],
+                "Defining_ev": bits[sl.start % 8 : sl.start % 8 + len(occ)].astype(bool),
+            }
+        )
+
+    def code_of(self, meaning: str) -> int:
+        """eventsoe_no for an occurrence meaning (first match)."""
+        for code, label in self.occ_labels.items():
+            if label == meaning:
+                return code
+        raise KeyError(meaning)
+
+    # -------------------------
+    # Vectorized membership queries
+    # -------------------------
+
+    def _event_of_row(self) -> np.ndarray:
+        return np.repeat(np.arange(self.n_events, dtype=np.int64), np.diff(self.offsets))
+
+    def contains(self, code: int, defining_only: bool = False) -> np.ndarray:
+        """ev_ids with at least one occurrence `code`."""
+        hit = np.asarray(self.occ) == code
+        if defining_only:
+            hit &= self.defining
+        return self.ev_ids[np.unique(self._event_of_row()[hit])]
+
+    def contains_then(self, *codes: int, same_aircraft: bool = True) -> np.ndarray:
+        """
+        ev_ids whose chain has the occurrence codes in this order (not necessarily
+        adjacent), within one aircraft unless `same_aircraft` is False.
+        """
+        if not codes or not self.n_rows:
+            return self.ev_ids[:0]
+        ev = self._event_of_row()
+        if same_aircraft:  # rows are sorted by aircraft within an event, so (event, aircraft) runs are chains
+            acft = np.asarray(self.aircraft)
+            start = np.r_[True, (ev[1:] != ev[:-1]) | (acft[1:] != acft[:-1])]
+            group = np.cumsum(start) - 1
+        else:
+            group = ev
+        occ = np.asarray(self.occ)
+        # earliest row matching each step after the previous step's row, per group
+        prev = np.full(int(group[-1]) + 1 if len(group) else 0, -1, dtype=np.int64)
+        alive = np.ones(len(prev), dtype=bool)
+        for code in codes:
+            rows = np.flatnonzero(occ == code)
+            rows = rows[rows > prev[group[rows]]]
+            g, first = np.unique(group[rows], return_index=True)
+            nxt = np.full(len(prev), -1, dtype=np.int64)
+            nxt[g] = rows[first]
+            alive &= nxt >= 0
+            prev = np.where(alive, nxt, np.iinfo(np.int64).max)
+        group_ev = np.zeros(len(alive), dtype=np.int64)
+        group_ev[group] = ev
+        return self.ev_ids[np.unique(group_ev[alive])]
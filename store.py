@@ -0,0 +1,92 @@
+# store.py
+from __future__ import annotations
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+NUMERIC_COLS = ["ev_year", "Aircraft_Key", "Occurrence_No", "phase_no", "eventsoe_no", "Defining_ev"]
+STRING_COLS = ["ev_highest_injury", "acft_make", "acft_model", "occurrence_meaning", "phase_meaning"]
+
+
+def final_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The dtype contract the app and CLI expect. Applied once at build time for
+    Arrow outputs; only re-applied on load for the Parquet fallback.
+    """
+    for c in NUMERIC_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    if "ev_date" in df.columns:
+        df["ev_date"] = pd.to_datetime(df["ev_date"], errors="coerce")
+    for s in STRING_COLS:
+        if s in df.columns:
+            df[s] = df[s].astype("string")
+    return df
+
+
+def write_arrow(df: pd.DataFrame, path: str | Path) -> int:
+    """Write an uncompressed Arrow IPC file atomically; returns bytes written."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+    return path.stat().st_size
+
+
+def write_parquet(df: pd.DataFrame, path: str | Path) -> None:
+    """Write a Parquet file atomically (temp file in the same directory, then rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+
+
+def read_arrow(path: str | Path) -> pd.DataFrame:
+    """
+    Open an Arrow IPC file through pyarrow.memory_map: no decompression or decoding,
+    and the OS page cache is shared between processes reading the same file.
+    """
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def read_table(path: str | Path) -> pd.DataFrame:
+    """Read .arrow/.feather (memory-mapped), .parquet, or .csv by suffix."""
+    p = Path(path)
+    if p.suffix in {".arrow", ".feather", ".ipc"}:
+        return read_arrow(p)
+    if p.suffix == ".parquet":
+        return pd.read_parquet(p)
+    return pd.read_csv(p)
+
+
+def _load_one(arrow_path: str | Path | None, parquet_path: str | Path) -> pd.DataFrame:
+    if arrow_path is not None and Path(arrow_path).exists():
+        return read_arrow(arrow_path)
+    if Path(parquet_path).exists():
+        return final_dtypes(pd.read_parquet(parquet_path))
+    return pd.DataFrame()
+
+
+def load_outputs(pairs: list[tuple[str | Path | None, str | Path]]) -> list[pd.DataFrame]:
+    """Load (arrow, parquet) output pairs concurrently, preferring the Arrow copy when present."""
+    with ThreadPoolExecutor(max_workers=max(1, len(pairs))) as ex:
+        return list(ex.map(lambda ap: _load_one(*ap), pairs))
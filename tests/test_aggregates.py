@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from analysis.aggregates import (
+    AggregateStore,
+    category_injury_view,
+    flight_controls_view,
+    row_changes,
+    system_bucket_view,
+    year_strata_view,
+)
+from analysis.system_buckets import event_level_with_system_flags
+from analysis.system_risk import stratified_counts
+from publish import publish
+
+
+def _tables():
+    events = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E2", "E3", "E4"],
+            "ev_year": [2010, 2010, 2011, 2011],
+            "ev_highest_injury": ["FATL", "NONE", "FATL", None],
+        }
+    )
+    findings = events.loc[[0, 1, 2, 3, 3]].reset_index(drop=True)
+    findings["finding_category"] = ["Aircraft", "Aircraft", "Aircraft", "Personnel", "Aircraft"]
+    findings["finding_description"] = ["aileron cable", "fuel pump", "brake failure", "rudder trim", "engine oil"]
+    seq = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E1", "E2", "E3"],
+            "phase_meaning": ["Cruise", "Landing", "Cruise", None],
+            "occurrence_meaning": ["Loss of control", "Hard landing", "Fuel exhaustion", "Fuel exhaustion"],
+        }
+    )
+    return {"events": events, "findings": findings, "seq": seq}
+
+
+def test_row_changes_is_a_multiset_diff():
+    old = pd.DataFrame({"a": [1, 1, 2], "b": ["x", "x", "y"]})
+    new = pd.DataFrame({"a": [1, 2, 2, 3], "b": ["x", "y", "y", "z"]})
+    added, removed = row_changes(old, new)
+    assert sorted(added["a"]) == [2, 3]
+    assert removed["a"].tolist() == [1]
+
+
+def test_update_matches_full_recompute(tmp_path):
+    t = _tables()
+    store = AggregateStore(tmp_path, verify_every=100)
+    assert store.update(t)["mode"] == "rebuild"
+
+    ev, fl, sq = t["events"].copy(), t["findings"].copy(), t["seq"].copy()
+    ev.loc[ev["ev_id"] == "E2", "ev_highest_injury"] = "FATL"
+    fl.loc[fl["ev_id"] == "E2", ["ev_highest_injury", "finding_description"]] = ["FATL", "elevator jam"]
+    new = {
+        "events": ev[ev["ev_id"] != "E3"],
+        "findings": fl[fl["ev_id"] != "E3"],
+        "seq": pd.concat([sq[sq["ev_id"] != "E3"], sq.head(1)], ignore_index=True),
+    }
+    summary = AggregateStore(tmp_path, verify_every=100).update(new, verify=True)
+    assert summary["mode"] == "delta" and summary["mismatches"] == 0
+    assert summary["events_touched"] == 3  # E2 edited, E3 deleted, E1 gained a sequence row
+
+    reloaded = AggregateStore(tmp_path)
+    assert reloaded.load() and reloaded.verify(new).empty
+
+
+def test_views_match_dashboard_tables(tmp_path):
+    t = _tables()
+    store = AggregateStore(tmp_path)
+    store.rebuild(t)
+    evx = event_level_with_system_flags(t["events"], t["findings"])
+
+    ct = system_bucket_view(store.counts)
+    direct = evx.dropna(subset=["system_bucket"]).groupby("system_bucket").size()
+    assert ct.set_index("system_bucket")["total"].sort_index().tolist() == direct.sort_index().tolist()
+    assert ct.loc[ct["system_bucket"] == "Flight Controls", "fatals"].item() == 1
+
+    xt = flight_controls_view(store.counts)
+    assert xt.loc["Flight controls"].tolist() == [1, 1]  # E4 (missing injury) counts as nonfatal
+    assert int(xt.to_numpy().sum()) == 4
+
+    cat = category_injury_view(store.counts, years=(2010, 2011), severity=["FATL", "NONE"])
+    assert cat.loc["Aircraft"].to_dict() == {"FATL": 2, "NONE": 1}
+
+    keys, counts = year_strata_view(store.counts)
+    fat = evx["ev_highest_injury"].astype("string").eq("FATL")
+    k2, c2 = stratified_counts(evx[["ev_year"]], evx["has_flight_controls"], fat)
+    assert keys["ev_year"].tolist() == k2["ev_year"].tolist()
+    assert np.array_equal(counts, c2)
+
+
+def test_published_aggregates_stay_with_their_version(tmp_path):
+    live, root, pointer = tmp_path / "aggregates", tmp_path / "versions", tmp_path / "CURRENT"
+    t = _tables()
+    AggregateStore(live).update(t)
+    v1 = publish([live], root=root, pointer=pointer)
+
+    # same row counts, revised contents: only the newer version sees it
+    ev = t["events"].assign(ev_highest_injury=["NONE", "NONE", "FATL", None])
+    AggregateStore(live).update({**t, "events": ev})
+    v2 = publish([live], root=root, pointer=pointer)
+
+    old, new = AggregateStore(root / v1 / live.name), AggregateStore(root / v2 / live.name)
+    assert old.load() and new.load()
+    assert old.state["rows"] == new.state["rows"]
+    assert old.verify(t).empty and new.verify({**t, "events": ev}).empty
+    assert not all(old.counts[k].equals(new.counts[k]) for k in old.counts)
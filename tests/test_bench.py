@@ -0,0 +1,72 @@
+import sys
+
+import pandas as pd
+
+import bench.run
+from analysis.dashboard import two_by_two_stats
+from bench.run import compare, run_dashboard_stages
+from bench.synth import generate
+from instrument import Instrumenter
+from labelers import build_event_level, build_finding_level, label_findings, label_sequence
+from loaders import read_aircraft, read_events, read_events_sequence, read_findings
+
+
+def test_synth_feeds_pipeline(tmp_path):
+    paths = generate(tmp_path, scale=0.01, seed=1)
+    events = read_events(paths["events"])
+    aircraft = read_aircraft(paths["aircraft"])
+    findings = read_findings(paths["findings"])
+    seq = read_events_sequence(paths["events_sequence"])
+
+    ev = build_event_level(events, aircraft)
+    fl = build_finding_level(events, findings, aircraft)
+    sq = label_sequence(seq, dict_csv_path=paths["dictionary"])
+
+    assert len(ev) > 100 and ev["ev_id"].is_unique
+    assert fl["ev_id"].isin(ev["ev_id"]).all()
+    assert sq["occurrence_meaning"].notna().mean() > 0.9
+
+
+def test_synth_is_deterministic(tmp_path):
+    a = generate(tmp_path / "a", scale=0.01, seed=3)
+    b = generate(tmp_path / "b", scale=0.01, seed=3)
+    assert a["events"].read_bytes() == b["events"].read_bytes()
+
+
+def test_compare_flags_regressions():
+    base = {"x1": {"fast": 0.001, "slow": 1.0, "ok": 1.0}}
+    cur = {"x1": {"fast": 0.005, "slow": 1.5, "ok": 1.1, "new": 2.0}}
+    out = compare(cur, base, tolerance=0.25, min_seconds=0.02).set_index("stage")
+    assert isinstance(out, pd.DataFrame)
+    assert bool(out.loc["slow", "regressed"])
+    assert not bool(out.loc["ok", "regressed"])
+    assert not bool(out.loc["fast", "regressed"])  # 5x but below the noise floor
+    assert "new" not in out.index
+
+
+def test_dashboard_stages_run_without_the_app(tmp_path):
+    paths = generate(tmp_path, scale=0.01, seed=1)
+    events, aircraft = read_events(paths["events"]), read_aircraft(paths["aircraft"])
+    ev = build_event_level(events, aircraft)
+    fl = label_findings(build_finding_level(events, read_findings(paths["findings"]), aircraft))
+    sq = label_sequence(read_events_sequence(paths["events_sequence"]), dict_csv_path=paths["dictionary"])
+    inst = Instrumenter(enabled=True)
+    run_dashboard_stages(inst, ev, fl, sq)
+    assert "dashboard.system_risk_tables" in {r.name for r in inst.records}
+    assert "app" not in sys.modules
+
+
+def test_two_by_two_stats_falls_back_to_odds_ratio():
+    idx, cols = ["Other systems", "Flight controls"], ["Nonfatal", "Fatal"]
+    full = two_by_two_stats(pd.DataFrame([[80, 20], [30, 10]], index=idx, columns=cols))
+    assert full["note"] is None and full["p_value"] is not None and full["std_residuals"].shape == (2, 2)
+    empty = two_by_two_stats(pd.DataFrame([[80, 0], [30, 0]], index=idx, columns=cols))
+    assert empty["note"] and empty["chi2"] is None and empty["odds_ratio_FC_vs_Other"] > 0
+
+
+def test_missing_baseline_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(bench.run, "bench_scale", lambda *a, **k: {"stage": 0.1})
+    monkeypatch.setattr(bench.run, "BENCH_RESULTS", tmp_path / "results.json")
+    assert bench.run.main(["--baseline", str(tmp_path / "none.json")]) == 2
+    assert bench.run.main(["--baseline", str(tmp_path / "b.json"), "--save-baseline"]) == 0
+    assert bench.run.main(["--baseline", str(tmp_path / "b.json")]) == 0
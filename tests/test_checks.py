@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from quality.checks import DataQualityError, Expectation, enforce, run_expectations
+
+
+def _tables():
+    events = pd.DataFrame({"ev_id": ["E1", "E2", "E3"], "ev_year": [2010, 2011, 2030]})
+    findings = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E1", "E2", "E9", None],
+            "Aircraft_Key": [1, 1, 1, 1, 1],
+            "finding_no": [1, 1, 2, 1, 1],
+        }
+    )
+    return {"events": events, "findings": findings}
+
+
+SUITE = [
+    Expectation("year", "load", "events", "between", ("ev_year",), {"lo": 2008, "hi": 2023}, max_fail_frac=0.5),
+    Expectation("dupes", "load", "findings", "unique", ("ev_id", "Aircraft_Key", "finding_no")),
+    Expectation(
+        "orphans", "load", "findings", "foreign_key", ("ev_id",), {"parent": "events", "parent_columns": ("ev_id",)}
+    ),
+    Expectation("missing_col", "load", "events", "not_null", ("nope",)),
+]
+
+
+def test_vectorized_checks_count_and_sample():
+    rep = run_expectations(_tables(), SUITE, stage="load").set_index("name")
+    assert rep.loc["year", "failed"] == 1 and rep.loc["year", "passed"]
+    assert rep.loc["dupes", "failed"] == 2
+    assert rep.loc["orphans", "failed"] == 1
+    assert rep.loc["orphans", "examples"] == [{"ev_id": "E9"}]
+    assert rep.loc["missing_col", "status"] == "skipped"
+    assert (rep["seconds"] >= 0).all()
+
+
+def test_enforce_fails_on_threshold():
+    rep = run_expectations(_tables(), SUITE)
+    with pytest.raises(DataQualityError, match=r"(?s)^\[E-QA-001\].*dupes"):
+        enforce(rep)
+    enforce(rep[rep["name"] == "year"])
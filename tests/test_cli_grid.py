@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from analysis.system_risk import FilterSpec
+from cli.analyze_systems import load_grid, run_grid
+
+
+def _events(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "ev_year": rng.integers(2009, 2024, n),
+            "far_part": rng.choice(["91", "121", "135"], n),
+            "acft_category": "Airplane",
+            "system_component": rng.choice(["Flight Control", "Engine"], n),
+            "ev_highest_injury": rng.choice(["FATL", "NONE"], n, p=[0.2, 0.8]),
+        }
+    )
+
+
+def test_grid_cross_product_and_long_output(tmp_path):
+    spec_file = tmp_path / "grid.json"
+    spec_file.write_text(
+        json.dumps(
+            {"years": [[2009, 2015], [2016, 2023]], "parts": [["91"], ["121", "135"]], "exclude_rotorcraft": [True]}
+        )
+    )
+    specs = load_grid(str(spec_file))
+    assert len(specs) == 4
+
+    res = run_grid(_events(), specs)
+    assert res["spec"].nunique() == 4
+    assert set(res["table"]) == {"system_contingency", "fc_vs_other_2x2", "chisq", "logit_or"}
+    fc = res[(res["table"] == "logit_or") & (res["row"] == "fc") & (res["metric"] == "OR")]
+    assert len(fc) == 4
+
+
+def test_grid_reports_logit_failures():
+    ev = _events().drop(columns="far_part")
+    res = run_grid(ev, [FilterSpec(years=(2009, 2015))])
+    err = res[res["table"] == "logit_error"]
+    assert len(err) == 1 and err["row"].iloc[0].startswith("KeyError") and err["value"].iloc[0] == 1.0
+    assert not (res["table"] == "logit_or").any()
+
+
+def test_grid_parts_are_strings_and_duplicates_collapse(tmp_path):
+    spec_file = tmp_path / "grid.json"
+    spec_file.write_text(json.dumps({"parts": [[91], ["91"], [121, "135"]], "years": [[2009, 2015], [2009, 2015]]}))
+    specs = load_grid(str(spec_file))
+    assert [s.include_far_parts for s in specs] == [{"91"}, {"121", "135"}]
+
+    ev = _events()
+    res = run_grid(ev, specs)
+    n = res[(res["table"] == "logit_or") & (res["row"] == "fc") & (res["metric"] == "n")]
+    expected = ev["ev_year"].between(2009, 2015) & ev["far_part"].eq("91")
+    assert n["value"].iloc[0] == expected.sum()
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.cohorts import FeatureMatrix, cohort_2x2, fatal_vector, fit_cohort_logit
+
+
+def _tables() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    events = pd.DataFrame(
+        {"ev_id": ["E1", "E2", "E3", "E4"], "ev_highest_injury": ["FATL", "NONE", "FATL", "MINR"]},
+    )
+    findings = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E1", "E2", "E3", "E3"],
+            "finding_code": ["206304044", "204151045", "206304044", "106201020", None],
+            "finding_category": [
+                "Personnel issues-Task",
+                "Personnel issues-Action",
+                "Personnel issues-Task",
+                "Aircraft",
+                "",
+            ],
+            "finding_description": ["Checklist not followed", "Decision", "Use of checklist", "Fuel system", None],
+        }
+    )
+    seq = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E1", "E2", "E4"],
+            "eventsoe_no": [240, 250, 250, 240],
+            "phase_no": [550, 550, 500, 550],
+            "Occurrence_Code": ["550240", "550250", "500250", "550240"],
+        }
+    )
+    return events, findings, seq
+
+
+def test_matrix_dictionaries_and_queries(tmp_path: Path):
+    fm = FeatureMatrix.build(*_tables())
+    assert fm.ev_ids.tolist() == ["E1", "E2", "E3", "E4"]
+    assert list(fm.features) == sorted(fm.features) and "tag:procedural" in fm.features
+    assert fm.X.shape == (4, len(fm.features)) and set(np.unique(fm.X.data)) == {1}
+
+    assert fm.cohort("finding:206304044").tolist() == ["E1", "E2"]
+    assert fm.cohort("occ:250 AND phase:550").tolist() == ["E1"]
+    assert fm.cohort("occ_phase:550240 NOT tag:procedural").tolist() == ["E4"]
+    assert fm.cohort('"category:Personnel issues-Task" OR finding:106*').tolist() == ["E1", "E2", "E3"]
+    assert fm.cohort("-occ:240 -occ:250").tolist() == ["E3"]
+    with pytest.raises(KeyError):
+        fm.mask("occ:999")
+
+    fm.save(tmp_path / "fm.npz")
+    back = FeatureMatrix.load(tmp_path / "fm.npz")
+    assert back.features.tolist() == fm.features.tolist() and (back.X != fm.X).nnz == 0
+    assert back.flag("occ:240", ["E4", "E9", None, "E1"]).tolist() == [True, False, False, True]
+
+
+def test_cohorts_feed_2x2_and_logit():
+    events, findings, seq = _tables()
+    fm = FeatureMatrix.build(events, findings, seq)
+    fatal = fatal_vector(fm, events)
+    assert fatal.tolist() == [True, False, True, False]
+    t = cohort_2x2(fm.mask("tag:procedural"), fatal)
+    assert t.to_numpy().tolist() == [[1, 1], [1, 1]]
+
+    res = fit_cohort_logit(fm, fatal, {"procedural": "tag:procedural"})
+    assert res["term"].tolist() == ["Intercept", "procedural"] and res["n"].iloc[0] == 4
+    assert np.isclose(res["OR"].iloc[1], 1.0)
+
+
+def test_sequence_codes_fall_back_to_occurrence_code():
+    events, findings, seq = _tables()
+    full = FeatureMatrix.build(events, findings, seq)
+    only_code = FeatureMatrix.build(events, findings, seq.drop(columns=["eventsoe_no", "phase_no"]))
+    assert only_code.features.tolist() == full.features.tolist() and (only_code.X != full.X).nnz == 0
+    no_codes = FeatureMatrix.build(events, findings, seq[["ev_id"]])
+    assert not any(f.startswith(("occ:", "phase:", "occ_phase:")) for f in no_codes.features)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from analysis.dashboard import FilterSpec, apply_filters, filter_rows
+
+
+def _tables():
+    events = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E2", "E3", "E4"],
+            "ev_year": pd.array([2010, 2011, None, 2012], dtype="Int64"),
+            "ev_highest_injury": ["FATL", "NONE", "FATL", None],
+            "far_part": [91, 121, 91, 135],
+        },
+        index=[10, 11, 12, 13],
+    )
+    findings = events.loc[[10, 10, 11, 13]].reset_index(drop=True)
+    findings["acft_make"] = ["CESSNA", "PIPER", "CESSNA", "CESSNA"]
+    seq = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E1", "E2", "E4"],
+            "ev_year": [2010, 2010, 2011, 2012],
+            "Defining_ev": pd.array([1, 0, None, 1], dtype="Int64"),
+            "phase_meaning": ["Cruise", "Landing", "Cruise", "Cruise"],
+        }
+    )
+    return events, findings, seq
+
+
+def test_filter_rows_are_positions_and_apply_filters_slices_them():
+    ev, fl, sq = _tables()
+    spec = FilterSpec(years=(2010, 2011), severity=["FATL", "NONE"], parts=["91", "121"], defining_only=True)
+    ev_rows, fl_rows, sq_rows = filter_rows(ev, fl, sq, spec)
+    assert ev_rows.tolist() == [0, 1]  # E3 has no year, E4 is out of range
+    assert fl_rows.tolist() == [0, 1, 2]
+    assert sq_rows.tolist() == [0]  # a missing Defining_ev does not pass
+
+    ev_f, fl_f, sq_f = apply_filters(ev, fl, sq, FilterSpec(makes=["CESSNA"], phases=["Cruise"]))
+    assert ev_f.index.tolist() == [10, 11, 12, 13]  # original labels kept
+    assert fl_f["acft_make"].eq("CESSNA").all() and len(fl_f) == 3
+    assert np.array_equal(sq_f.index, [0, 2, 3])
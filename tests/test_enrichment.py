@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency, hypergeom
+
+from analysis.enrichment import cell_event_counts, enrichment_scan
+
+
+def _data() -> tuple[pd.DataFrame, pd.Series]:
+    rng = np.random.default_rng(7)
+    n = 400
+    ev = [f"E{i:03d}" for i in range(n)]
+    fatal = pd.Series(rng.random(n) < 0.2, index=ev)
+    rows = []
+    for i, e in enumerate(ev):
+        rows.append((e, "Cruise", "LOC-I" if fatal.iloc[i] and rng.random() < 0.6 else "Fuel"))
+        rows.append((e, "Landing", "Excursion"))
+        rows.append((e, "Landing", "Excursion"))  # repeated cell within an event counts once
+    seq = pd.DataFrame(rows, columns=["ev_id", "phase_meaning", "occurrence_meaning"])
+    return seq, fatal
+
+
+def test_counts_are_per_event():
+    seq, fatal = _data()
+    keys, counts, n, n_fatal = cell_event_counts(seq, fatal)
+    assert n == 400 and n_fatal == int(fatal.sum())
+    exc = keys.index[(keys["occurrence_meaning"] == "Excursion")][0]
+    assert counts[exc].tolist() == [n_fatal, n - n_fatal]
+
+
+@pytest.mark.parametrize("method", ["chi2", "midp"])
+def test_scan_matches_per_cell_tests(method):
+    seq, fatal = _data()
+    out = enrichment_scan(seq, fatal, method=method).set_index("occurrence_meaning")
+    assert out.loc["LOC-I", "q"] < 0.01 and out.loc["LOC-I", "OR"] > 10
+    assert out.loc["Excursion", "p"] == pytest.approx(1.0)
+
+    n, n_fatal = len(fatal), int(fatal.sum())
+    r = out.loc["Fuel"]
+    a, b = r["fatal_events"], r["events"] - r["fatal_events"]
+    table = [[a, b], [n_fatal - a, n - n_fatal - b]]
+    if method == "chi2":
+        expected = chi2_contingency(table, correction=False)[1]
+    else:
+        h = hypergeom(n, n_fatal, r["events"])
+        expected = min(1.0, 2 * min(h.cdf(a - 1) + h.pmf(a) / 2, h.sf(a) + h.pmf(a) / 2))
+    assert r["p"] == pytest.approx(expected)
+    assert (out["q"] >= out["p"] - 1e-12).all()
+
+
+def test_min_events_and_bad_method():
+    seq, fatal = _data()
+    assert enrichment_scan(seq, fatal, min_events=10_000).empty
+    with pytest.raises(ValueError):
+        enrichment_scan(seq, fatal, method="fisher")
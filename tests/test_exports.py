@@ -0,0 +1,73 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from exports import ExportCache, write_export
+
+
+def _frame(n: int = 25) -> pd.DataFrame:
+    return pd.DataFrame({"ev_id": [f"E{i:02d}" for i in range(n)], "n": range(n), "note": [None] * (n - 1) + ["last"]})
+
+
+def test_chunked_writes_round_trip(tmp_path):
+    df = _frame()
+    write_export(df, tmp_path / "a.csv", "csv", chunk_rows=4)
+    back = pd.read_csv(tmp_path / "a.csv")
+    assert back["ev_id"].tolist() == df["ev_id"].tolist() and back["note"].iloc[-1] == "last"
+
+    write_export(df, tmp_path / "a.parquet", "parquet", chunk_rows=4)
+    assert pd.read_parquet(tmp_path / "a.parquet").equals(df)  # all-null chunks keep the frame's schema
+
+    write_export(df.set_index("ev_id"), tmp_path / "i.csv", "csv", index=True, chunk_rows=10)
+    assert (tmp_path / "i.csv").read_text().splitlines()[0] == "ev_id,n,note"
+    with pytest.raises(ValueError):
+        write_export(df, tmp_path / "a.txt", "txt")
+
+
+def test_cache_writes_once_per_key_and_evicts(tmp_path):
+    cache = ExportCache(tmp_path, max_bytes=10_000, chunk_rows=7)
+    calls = []
+
+    def frame():
+        calls.append(1)
+        return _frame()
+
+    p = cache.get_or_write("v1", "spec", "rows", "csv", frame)
+    assert cache.get_or_write("v1", "spec", "rows", "csv", frame) == p and len(calls) == 1
+    assert cache.get("v2", "spec", "rows", "csv") is None  # new data version, new file
+    assert pd.read_csv(io.BytesIO(p.read_bytes()))["n"].sum() == sum(range(25))
+
+    q = cache.get_or_write("v1", "spec", "rows", "parquet", frame)
+    os.utime(p, (0, 0))  # p is now the least recently used
+    cache.max_bytes = q.stat().st_size + 1
+    r = cache.get_or_write("v1", "other", "rows", "parquet", frame)
+    assert not p.exists() and r.exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_xlsx_round_trip_in_chunks(tmp_path):
+    pytest.importorskip("openpyxl")
+    df = _frame()
+    write_export(df, tmp_path / "a.xlsx", "xlsx", chunk_rows=4)
+    back = pd.read_excel(tmp_path / "a.xlsx", sheet_name="data", engine="openpyxl")
+    assert back["ev_id"].tolist() == df["ev_id"].tolist() and back["n"].tolist() == df["n"].tolist()
+    assert back["note"].iloc[-1] == "last" and back["note"].iloc[:-1].isna().all()
+
+
+def test_evict_tolerates_files_removed_mid_scan(tmp_path, monkeypatch):
+    cache = ExportCache(tmp_path)
+    paths = [cache.get_or_write("v1", str(i), "rows", "csv", _frame()) for i in range(3)]
+    cache.max_bytes = 0
+    gone = paths[0]
+    real_stat = type(gone).stat
+
+    def stat(self, *a, **k):
+        if self == gone:
+            raise FileNotFoundError(self)  # another session evicted it after iterdir
+        return real_stat(self, *a, **k)
+
+    monkeypatch.setattr(type(gone), "stat", stat)
+    cache.evict(protect=paths[2])
+    assert not paths[1].exists() and paths[2].exists()
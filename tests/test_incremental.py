@@ -0,0 +1,128 @@
+import pandas as pd
+import pytest
+
+from bench.synth import generate
+from incremental import (
+    PART_TABLES,
+    consolidate,
+    diff_events,
+    event_hashes,
+    ingest,
+    mark_consolidated,
+    needs_consolidation,
+    read_manifest,
+    read_partitions,
+)
+from quality.checks import DataQualityError
+
+RAW = ["events.csv", "findings.csv", "aircraft.csv", "events_sequence.csv"]
+
+
+def test_event_hashes_are_order_insensitive():
+    ev = pd.DataFrame({"ev_id": ["A", "B"], "ev_year": [2010, 2011], "x": [1, 2]})
+    fi = pd.DataFrame({"ev_id": ["A", "A", "B"], "code": [1, 2, 3]})
+    h1 = event_hashes(ev, {"findings": fi}).set_index("ev_id")["row_hash"]
+    h2 = event_hashes(ev[::-1], {"findings": fi[::-1]}).set_index("ev_id")["row_hash"]
+    assert h1.equals(h2.reindex(h1.index))
+
+    fi2 = fi.assign(code=[1, 2, 4])
+    d = diff_events(event_hashes(ev, {"findings": fi}), event_hashes(ev, {"findings": fi2}))
+    assert list(d.changed) == ["B"] and d.new.empty and d.deleted.empty and d.years == {"2011"}
+
+
+def test_ingest_upserts_only_changed_partitions(tmp_path):
+    raw, parts = tmp_path / "raw", tmp_path / "parts"
+    generate(raw, scale=0.01, seed=2)
+    m0 = ingest(raw, parts)
+    assert m0["full_rebuild"] and m0["generation"] == 1
+
+    events = pd.read_csv(raw / "events.csv", dtype=str)
+    in_window = events[events["ev_year"].astype(int).between(2008, 2023)]
+    gone, edited = in_window["ev_id"].iloc[0], in_window["ev_id"].iloc[1]
+    for name in RAW:
+        df = pd.read_csv(raw / name, dtype=str)
+        df = df[df["ev_id"] != gone]
+        if name == "events.csv":
+            df.loc[df["ev_id"] == edited, "ev_highest_injury"] = "FATL"
+        df.to_csv(raw / name, index=False)
+
+    m1 = ingest(raw, parts)
+    assert not m1["full_rebuild"] and m1["delta"] == {"new": 0, "changed": 1, "deleted": 1}
+    edited_year = str(in_window.set_index("ev_id").loc[edited, "ev_year"])
+    assert edited_year in m1["changed_partitions"]["event_level"]
+    assert len(m1["changed_partitions"]["event_level"]) <= 2
+    assert m1["partitions"]["event_level"][edited_year]["generation"] == 2
+
+    ev = read_partitions(parts, "event_level").set_index("ev_id")
+    assert gone not in ev.index
+    assert ev.loc[edited, "ev_highest_injury"] == "FATL"
+    assert ev.index.is_unique
+
+    m2 = ingest(raw, parts)
+    assert m2["changed_partitions"] == {} and m2["delta"] == {"new": 0, "changed": 0, "deleted": 0}
+
+
+def test_rejected_export_writes_nothing_and_is_retried(tmp_path):
+    raw, parts = tmp_path / "raw", tmp_path / "parts"
+    generate(raw, scale=0.01, seed=2)
+    m0 = ingest(raw, parts)
+    files = {p: p.stat().st_mtime_ns for p in parts.rglob("*") if p.is_file()}
+
+    events = pd.read_csv(raw / "events.csv", dtype=str)
+    edited = events.loc[events["ev_year"].astype(int).between(2008, 2023), "ev_id"].iloc[0]
+    events.loc[events["ev_id"] == edited, "ev_highest_injury"] = "FATL"
+    events.to_csv(raw / "events.csv", index=False)
+    # duplicate every finding row: fails the findings_key_unique load check
+    header, *rows = (raw / "findings.csv").read_text().splitlines()
+    (raw / "findings.csv").write_text("\n".join([header, *rows, *rows]) + "\n")
+    with pytest.raises(DataQualityError):
+        ingest(raw, parts)
+    assert {p: p.stat().st_mtime_ns for p in parts.rglob("*") if p.is_file()} == files
+    assert read_manifest(parts) == m0
+
+    (raw / "findings.csv").write_text("\n".join([header, *rows]) + "\n")
+    assert ingest(raw, parts)["delta"] == {"new": 0, "changed": 1, "deleted": 0}
+
+
+def test_consolidate_checks_before_replacing_flat_outputs(tmp_path):
+    raw, parts = tmp_path / "raw", tmp_path / "parts"
+    generate(raw, scale=0.01, seed=2)
+    ingest(raw, parts)
+    flat = {t: tmp_path / f"{t}.parquet" for t in PART_TABLES}
+    seen = []
+
+    def reject(stage, tables):
+        seen.append((stage, sorted(tables)))
+        raise DataQualityError("rejected")
+
+    with pytest.raises(DataQualityError):
+        consolidate(parts, flat, check=reject)
+    assert seen == [("build", ["event_level", "finding_level"])]
+    assert not any(p.exists() for p in flat.values())
+
+    out = consolidate(parts, flat)
+    assert all(p.exists() for p in flat.values()) and out["event_level"]["ev_id"].is_unique
+
+
+def test_failed_consolidation_is_redone_on_the_next_run(tmp_path):
+    raw, parts = tmp_path / "raw", tmp_path / "parts"
+    generate(raw, scale=0.01, seed=2)
+    flat = {t: tmp_path / f"{t}.parquet" for t in PART_TABLES}
+
+    def reject(stage, tables):
+        raise DataQualityError("rejected")
+
+    m0 = ingest(raw, parts)
+    assert needs_consolidation(m0)
+    with pytest.raises(DataQualityError):
+        consolidate(parts, flat, check=reject)
+
+    # nothing changed in the export, but the failed generation is still pending
+    m1 = ingest(raw, parts)
+    assert m1["delta"] == {"new": 0, "changed": 0, "deleted": 0} and needs_consolidation(m1)
+    consolidate(parts, flat)
+    mark_consolidated(m1["generation"], parts)
+    assert all(p.exists() for p in flat.values())
+
+    m2 = ingest(raw, parts)
+    assert not needs_consolidation(m2) and m2["consolidated_generation"] == m1["generation"]
@@ -0,0 +1,36 @@
+import json
+
+from instrument import Instrumenter
+
+
+def test_disabled_records_nothing():
+    inst = Instrumenter(enabled=False)
+    with inst.stage("x") as st:
+        st.out([1, 2, 3])
+    assert inst.records == []
+
+
+def test_stage_report_trace_and_profile(tmp_path):
+    inst = Instrumenter(enabled=True, profile_dir=tmp_path / "prof")
+    out = tmp_path / "f.bin"
+    with inst.stage("write", rows_in=3) as st:
+        out.write_bytes(b"x" * 100)
+        st.out([1, 2])
+        st.wrote(out)
+
+    @inst.timed()
+    def build():
+        return list(range(5))
+
+    build()
+    rep = inst.report()
+    assert [s["stage"] for s in rep["stages"]] == ["write", "build"]
+    first = rep["stages"][0]
+    assert first["rows_in"] == 3 and first["rows_out"] == 2 and first["bytes_written"] == 100
+    assert rep["stages"][1]["rows_out"] == 5
+    assert first["wall_s"] >= 0 and first["cpu_s"] >= 0
+    assert len(list((tmp_path / "prof").glob("*.prof"))) == 2
+
+    inst.write_chrome_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert {e["ph"] for e in trace["traceEvents"]} == {"X"}
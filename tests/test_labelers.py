@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from labelers import AircraftIndex, build_event_level, build_finding_level
+
+
+def _frames():
+    events = pd.DataFrame({"ev_id": ["E1", "E2", "E3"], "ev_year": [2010, 2011, 2012]})
+    aircraft = pd.DataFrame(
+        {
+            "ev_id": pd.array(["E1", "E2", "E2", "E3"], dtype="string"),
+            "Aircraft_Key": pd.array([1, 2, 1, pd.NA], dtype="Int64"),
+            "acft_make": ["CESSNA", "PIPER", "BOEING", "BEECH"],
+        }
+    )
+    findings = pd.DataFrame({"ev_id": ["E2", "E2", "E1"], "Aircraft_Key": pd.array([1, 2, 3], dtype="Int64")})
+    return events, aircraft, findings
+
+
+def test_index_matches_sort_drop_duplicates():
+    events, aircraft, findings = _frames()
+    ape = aircraft.sort_values(["ev_id", "Aircraft_Key"]).drop_duplicates(subset=["ev_id"], keep="first")
+    idx = AircraftIndex.build(aircraft)
+
+    ev = build_event_level(events, idx)
+    pd.testing.assert_frame_equal(ev.drop(columns="n_aircraft"), events.merge(ape, on="ev_id", how="left"))
+    assert ev.set_index("ev_id")["n_aircraft"].to_dict() == {"E1": 1, "E2": 2, "E3": 1}
+    assert idx.n_multi == 1
+
+    fl = build_finding_level(events, findings, idx)
+    assert len(fl) == 3 and fl["acft_make"].tolist() == ["BOEING", "BOEING", "CESSNA"]
+
+
+def test_all_and_finding_policies():
+    events, aircraft, findings = _frames()
+    idx = AircraftIndex.build(aircraft)
+
+    assert len(build_event_level(events, idx, policy="all")) == 4
+
+    fl = build_finding_level(events, findings, idx, policy="finding")
+    assert len(fl) == 3
+    assert fl["acft_make"].tolist()[:2] == ["BOEING", "PIPER"]
+    assert pd.isna(fl["acft_make"].iloc[2])  # E1 has no Aircraft_Key 3
+    assert {"Aircraft_Key_x", "Aircraft_Key_y"} <= set(fl.columns)
+
+    with pytest.raises(ValueError):
+        build_event_level(events, idx, policy="finding")
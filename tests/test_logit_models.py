@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from analysis.logit_models import fit_logit, fit_logit_batch
+from analysis.system_risk import FilterSpec, spec_label
+
+
+def _events(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "ev_year": rng.integers(2009, 2024, n),
+            "far_part": rng.choice(["91", "121", "135"], n, p=[0.7, 0.15, 0.15]),
+            "acft_category": rng.choice(["Airplane", "Rotorcraft"], n, p=[0.9, 0.1]),
+            "system_component": rng.choice(["Flight Control", "Engine", "Avionics"], n),
+        }
+    )
+    lin = -1.0 + 0.5 * df["system_component"].eq("Flight Control") + 0.03 * (df["ev_year"] - 2015)
+    df["ev_highest_injury"] = np.where(rng.random(n) < 1 / (1 + np.exp(-lin)), "FATL", "NONE")
+    return df
+
+
+def test_batch_matches_fit_logit():
+    df = _events()
+    specs = [
+        FilterSpec(years=(2009, 2016), include_far_parts={"91", "121", "135"}),
+        FilterSpec(years=(2012, 2023), include_far_parts={"91"}),
+        FilterSpec(years=(2009, 2023), include_far_parts={"121", "135"}, exclude_rotorcraft=False),
+    ]
+    batch = fit_logit_batch(df, specs)
+    assert set(batch["spec"]) == {spec_label(s) for s in specs}
+    for s in specs:
+        _, ref = fit_logit(df, spec=s)
+        got = batch[batch["spec"] == spec_label(s)].set_index("term").loc[ref["term"]]
+        assert np.allclose(got["coef"], ref["coef"], rtol=1e-5, atol=1e-8)
+        assert np.allclose(got["p"], ref["p"], rtol=1e-4, atol=1e-12)
+        assert got["converged"].all()
+
+
+def test_batch_process_pool_matches_serial():
+    df = _events(seed=1)
+    specs = [FilterSpec(years=(y, y + 4), include_far_parts={"91", "121", "135"}) for y in range(2009, 2017)]
+    serial = fit_logit_batch(df, specs)
+    pooled = fit_logit_batch(df, specs, workers=2)
+    pd.testing.assert_frame_equal(serial, pooled, rtol=1e-6)
+
+
+def test_numeric_far_part_levels_follow_patsy_order():
+    df = _events(seed=2)
+    df["far_part"] = df["far_part"].astype(int)
+    spec = FilterSpec(years=(2009, 2023))
+    _, ref = fit_logit(df, spec=spec)
+    got = fit_logit_batch(df, [spec]).set_index("term")
+    assert set(got.index) == set(ref["term"])  # 91 is the reference level, as in patsy
+    assert np.allclose(got.loc[ref["term"], "coef"], ref["coef"], rtol=1e-5, atol=1e-8)
+
+
+def test_empty_batch_has_the_result_columns():
+    assert list(fit_logit_batch(_events(n=200), [])) == list(fit_logit_batch(_events(n=200), [FilterSpec()]))
+
+
+def test_spec_label_covers_every_field():
+    a, b = FilterSpec(severity=["FATL"]), FilterSpec(severity=["SERS"])
+    assert spec_label(a) != spec_label(b) != spec_label(FilterSpec())
+    assert spec_label(FilterSpec(include_far_parts={"91"})) == "2009-2025|91|norotor"
@@ -0,0 +1,57 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.model_cache import ModelCache, fingerprint
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.integers(0, 2, n)
+    y = (rng.random(n) < np.where(x == 1, 0.4, 0.2)).astype(int)
+    return pd.DataFrame({"fatal": y, "x": x})
+
+
+def test_cache_hit_and_invalidation(tmp_path):
+    cache = ModelCache(tmp_path)
+    df = _frame()
+    first = cache.logit("fatal ~ x", df)
+    assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    again = cache.logit("fatal ~ x", df)
+    pd.testing.assert_series_equal(first.params, again.params)
+    assert again.summary_text == first.summary_text
+
+    changed = df.copy()
+    changed.loc[0, "fatal"] = 1 - changed.loc[0, "fatal"]
+    assert fingerprint(changed, "fatal ~ x") != fingerprint(df, "fatal ~ x")
+    assert fingerprint(df, "fatal ~ x", {"method": "bfgs"}) != fingerprint(df, "fatal ~ x")
+    cache.logit("fatal ~ x", changed)
+    assert len(list(tmp_path.glob("*.pkl"))) == 2
+
+
+def test_cache_eviction_is_size_bounded(tmp_path):
+    cache = ModelCache(tmp_path)
+    cache.logit("fatal ~ x", _frame(seed=1))
+    entry = next(tmp_path.glob("*.pkl")).stat().st_size
+    cache.max_bytes = int(entry * 2.5)
+    for seed in range(2, 6):
+        cache.logit("fatal ~ x", _frame(seed=seed))
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.pkl")) <= cache.max_bytes
+
+
+def test_incompatible_entries_are_misses_and_failed_writes_leave_nothing(tmp_path):
+    cache = ModelCache(tmp_path)
+    df = _frame()
+    key = fingerprint(df, "fatal ~ x", {"model": "logit", "disp": False})
+    for stale in (b"c__main__\nNoSuchClass\n.", b"cno_such_module_xyz\nThing\n."):  # renamed class / module
+        (tmp_path / f"{key}.pkl").write_bytes(stale)
+        assert cache.get(key) is None
+        assert not (tmp_path / f"{key}.pkl").exists()
+    assert cache.logit("fatal ~ x", df).nobs == len(df)
+
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        cache.put("bad", lambda: None)  # not picklable
+    assert not list(tmp_path.glob("*.tmp")) and not (tmp_path / "bad.pkl").exists()
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pandas as pd
+
+from normalize import AliasTable, Canonicalizer
+
+
+def _aliases(tmp_path: Path) -> AliasTable:
+    p = tmp_path / "aliases.csv"
+    p.write_text(
+        "field,kind,match,canonical\n"
+        "make,exact,CIRRUS DESIGN,CIRRUS\n"
+        'make,pattern,"(?:[ ,.]+(?:INC|CORP|CO))+\\.?$",\n'
+        "make,pattern,\\bROBINSON HELICOPTER\\b,ROBINSON\n"
+    )
+    return AliasTable.load(p)
+
+
+def test_canonicalizer_folds_spellings_and_reports(tmp_path: Path):
+    df = pd.DataFrame(
+        {
+            "acft_make": ["Cirrus Design Corp.", "CIRRUS", "cirrus  design", "Robinson Helicopter Co", None, "CIRRUS"],
+            "acft_model": [" sr22", "SR22", "SR20", "R44", "X", None],
+        }
+    )
+    c = Canonicalizer(_aliases(tmp_path), cache_dir=None)
+    out = c.apply(df.copy())
+    assert out["acft_make"].tolist()[:4] == ["CIRRUS", "CIRRUS", "CIRRUS", "ROBINSON"]
+    assert pd.isna(out["acft_make"].iloc[4]) and out["acft_make"].iloc[5] == "CIRRUS"
+    assert out["acft_model"].tolist()[:2] == ["SR22", "SR22"]
+
+    rep = c.report("make", min_spellings=2)
+    assert rep.loc[0, ["canonical", "spellings", "rows"]].tolist() == ["CIRRUS", 3, 4]
+    assert len(rep) == 1
+
+
+def test_canonicalizer_cache_is_versioned_by_table(tmp_path: Path):
+    aliases = _aliases(tmp_path)
+    df = pd.DataFrame({"acft_make": ["Cirrus Design Corp."]})
+    Canonicalizer(aliases, cache_dir=tmp_path / "cache").apply(df.copy())
+    assert (tmp_path / "cache" / f"make-{aliases.version}.parquet").exists()
+
+    # a warm cache answers without resolving again
+    c = Canonicalizer(aliases, cache_dir=tmp_path / "cache")
+    c.resolve = None
+    assert c.apply(df.copy())["acft_make"].tolist() == ["CIRRUS"]
+
+    # editing the table bumps the version and drops the stale cache file
+    (tmp_path / "aliases.csv").write_text("field,kind,match,canonical\nmake,exact,CIRRUS DESIGN CORP.,CDC\n")
+    edited = AliasTable.load(tmp_path / "aliases.csv")
+    assert edited.version != aliases.version
+    assert Canonicalizer(edited, cache_dir=tmp_path / "cache").apply(df.copy())["acft_make"].tolist() == ["CDC"]
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == [f"make-{edited.version}.parquet"]
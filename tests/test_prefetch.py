@@ -0,0 +1,98 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from prefetch import Prefetcher, ResultCache, adjacent_specs
+
+
+@dataclass
+class Spec:
+    years: tuple[int, int] = (2010, 2020)
+    severity: list[str] | None = None
+
+
+SEV = ["FATL", "SERS", "MINR", "NONE"]
+
+
+def test_adjacent_specs_steps_years_and_toggles_severity():
+    specs = adjacent_specs(Spec(severity=SEV), (2000, 2020), SEV)
+    assert [s.years for s in specs[:3]] == [(2009, 2020), (2011, 2020), (2010, 2019)]  # 2021 is out of range
+    assert [s.severity for s in specs[3:]] == [
+        ["SERS", "MINR", "NONE"],
+        ["FATL", "MINR", "NONE"],
+        ["FATL", "SERS", "NONE"],
+        ["FATL", "SERS", "MINR"],
+    ]
+    # a single severity is never toggled off to an empty selection
+    one = adjacent_specs(Spec(years=(2010, 2010), severity=["FATL"]), (2010, 2010), SEV)
+    assert [s.severity for s in one] == [["FATL", "SERS"], ["FATL", "MINR"], ["FATL", "NONE"]]
+
+
+def test_prefetched_results_are_served_from_cache():
+    cache = ResultCache(max_entries=8)
+    pf = Prefetcher(cache, cpu_budget=10, duty=1.0, nice=0)
+    calls = []
+    pf.submit([(k, lambda k=k: calls.append(k) or k * 10) for k in range(3)])
+    assert pf.wait_idle(5)
+    assert cache.get_or_compute(2, lambda: -1) == 20
+    assert calls == [0, 1, 2] and pf.stats["computed"] == 3
+
+
+def test_cancel_drops_the_pending_batch():
+    cache = ResultCache()
+    pf = Prefetcher(cache, cpu_budget=10, duty=1.0, nice=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "first"
+
+    pf.submit([("a", slow), ("b", lambda: "b"), ("c", lambda: "c")])
+    started.wait(5)
+    pf.cancel()
+    release.set()
+    assert pf.wait_idle(5)
+    assert "a" in cache and "b" not in cache and "c" not in cache  # the running task still lands
+    assert pf.stats["cancelled"] == 2
+
+
+def test_cpu_budget_stops_the_batch():
+    def spin():
+        t = time.thread_time()
+        while time.thread_time() - t < 0.05:
+            pass
+        return True
+
+    cache = ResultCache()
+    pf = Prefetcher(cache, cpu_budget=0.04, duty=1.0, nice=0)
+    pf.submit([(k, spin) for k in range(5)])
+    assert pf.wait_idle(5)
+    assert len(cache) == 1 and pf.stats["over_budget"] == 4
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache()
+    n = []
+
+    def work():
+        time.sleep(0.05)
+        n.append(1)
+        return 42
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("k", work)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.get_or_compute("k", work) == 42 and len(n) == 1
+
+
+def test_tasks_known_to_exceed_the_remaining_budget_are_skipped():
+    cache = ResultCache(kind=lambda key: key[0])
+    cache.costs["heavy"] = 5.0  # e.g. measured when the foreground computed one
+    pf = Prefetcher(cache, cpu_budget=1.0, duty=1.0, nice=0)
+    pf.submit([(("heavy", 1), lambda: "h"), (("light", 1), lambda: "l")])
+    assert pf.wait_idle(5)
+    assert ("light", 1) in cache and ("heavy", 1) not in cache
+    assert pf.stats["over_budget"] == 1
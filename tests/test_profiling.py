@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from audit import coverage, uniques
+from quality.profiling import HyperLogLog, TableProfiler, diff_profiles, profile_frame
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "ev_id": pd.array(["A", "B", "B", None, "C", "C", "C"], dtype="string"),
+            "ev_year": pd.array([2010, 2011, None, 2012, 2012, 2013, 2013], dtype="Int64"),
+        }
+    )
+
+
+def test_profile_matches_pandas_and_chunking():
+    df = _frame()
+    whole = profile_frame(df, "t")
+    chunked = profile_frame(df, "t", chunk_rows=2)
+    assert whole == chunked
+    ev = whole["columns"]["ev_id"]
+    assert ev["nulls"] == 1 and ev["distinct"] == 3
+    assert ev["top"][0] == ["C", 3]
+    assert ev["str_len"] == {"min": 1, "max": 1, "mean": 1.0}
+    yr = whole["columns"]["ev_year"]
+    assert (yr["min"], yr["max"]) == (2010, 2013)
+    assert coverage(df, ["ev_id", "missing"])["non_null"].tolist() == [6, 0]
+    uq = uniques(df, ["ev_year"])
+    assert uq["n_unique"].tolist() == [df["ev_year"].nunique()] and not uq["approx"].any()
+
+
+def test_hll_switch_and_accuracy():
+    values = pd.Series(np.arange(50_000).astype(str))
+    prof = TableProfiler("t", exact_limit=1_000)
+    for start in range(0, len(values), 5_000):
+        prof.update(values.iloc[start : start + 5_000].to_frame("v"))
+    col = prof.result()["columns"]["v"]
+    assert not col["distinct_exact"]
+    assert abs(col["distinct"] - 50_000) / 50_000 < 0.03
+    uq = uniques(values.to_frame("v"), ["v", "missing"], profile=prof.result())
+    assert uq["approx"].tolist() == [True, False]
+
+    hll = HyperLogLog()
+    hll.add_values(np.arange(300))
+    assert abs(hll.estimate() - 300) < 10
+
+
+def test_diff_profiles_reports_changes_only():
+    old = profile_frame(_frame(), "t")
+    assert diff_profiles(old, old).empty
+    new_df = _frame()
+    new_df.loc[0, "ev_year"] = 2005
+    diff = diff_profiles(old, profile_frame(new_df, "t"))
+    assert ("ev_year", "min") in set(zip(diff["column"], diff["metric"], strict=True))
+    prof = TableProfiler("t", exact_limit=2)
+    prof.update(new_df.assign(ev_id=["A", "B", "C", "D", "E", "F", "G"]))
+    diff = diff_profiles(old, prof.result())
+    metrics = set(zip(diff["column"], diff["metric"], strict=True))
+    assert ("ev_id", "distinct (approx)") in metrics and ("ev_id", "distinct") not in metrics
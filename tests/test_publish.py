@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+from publish import DataRegistry, publish, read_pointer, versions
+
+
+def _loader(version_dir):
+    return None if version_dir is None else (version_dir / "data.txt").read_text()
+
+
+def test_publish_flips_pointer_and_prunes(tmp_path):
+    root, pointer, src = tmp_path / "versions", tmp_path / "CURRENT", tmp_path / "data.txt"
+    published = []
+    for i in range(4):
+        src.write_text(f"v{i}")
+        published.append(publish([src, tmp_path / "missing.arrow"], root=root, pointer=pointer, keep=2))
+        time.sleep(0.01)
+    assert read_pointer(pointer) == published[-1]
+    assert versions(root) == sorted(published[-2:])
+    assert (root / published[-1] / "data.txt").read_text() == "v3"
+    assert not list(root.glob(".*"))  # no staging leftovers
+
+    (tmp_path / "store").mkdir()
+    (tmp_path / "store" / "a.npy").write_bytes(b"x")
+    v = publish([src, tmp_path / "store"], root=root, pointer=pointer)
+    assert (root / v / "store" / "a.npy").read_bytes() == b"x"
+
+
+def test_registry_swaps_in_new_version_and_evicts(tmp_path):
+    root, pointer, src = tmp_path / "versions", tmp_path / "CURRENT", tmp_path / "data.txt"
+    src.write_text("first")
+    v1 = publish([src], root=root, pointer=pointer)
+
+    swaps = []
+    reg = DataRegistry(_loader, root=root, pointer=pointer, poll_seconds=0, on_swap=lambda o, n: swaps.append((o, n)))
+    assert reg.current() == (v1, "first")
+
+    src.write_text("second")
+    time.sleep(0.01)
+    v2 = publish([src], root=root, pointer=pointer)
+    held = reg.current()  # a rerun already in flight keeps its frames
+    reg.poll(wait=True)
+    assert held == (v1, "first")
+    assert reg.current() == (v2, "second") and swaps == [(v1, v2)]
+
+
+def test_registry_keeps_old_version_when_load_fails(tmp_path):
+    root, pointer, src = tmp_path / "versions", tmp_path / "CURRENT", tmp_path / "data.txt"
+    src.write_text("ok")
+    v1 = publish([src], root=root, pointer=pointer)
+    reg = DataRegistry(_loader, root=root, pointer=pointer, poll_seconds=0)
+    reg.current()
+
+    time.sleep(0.01)
+    publish([tmp_path / "absent.txt"], root=root, pointer=pointer)  # version without data.txt
+    reg.poll(wait=True)
+    assert reg.current() == (v1, "ok") and reg.last_error
+
+
+def test_overlapping_loads_never_swap_back_to_an_older_version(tmp_path):
+    root, pointer = tmp_path / "versions", tmp_path / "CURRENT"
+    for v in ("00001-a", "00002-b", "00003-c"):
+        (root / v).mkdir(parents=True)
+        (root / v / "data.txt").write_text(v)
+    release = threading.Event()
+
+    def loader(version_dir):
+        if version_dir.name == "00002-b":
+            release.wait(5)
+        return _loader(version_dir)
+
+    pointer.write_text("00001-a\n")
+    reg = DataRegistry(loader, root=root, pointer=pointer, poll_seconds=0)
+    reg.current()
+
+    pointer.write_text("00002-b\n")
+    os.utime(pointer, ns=(1, 1))
+    reg.poll()  # slow load in the background
+    pointer.write_text("00003-c\n")
+    os.utime(pointer, ns=(2, 2))
+    reg.poll(wait=True)
+    assert reg.current() == ("00003-c", "00003-c")
+
+    slow = next(t for t in threading.enumerate() if t.name == "load-00002-b")
+    release.set()
+    slow.join(5)
+    assert reg.current() == ("00003-c", "00003-c") and reg.loading is None
+    assert reg._pointer_mtime is None  # the next poll re-reads the pointer
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from search import ModelIndex, QuerySyntaxError, TextIndex
+
+
+def test_model_index_matches_str_contains():
+    models = pd.Series(["C172S", "c172", "PA-28-181", None, "PA-28R-200", "737-800", "C172S"], dtype="string")
+    idx = ModelIndex(models)
+    for q in ["172", "pa-28", "28R", "7", "", "zzz", "8-1", "-8"]:
+        expected = models.str.contains(q, case=False, na=False, regex=False).to_numpy(dtype=bool)
+        assert np.array_equal(idx.row_mask(q), expected), q
+    assert len(idx.values) == 5 and idx.n_rows == 7
+
+
+def test_model_index_complete_by_frequency():
+    idx = ModelIndex(pd.Series(["PA-28-181", "PA-28-140", "PA-28-140", "PA-18", "C172"], dtype="string"))
+    assert idx.complete("pa-28") == ["PA-28-140", "PA-28-181"]
+    assert idx.complete("PA", limit=1) == ["PA-28-140"]
+    assert idx.complete("x") == [] and idx.complete("") == []
+
+
+DESCRIPTIONS = pd.Series(
+    [
+        "Aircraft-Fuel system-Fuel pump-Failure - C",
+        "Personnel issues-Action/decision-Info processing/decision-Pilot - C",
+        "Aircraft-Fuel system-Not specified - F",
+        None,
+        "Environmental issues-Conditions/weather/phenomena-Wind-Crosswind - F",
+        "Aircraft-Fuel system-Fuel pump-Failure - C",
+        "Personnel issues-Task performance-Inspection-Student pilot - F",
+    ],
+    dtype="string",
+)
+
+
+def test_text_index_boolean_phrase_prefix():
+    idx = TextIndex.build(DESCRIPTIONS)
+    assert len(idx.docs) == 5 and idx.n_rows == 7
+    assert idx.rows("fuel").tolist() == [0, 2, 5]
+    assert idx.rows('fuel -"not specified"').tolist() == [0, 5]
+    assert idx.rows("pilot AND NOT student").tolist() == [1]
+    assert idx.rows("crosswind OR (inspect* pilot)").tolist() == [4, 6]
+    assert idx.rows('"fuel pump"').tolist() == [0, 5]
+    assert idx.rows('"pump fuel"').tolist() == []
+    assert idx.rows("info processing/decision").tolist() == [1]  # punctuated words act as a phrase
+    assert idx.rows("NOT aircraft").tolist() == [1, 4, 6]  # NA rows never match
+
+
+def test_text_index_syntax_errors():
+    idx = TextIndex.build(DESCRIPTIONS)
+    for q in ["(fuel", "fuel OR", "NOT", "fuel )"]:
+        with pytest.raises(QuerySyntaxError):
+            idx.doc_mask(q)
+
+
+def test_text_index_persisted_and_reused_only_for_same_rows(tmp_path):
+    path = tmp_path / "idx.npz"
+    TextIndex.build(DESCRIPTIONS).save(path)
+    loaded = TextIndex.for_texts(DESCRIPTIONS, path)
+    assert loaded.rows("fuel*").tolist() == [0, 2, 5]
+
+    changed = DESCRIPTIONS.copy()
+    changed.iloc[4] = "Aircraft-Fuel system-Fuel pump-Failure - C"
+    assert TextIndex.for_texts(changed, path).rows('"fuel pump"').tolist() == [0, 4, 5]
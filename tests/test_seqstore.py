@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from seqstore import SequenceStore
+
+
+def _seq() -> pd.DataFrame:
+    # E2 has two aircraft; rows deliberately out of order
+    return pd.DataFrame(
+        {
+            "ev_id": ["E2", "E1", "E2", "E1", "E2", "E3"],
+            "Aircraft_Key": [1, 1, 2, 1, 1, 1],
+            "Occurrence_No": [2, 2, 1, 1, 1, 1],
+            "eventsoe_no": [470, 470, 300, 240, 240, 300],
+            "phase_no": [550, 550, 300, 500, 550, pd.NA],
+            "Defining_ev": [0, 0, 1, 1, 1, 1],
+            "occurrence_meaning": ["CFIT", "CFIT", "Excursion", "LOC-I", "LOC-I", "Excursion"],
+            "phase_meaning": ["Landing", "Landing", "Takeoff", "Approach", "Landing", None],
+        }
+    )
+
+
+def test_store_layout_and_slices():
+    s = SequenceStore.build(_seq())
+    assert s.ev_ids.tolist() == ["E1", "E2", "E3"] and s.offsets.tolist() == [0, 2, 5, 6]
+    assert s.occ.dtype == np.int16 and s.phase.tolist()[-1] == -1
+    assert s.occ[s.rows(1)].tolist() == [240, 470, 300]  # E2: aircraft 1 in order, then aircraft 2
+    seq = s.sequence("E2")
+    assert seq["occurrence_meaning"].tolist() == ["LOC-I", "CFIT", "Excursion"]
+    assert seq["Defining_ev"].tolist() == [True, False, True]
+
+
+def test_then_queries_respect_order_and_aircraft():
+    s = SequenceStore.build(_seq())
+    assert s.contains_then(240, 470).tolist() == ["E1", "E2"]
+    assert s.contains_then(470, 240).tolist() == []
+    assert s.contains_then(240, 300).tolist() == []  # E2's 300 is on the other aircraft
+    assert s.contains_then(240, 300, same_aircraft=False).tolist() == ["E2"]
+    assert s.contains(300).tolist() == ["E2", "E3"]
+    assert s.contains(470, defining_only=True).tolist() == []
+
+
+def test_store_round_trips_memory_mapped(tmp_path):
+    SequenceStore.build(_seq()).save(tmp_path / "store")
+    SequenceStore.build(_seq().iloc[:2]).save(tmp_path / "store")  # replaced in place
+    s = SequenceStore.load(tmp_path / "store")
+    assert isinstance(s.occ, np.memmap) and s.n_events == 2
+    assert s.contains_then(470).tolist() == ["E1", "E2"] and s.code_of("CFIT") == 470
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["store"]
+
+
+def test_codes_fall_back_to_occurrence_code():
+    full = _seq().iloc[:5]
+    code = full["phase_no"].astype(int).map("{:03d}".format) + full["eventsoe_no"].map("{:03d}".format)
+    only_code = full.drop(columns=["eventsoe_no", "phase_no"]).assign(Occurrence_Code=code.astype("string"))
+    a, b = SequenceStore.build(full), SequenceStore.build(only_code)
+    assert np.array_equal(a.occ, b.occ) and np.array_equal(a.phase, b.phase)
+    assert a.occ_labels == b.occ_labels and a.phase_labels == b.phase_labels
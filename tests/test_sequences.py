@@ -0,0 +1,45 @@
+import pandas as pd
+
+from analysis.sequences import Chains, fatal_by_event, ngram_table, transition_matrix
+
+
+def _seq() -> pd.DataFrame:
+    # E1 (two aircraft) and E2; rows deliberately out of order
+    return pd.DataFrame(
+        {
+            "ev_id": ["E1", "E1", "E2", "E1", "E2", "E2", "E1"],
+            "Aircraft_Key": [1, 1, 1, 2, 1, 1, 1],
+            "Occurrence_No": [2, 1, 3, 1, 1, 2, 3],
+            "occurrence_meaning": ["B", "A", "C", "A", "A", "B", None],
+            "eventsoe_no": [2, 1, 3, 1, 1, 2, 999],
+        }
+    )
+
+
+def test_chains_sorted_once_and_split_by_aircraft():
+    ch = Chains.build(_seq())
+    assert ch.n_chains == 3
+    chains = [[ch.labels[c] for c in ch.codes[a:b]] for a, b in zip(ch.offsets[:-1], ch.offsets[1:], strict=True)]
+    assert chains == [["A", "B", "code 999"], ["A"], ["A", "B", "C"]]
+
+
+def test_transition_matrix_stays_within_chains():
+    tm = transition_matrix(Chains.build(_seq()))
+    assert tm.loc["A", "B"] == 2 and tm.loc["B", "C"] == 1 and tm.loc["B", "code 999"] == 1
+    assert tm.loc["(start)", "A"] == 3 and tm.loc["A", "(end)"] == 1  # E1 aircraft 2 is a lone A
+    assert tm.loc["code 999", "A"] == 0  # no transition across the chain boundary
+    assert tm.drop(index="(start)").sum().sum() == 7  # 4 within-chain transitions + 3 chain ends
+
+
+def test_ngram_table_counts_events_and_fatality():
+    ch = Chains.build(_seq())
+    fatal = fatal_by_event(pd.DataFrame({"ev_id": ["E1", "E2"], "ev_highest_injury": ["FATL", "NONE"]}))
+    ng = ngram_table(ch, 2, fatal).set_index("chain")
+    assert ng.loc["A → B", ["occurrences", "events", "fatal_events"]].tolist() == [2, 2, 1]
+    assert ng.loc["A → B", "fatality_rate"] == 0.5
+
+    uni = ngram_table(ch, 1, fatal).set_index("chain")
+    assert uni.loc["A", ["occurrences", "events"]].tolist() == [3, 2]  # E1 has A on both aircraft
+
+    sub = ngram_table(ch.subset(["E2"]), 3, fatal)
+    assert sub["chain"].tolist() == ["A → B → C"] and sub["fatal_events"].tolist() == [0]
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cli.serve_api
+from analysis.logit_models import fit_logit_batch
+from analysis.system_risk import chisq_table, filter_mask
+from cli.serve_api import BadRequest, Service, Tables, spec_from_json, spec_key
+
+
+def _events(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "ev_id": [f"E{i:05d}" for i in range(n)],
+            "ev_year": rng.integers(2009, 2024, n),
+            "far_part": rng.choice(["91", "121", "135"], n),
+            "acft_category": "Airplane",
+            "system_component": rng.choice(["Flight Control", "Engine"], n),
+            "ev_highest_injury": rng.choice(["FATL", "NONE"], n, p=[0.2, 0.8]),
+        }
+    )
+
+
+async def _request(port, method, target, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _serve(service, *calls):
+    async def go():
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*(_request(port, *c) for c in calls))
+
+    return asyncio.run(go())
+
+
+def test_spec_json_roundtrip_and_canonical_key():
+    spec = spec_from_json({"years": [2010, 2015], "include_far_parts": ["91", "121"]})
+    assert spec.years == (2010, 2015) and spec.include_far_parts == {"91", "121"}
+    assert spec_key(spec) == spec_key(spec_from_json({"include_far_parts": ["121", "91"], "years": [2010, 2015]}))
+    assert spec_from_json({"parts": [91, "121"]}).parts == ["91", "121"]
+    for bad in ({"severity": "FATL"}, {"include_far_parts": "91"}, {"makes": [["CESSNA"]]}):
+        with pytest.raises(BadRequest):
+            spec_from_json(bad)
+
+
+def test_endpoints_match_library_results():
+    ev = _events()
+    body = {"years": [2012, 2020], "include_far_parts": ["91"]}
+    spec = spec_from_json(body)
+    service = Service(Tables(ev))
+    (s1, counts), (s2, xt), (s3, lo), (s4, health) = _serve(
+        service, ("POST", "/counts", body), ("POST", "/2x2", body), ("POST", "/logit", body), ("GET", "/health")
+    )
+    assert (s1, s2, s3, s4) == (200, 200, 200, 200)
+    assert counts["events"] == int(filter_mask(ev, spec).sum())
+    assert xt["table"]["Flight Control"]["Fatal"] == chisq_table(ev, spec=spec).loc["Flight Control", "Fatal"]
+    expected = fit_logit_batch(ev, [spec]).set_index("term")["OR"]
+    got = {r["term"]: r["OR"] for r in lo["terms"]}
+    assert np.isclose(got["fc"], expected["fc"])
+    assert health["rows"]["events"] == len(ev)
+
+
+def test_parts_filter_is_applied_and_sequence_filters_are_refused():
+    ev = _events()
+    service = Service(Tables(ev))
+    (s1, c), (s2, xt), (s3, e3), (s4, e4) = _serve(
+        service,
+        ("POST", "/counts", {"parts": ["121"]}),
+        ("POST", "/2x2", {"parts": ["121"]}),
+        ("POST", "/contingency", {"phases": ["Cruise"]}),
+        ("POST", "/logit", {"defining_only": True}),
+    )
+    sub = ev[filter_mask(ev, spec_from_json({})) & ev["far_part"].eq("121").to_numpy()]
+    assert (s1, s2) == (200, 200)
+    assert c["events"] == len(sub) and c["events"] < int(filter_mask(ev, spec_from_json({})).sum())
+    assert (
+        xt["table"]["Flight Control"]["Fatal"]
+        == chisq_table(sub, spec=spec_from_json({})).loc["Flight Control", "Fatal"]
+    )
+    assert s3 == 422 and "phases" in e3["error"]
+    assert s4 == 422 and "defining_only" in e4["error"]
+
+
+def test_identical_requests_are_computed_once_and_errors_are_reported():
+    service = Service(Tables(_events()), max_concurrency=2)
+    body = {"years": [2010, 2018]}
+    results = _serve(service, *[("POST", "/contingency", body)] * 4)
+    assert all(s == 200 for s, _ in results)
+    assert service.stats["computed"] == 1 and service.stats["cache_hits"] == 3
+
+    (s1, e1), (s2, e2), (s3, _) = _serve(
+        service, ("POST", "/counts", {"colour": "red"}), ("POST", "/phase-occurrence", {}), ("POST", "/nope", {})
+    )
+    assert s1 == 400 and "colour" in e1["error"]
+    assert s2 == 422 and "--seq" in e2["error"]
+    assert s3 == 404
+
+
+def test_cancelled_request_still_answers_requests_sharing_it(monkeypatch):
+    def slow(*args):
+        time.sleep(0.2)
+        return {"ok": True}
+
+    monkeypatch.setattr(cli.serve_api, "run_handler", slow)
+    service = Service(Tables(_events(n=50)))
+
+    async def go():
+        first = asyncio.create_task(service.respond("POST", "/counts", b"{}"))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(service.respond("POST", "/counts", b"{}"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        return await asyncio.wait_for(second, timeout=5)
+
+    status, _ = asyncio.run(go())
+    assert status == 503 and not service.inflight
@@ -0,0 +1,53 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from store import final_dtypes, load_outputs, read_arrow, write_arrow
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "ev_id": pd.array(["A", "B", None], dtype="string"),
+            "ev_year": pd.array([2010, None, 2012], dtype="Int64"),
+            "ev_date": ["2010-01-02", "bad", None],
+            "occurrence_meaning": ["x", None, "z"],
+        }
+    )
+
+
+def test_arrow_roundtrip_keeps_final_dtypes(tmp_path):
+    df = final_dtypes(_frame())
+    path = tmp_path / "t.arrow"
+    assert write_arrow(df, path) > 0
+    back = read_arrow(path)
+    pd.testing.assert_frame_equal(back, df)
+    assert str(back["occurrence_meaning"].dtype) == "string"
+
+
+def test_load_outputs_prefers_arrow_then_parquet(tmp_path):
+    df = _frame()
+    pq = tmp_path / "t.parquet"
+    df.to_parquet(pq, index=False)
+    (from_parquet,) = load_outputs([(tmp_path / "missing.arrow", pq)])
+    pd.testing.assert_frame_equal(from_parquet, final_dtypes(df.copy()))
+
+    write_arrow(final_dtypes(df.copy()), tmp_path / "t.arrow")
+    from_arrow, empty = load_outputs([(tmp_path / "t.arrow", pq), (None, tmp_path / "nope.parquet")])
+    pd.testing.assert_frame_equal(from_arrow, from_parquet)
+    assert empty.empty
+
+
+def test_failed_arrow_write_keeps_old_file_and_no_temp(tmp_path, monkeypatch):
+    path = tmp_path / "t.arrow"
+    write_arrow(final_dtypes(_frame()), path)
+    before = path.read_bytes()
+
+    def boom(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pa.ipc, "new_file", boom)
+    with pytest.raises(OSError, match="disk full"):
+        write_arrow(final_dtypes(_frame()), path)
+    assert path.read_bytes() == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["t.arrow"]
@@ -1,6 +1,15 @@
+import numpy as np
 import pandas as pd
+from statsmodels.stats.contingency_tables import StratifiedTable
 
-from analysis.system_risk import FilterSpec, build_contingency, chisq_table
+from analysis.system_risk import (
+    FilterSpec,
+    build_contingency,
+    chisq_table,
+    mantel_haenszel,
+    stratified_analysis,
+    stratified_counts,
+)
 
 
 def _toy():
@@ -42,3 +51,33 @@ def test_chisq_shape():
     assert list(xt.columns) == ["Fatal", "Nonfatal"]
     assert xt.shape == (2, 2)
     assert xt.loc["Flight Control", "Fatal"] == 1
+
+
+def test_stratified_counts_match_chisq_table():
+    df = _toy()
+    keys, counts = stratified_counts(
+        df[["far_part"]], df["system_component"].eq("Flight Control"), df["ev_highest_injury"].eq("FATL")
+    )
+    assert list(keys["far_part"]) == ["121", "135", "91"]
+    assert counts.shape == (3, 2, 2)
+    xt = chisq_table(df, spec=FilterSpec())
+    assert counts.sum(axis=0)[0, 0] == xt.loc["Flight Control", "Fatal"]
+    assert counts.sum() == len(df)
+
+
+def test_mantel_haenszel_matches_statsmodels():
+    rng = np.random.default_rng(0)
+    counts = rng.integers(1, 40, size=(6, 2, 2))
+    ref = StratifiedTable(np.transpose(counts, (1, 2, 0)).astype(float))
+    mh = mantel_haenszel(counts)
+    assert np.isclose(mh["or_mh"], ref.oddsratio_pooled)
+    assert np.isclose(mh["or_mh_ci_low"], ref.oddsratio_pooled_confint()[0])
+    assert np.isclose(mh["mh_chi2"], ref.test_null_odds().statistic)
+    assert np.isclose(mh["breslow_day_chi2"], ref.test_equal_odds(adjust=True).statistic)
+
+
+def test_stratified_analysis_per_stratum():
+    per, mh = stratified_analysis(_toy(), strata=["ev_year"], spec=FilterSpec())
+    assert len(per) == 4
+    assert set(per.columns) >= {"ev_year", "a", "b", "c", "d", "OR", "ci_low", "ci_high"}
+    assert mh["n_strata"] == 4
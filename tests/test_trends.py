@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.aggregates import AggregateStore
+from analysis.trends import TrendCube, wilson_interval
+
+
+def _tables():
+    events = pd.DataFrame(
+        {
+            "ev_id": ["E1", "E2", "E3", "E4", "E5"],
+            "ev_date": pd.to_datetime(["2010-01-05", "2010-03-01", "2011-01-20", "2012-02-02", None]),
+            "ev_year": [2010, 2010, 2011, 2012, 2012],
+            "ev_highest_injury": ["FATL", "NONE", "FATL", "MINR", "FATL"],
+        }
+    )
+    findings = events.loc[[0, 0, 1, 2, 3, 4]].reset_index(drop=True)
+    findings["finding_category"] = ["Aircraft", "Aircraft", "Aircraft", "Personnel", "Aircraft", "Personnel"]
+    findings["cat_text"] = findings["finding_category"]
+    findings["finding_description"] = ["aileron cable", "elevator", "fuel pump", "rudder trim", "brake", "checklist"]
+    return {"events": events, "findings": findings, "seq": pd.DataFrame(columns=["ev_id"])}
+
+
+def test_year_and_month_cubes_count_events(tmp_path):
+    store = AggregateStore(tmp_path)
+    store.rebuild(_tables())
+
+    year = TrendCube.from_counts(store.counts["category_trend"], "finding_category", "year")
+    assert year.periods.tolist() == [2010, 2011, 2012] and year.labels.tolist() == ["Aircraft", "Personnel"]
+    t = year.table().set_index(["period", "label"])
+    assert t.loc[("2010", "Aircraft"), ["events", "fatal"]].tolist() == [2, 1]  # E1's two findings count once
+    assert t.loc[("2012", "Personnel"), ["events", "fatal"]].tolist() == [1, 1]  # E5 has no date but a year
+
+    month = TrendCube.from_counts(store.counts["category_trend"], "finding_category", "month")
+    assert len(month.periods) == 26 and month.period_labels()[:3] == ["2010-01", "2010-02", "2010-03"]
+    assert month.n.sum() == 4  # E5 has no month
+
+    buckets = TrendCube.from_counts(store.counts["system_bucket_trend"], "system_bucket", "year")
+    assert buckets.n.sum() == store.counts["system_bucket_fatality"].sum()
+
+
+def test_rolling_rates_intervals_and_yoy(tmp_path):
+    store = AggregateStore(tmp_path)
+    store.rebuild(_tables())
+    cube = TrendCube.from_counts(store.counts["category_trend"], "finding_category", "year")
+
+    t = cube.table(labels=["Aircraft"], window=2)
+    assert t["rolling_events"].tolist() == [2, 2, 1] and t["rolling_fatal"].tolist() == [1, 1, 0]  # 2011: none
+    assert t["yoy_delta"].iloc[0] != t["yoy_delta"].iloc[0]  # NaN: no prior year
+    assert t["yoy_delta"].iloc[2] == pytest.approx(0 - 1 / 2)
+
+    lo, hi = wilson_interval(np.array([0]), np.array([1]))
+    assert t[["ci_low", "ci_high"]].iloc[2].tolist() == pytest.approx([lo[0], hi[0]])
+
+    # the year filter slices the periods; rolling windows still see the earlier years
+    sliced = cube.table(years=(2012, 2012), labels=["Aircraft"], window=2)
+    assert sliced["period"].tolist() == ["2012"] and sliced["rolling_events"].item() == 1
+    assert cube.table(years=(2011, 2011), labels=["Aircraft"], window=2)["rolling_events"].item() == 2
+
+    only_fatal = cube.table(severity=["FATL"], labels=["Aircraft"])
+    assert only_fatal["rate"].dropna().eq(1.0).all()
@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+
+from bench.synth import generate
+from instrument import Instrumenter
+from loaders import read_aircraft, read_events, read_events_sequence, read_findings
+from watch import Watcher, affected_stages, build_stages
+
+
+def _watcher(tmp_path, **kw):
+    paths = generate(tmp_path / "raw", scale=0.005, seed=4)
+    inputs = {
+        "events": (paths["events"], read_events),
+        "findings": (paths["findings"], read_findings),
+        "aircraft": (paths["aircraft"], read_aircraft),
+        "seq": (paths["events_sequence"], read_events_sequence),
+        "dictionary": (paths["dictionary"], lambda p: p),
+    }
+    out = tmp_path / "out"
+    outputs = {
+        "event_level": (out / "event_level.parquet", out / "event_level.arrow"),
+        "finding_level": (out / "finding_level.parquet", None),
+        "finding_level_labeled": (out / "finding_level_labeled.parquet", None),
+        "seq_labeled": (out / "events_sequence_labeled.parquet", None),
+    }
+    return Watcher(inputs=inputs, outputs=outputs, interval=0.01, debounce=0.05, **kw), paths, outputs
+
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_affected_stages_follow_the_dag():
+    stages = build_stages()
+    assert [s.name for s in affected_stages({"dictionary"}, stages)] == ["label_sequence"]
+    assert [s.name for s in affected_stages({"aircraft"}, stages)] == [
+        "aircraft_index",
+        "build_event_level",
+        "build_finding_level",
+        "label_findings",
+    ]
+    assert [s.name for s in affected_stages({"findings"}, stages)] == ["build_finding_level", "label_findings"]
+
+
+def test_watcher_rebuilds_only_affected_outputs(tmp_path):
+    rebuilt = []
+    w, paths, outputs = _watcher(tmp_path, on_rebuilt=lambda built: rebuilt.append(sorted(built)))
+    assert w.stale_on_start() == {"events", "findings", "aircraft", "seq", "dictionary"}
+    assert len(w.step(w.stale_on_start())) == 5
+    assert all(p.exists() for p, _ in outputs.values()) and w.stale_on_start() == set()
+
+    ev_mtime = outputs["event_level"][0].stat().st_mtime_ns
+    _touch(paths["dictionary"])
+    changed = w.poll()
+    assert changed == {"dictionary"}
+    assert w.step(changed) == ["label_sequence"]
+    assert rebuilt[-1] == ["seq_labeled"]
+    assert outputs["event_level"][0].stat().st_mtime_ns == ev_mtime
+    assert w.poll() == set()
+
+    _touch(paths["aircraft"])
+    assert w.step(w.poll()) == ["aircraft_index", "build_event_level", "build_finding_level", "label_findings"]
+
+
+def test_events_or_findings_alone_rebuild_without_the_aircraft_index_stage(tmp_path):
+    w, paths, outputs = _watcher(tmp_path)
+    w.step(w.stale_on_start())
+    fl_mtime = outputs["finding_level"][0].stat().st_mtime_ns
+    seq_mtime = outputs["seq_labeled"][0].stat().st_mtime_ns
+
+    _touch(paths["findings"])
+    assert w.step(w.poll()) == ["build_finding_level", "label_findings"]
+    assert outputs["finding_level"][0].stat().st_mtime_ns > fl_mtime
+
+    _touch(paths["events"])
+    assert w.step(w.poll()) == ["build_event_level", "build_finding_level", "label_findings"]
+    assert outputs["seq_labeled"][0].stat().st_mtime_ns == seq_mtime
+
+    # a fresh process has no built aircraft index yet: it is computed from its (clean) producer
+    fresh = Watcher(inputs=w.inputs, outputs=w.outputs)
+    assert fresh.step({"findings"}) == ["aircraft_index", "build_finding_level", "label_findings"]
+
+
+def test_broken_input_keeps_previous_outputs(tmp_path, capsys):
+    inst = Instrumenter(enabled=True)
+    w, paths, outputs = _watcher(tmp_path, inst=inst)
+    w.step(w.stale_on_start())
+    before = pd.read_parquet(outputs["finding_level"][0])
+    capsys.readouterr()
+
+    # every finding duplicated: parses fine, fails findings_key_unique
+    header, *rows = paths["findings"].read_text().splitlines()
+    paths["findings"].write_text("\n".join([header, *rows, *rows]) + "\n")
+    inst.records.clear()
+    assert w.step(w.poll()) == []
+    assert [r.name for r in inst.records] == ["read_findings", "build_finding_level", "label_findings"]
+    assert "failed data-quality checks" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(pd.read_parquet(outputs["finding_level"][0]), before)
+
+
+def test_failing_post_rebuild_step_is_not_reported_as_kept_outputs(tmp_path, capsys):
+    def boom(built):
+        raise RuntimeError("publish failed")
+
+    w, _, outputs = _watcher(tmp_path, on_rebuilt=boom)
+    assert len(w.step(w.stale_on_start())) == 5
+    assert all(p.exists() for p, _ in outputs.values())
+    log = capsys.readouterr().out
+    assert "post-rebuild step failed (RuntimeError: publish failed)" in log and "previous outputs kept" not in log
+
+
+def test_failed_inputs_are_retried_with_the_next_change(tmp_path):
+    w, paths, outputs = _watcher(tmp_path)
+    w.step(w.stale_on_start())
+    seq_mtime = outputs["seq_labeled"][0].stat().st_mtime_ns
+
+    path, reader = w.inputs["seq"]
+    calls = []
+
+    def flaky(p):  # unreadable on the first attempt, e.g. caught mid-write
+        calls.append(p)
+        if len(calls) == 1:
+            raise ValueError("truncated file")
+        return reader(p)
+
+    w.inputs = {**w.inputs, "seq": (path, flaky)}
+    _touch(paths["events_sequence"])
+    assert w.step(w.poll()) == [] and w.pending == {"seq"}
+
+    _touch(paths["findings"])
+    assert w.step(w.poll()) == ["build_finding_level", "label_findings", "label_sequence"]
+    assert outputs["seq_labeled"][0].stat().st_mtime_ns > seq_mtime and w.pending == set()
@@ -0,0 +1,278 @@
+# watch.py
+"""
+`main.py --watch`: poll data/raw and rebuild only the stages downstream of the files
+that changed. The build is a small DAG (raw inputs -> builders/labelers -> outputs);
+a new dictionary reruns label_sequence only, a new aircraft.csv both level builders
+and label_findings. Bursts of writes are debounced until file sizes/mtimes settle,
+raw frames are cached between rebuilds, and outputs are replaced atomically. A
+failed data-quality check keeps the previous outputs and the daemon keeps running;
+the inputs of a failed rebuild are retried along with the next change, so a fix
+made in another file also rebuilds them.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from config import (
+    AIRCRAFT_CSV,
+    DICT_CSV,
+    EVENTS_CSV,
+    EVENTS_SEQUENCE_CSV,
+    FINDING_AIRCRAFT_POLICY,
+    FINDINGS_CSV,
+    OUT_EVENT_LEVEL,
+    OUT_EVENT_LEVEL_ARROW,
+    OUT_FINDING_LEVEL,
+    OUT_FINDING_LEVEL_LABELED,
+    OUT_FINDING_LEVEL_LABELED_ARROW,
+    OUT_SEQ_LABELED,
+    OUT_SEQ_LABELED_ARROW,
+)
+from instrument import Instrumenter
+from labelers import AircraftIndex, build_event_level, build_finding_level, label_findings, label_sequence
+from loaders import read_aircraft, read_events, read_events_sequence, read_findings
+from quality.checks import DataQualityError, enforce, run_expectations
+from store import final_dtypes, write_arrow, write_parquet
+
+# raw input -> (path, reader); the dictionary is consumed as a path
+RAW_INPUTS: dict[str, tuple[Path, Callable]] = {
+    "events": (EVENTS_CSV, read_events),
+    "findings": (FINDINGS_CSV, read_findings),
+    "aircraft": (AIRCRAFT_CSV, read_aircraft),
+    "seq": (EVENTS_SEQUENCE_CSV, read_events_sequence),
+    "dictionary": (DICT_CSV, lambda p: p),
+}
+
+# node -> (parquet, arrow) written when the node is rebuilt
+OUTPUTS: dict[str, tuple[Path, Path | None]] = {
+    "event_level": (OUT_EVENT_LEVEL, OUT_EVENT_LEVEL_ARROW),
+    "finding_level": (OUT_FINDING_LEVEL, None),
+    "finding_level_labeled": (OUT_FINDING_LEVEL_LABELED, OUT_FINDING_LEVEL_LABELED_ARROW),
+    "seq_labeled": (OUT_SEQ_LABELED, OUT_SEQ_LABELED_ARROW),
+}
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    inputs: tuple[str, ...]
+    output: str
+    run: Callable
+
+
+def build_stages(policy: str = FINDING_AIRCRAFT_POLICY) -> list[Stage]:
+    """The main.py build as a DAG, in topological order."""
+    return [
+        Stage("aircraft_index", ("aircraft",), "aircraft_index", AircraftIndex.build),
+        Stage("build_event_level", ("events", "aircraft_index"), "event_level", build_event_level),
+        Stage(
+            "build_finding_level",
+            ("events", "findings", "aircraft_index"),
+            "finding_level",
+            lambda ev, fi, idx: build_finding_level(ev, fi, idx, policy=policy),
+        ),
+        Stage("label_findings", ("finding_level",), "finding_level_labeled", label_findings),
+        Stage("label_sequence", ("seq", "dictionary"), "seq_labeled", lambda s, d: label_sequence(s, dict_csv_path=d)),
+    ]
+
+
+def affected_stages(changed: set[str], stages: list[Stage]) -> list[Stage]:
+    """Stages downstream of the changed raw inputs, in run order."""
+    dirty = set(changed)
+    out = []
+    for s in stages:
+        if dirty.intersection(s.inputs):
+            out.append(s)
+            dirty.add(s.output)
+    return out
+
+
+def signature(paths: dict[str, Path]) -> dict[str, tuple[int, int] | None]:
+    """(mtime_ns, size) per input; None when the file is absent."""
+    sig = {}
+    for name, p in paths.items():
+        try:
+            st = Path(p).stat()
+            sig[name] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            sig[name] = None
+    return sig
+
+
+def _log(msg: str) -> None:
+    print(f"[watch {datetime.now():%H:%M:%S}] {msg}", flush=True)
+
+
+class Watcher:
+    def __init__(
+        self,
+        inputs: dict[str, tuple[Path, Callable]] | None = None,
+        outputs: dict[str, tuple[Path, Path | None]] | None = None,
+        policy: str = FINDING_AIRCRAFT_POLICY,
+        interval: float = 1.0,
+        debounce: float = 2.0,
+        inst: Instrumenter | None = None,
+        on_rebuilt: Callable[[dict[str, pd.DataFrame]], None] | None = None,
+    ):
+        self.inputs = RAW_INPUTS if inputs is None else inputs
+        self.outputs = OUTPUTS if outputs is None else outputs
+        self.stages = build_stages(policy)
+        self.interval = interval
+        self.debounce = debounce
+        self.inst = inst or Instrumenter(enabled=False)
+        self.on_rebuilt = on_rebuilt
+        self.paths = {k: Path(p) for k, (p, _) in self.inputs.items()}
+        self.sig = signature(self.paths)
+        self.raw: dict[str, object] = {}  # cached raw frames, dropped when their file changes
+        self.nodes: dict[str, object] = {}  # built node outputs, replaced when their stage reruns
+        self.pending: set[str] = set()  # inputs whose last rebuild failed; retried with the next change
+        self._producers = {s.output: s for s in self.stages}
+
+    def stale_on_start(self) -> set[str]:
+        """Raw inputs newer than (or feeding a missing) output, make-style."""
+        stale = set()
+        for s in self.stages:
+            out = self.outputs.get(s.output)
+            if out is None:
+                continue
+            raws = self._raw_ancestors(s)
+            if not Path(out[0]).exists():
+                stale |= raws
+                continue
+            built = Path(out[0]).stat().st_mtime_ns
+            stale |= {r for r in raws if self.sig.get(r) and self.sig[r][0] > built}
+        return stale
+
+    def _raw_ancestors(self, stage: Stage) -> set[str]:
+        todo, raws = list(stage.inputs), set()
+        while todo:
+            n = todo.pop()
+            if n in self._producers:
+                todo += self._producers[n].inputs
+            else:
+                raws.add(n)
+        return raws
+
+    def _input(self, name: str):
+        if name not in self.raw:
+            path, reader = self.inputs[name]
+            with self.inst.stage(f"read_{name}"):
+                self.raw[name] = reader(path)
+        return self.raw[name]
+
+    def _run_stage(self, s: Stage, nodes: dict[str, object], ran: list[str]) -> None:
+        nodes[s.output] = s.run(*(self._node(i, nodes, ran) for i in s.inputs))
+        ran.append(s.name)
+
+    def _node(self, name: str, nodes: dict[str, object], ran: list[str]):
+        """A stage input: rebuilt this round, kept from an earlier build, computed from its producer, or raw."""
+        if name in nodes:
+            return nodes[name]
+        if name in self.nodes:
+            return self.nodes[name]
+        producer = self._producers.get(name)
+        if producer is None:
+            return self._input(name)
+        for i in producer.inputs:
+            self._node(i, nodes, ran)
+        with self.inst.stage(producer.name):  # clean upstream node not built yet in this process
+            self._run_stage(producer, nodes, ran)
+        return nodes[name]
+
+    def rebuild(self, changed: set[str]) -> list[str]:
+        """Rerun stages downstream of `changed`, check, then write their outputs. Returns stage names run."""
+        for name in changed:
+            self.raw.pop(name, None)
+        todo = affected_stages(changed, self.stages)
+        if not todo:
+            return []
+        nodes: dict[str, object] = {}
+        ran: list[str] = []
+        for s in todo:
+            for i in s.inputs:
+                self._node(i, nodes, ran)
+            with self.inst.stage(s.name) as st:
+                self._run_stage(s, nodes, ran)
+                if isinstance(nodes[s.output], pd.DataFrame):
+                    st.out(nodes[s.output])
+
+        tables = {k: v for k, v in {**self.raw, **self.nodes, **nodes}.items() if isinstance(v, pd.DataFrame)}
+        enforce(run_expectations(tables))
+        self.nodes.update(nodes)  # only once the rebuild passed its checks
+
+        rerun = {s.output for s in todo}
+        built = {n: nodes[n] for n in self.outputs if n in rerun}
+        with self.inst.stage("write_outputs") as st:
+            for n, df in built.items():
+                parquet, arrow = self.outputs[n]
+                write_parquet(df, parquet)
+                st.wrote(parquet)
+                if arrow is not None:
+                    write_arrow(final_dtypes(df.copy()), arrow)
+                    st.wrote(arrow)
+        if self.on_rebuilt is not None:
+            try:
+                self.on_rebuilt(built)
+            except Exception as e:  # the outputs above are already written; only the follow-up failed
+                _log(
+                    f"rebuilt {', '.join(built) or 'no outputs'} but the post-rebuild step failed "
+                    f"({type(e).__name__}: {e}); the new outputs are written, anything derived from them is stale."
+                )
+        return ran
+
+    def poll(self) -> set[str]:
+        """Inputs whose signature changed, once they have been quiet for `debounce` seconds."""
+        now = signature(self.paths)
+        changed = {k for k in now if now[k] != self.sig.get(k)}
+        if not changed:
+            return set()
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < self.debounce:
+            time.sleep(min(self.interval, self.debounce))
+            again = signature(self.paths)
+            if again != now:
+                changed |= {k for k in again if again[k] != now[k]}
+                now, quiet_since = again, time.monotonic()
+        self.sig = now
+        return {k for k in changed if now[k] is not None}  # deletions wait for the replacement file
+
+    def step(self, changed: set[str]) -> list[str]:
+        changed = set(changed) | self.pending
+        names = ", ".join(sorted(changed))
+        t0 = time.perf_counter()
+        try:
+            ran = self.rebuild(changed)
+        except DataQualityError as e:
+            self.pending = changed
+            _log(f"{names} changed but failed data-quality checks; previous outputs kept.\n{e}\nTry: {e.ux.hint}")
+            return []
+        except Exception as e:  # a half-edited CSV must not kill the daemon
+            self.pending = changed
+            _log(f"{names} changed but the rebuild failed ({type(e).__name__}: {e}); previous outputs kept.")
+            return []
+        self.pending = set()
+        _log(f"{names} changed -> {', '.join(ran) or 'no stages'} ({time.perf_counter() - t0:.1f}s)")
+        return ran
+
+    def run(self, max_cycles: int | None = None) -> None:
+        stale = self.stale_on_start()
+        if stale:
+            self.step(stale)
+        _log(f"watching {', '.join(str(p) for p in self.paths.values())} (Ctrl-C to stop)")
+        cycles = 0
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                cycles += 1
+                changed = self.poll()
+                if changed:
+                    self.step(changed)
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            _log("stopped")